@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -42,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'mon_marché.middleware.MetricsMiddleware',
+    'mon_marché.middleware.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,6 +67,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'mon_marché.context_processors.catalog',
             ],
         },
     },
@@ -74,13 +79,150 @@ WSGI_APPLICATION = 'artisancommerce.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+# Profil choisi par DATABASE_PROFILE (voir mon_marché/database.py et "manage.py bench_database") :
+#   sqlite-basic  fichier SQLite sans réglage (défaut, développement)
+#   sqlite        fichier SQLite réglé pour la production : WAL, transactions IMMEDIATE,
+#                 connexions persistantes (PRAGMA appliqués à chaque nouvelle connexion)
+#   postgres      PostgreSQL (POSTGRES_*) : connexions persistantes vérifiées avant usage,
+#                 ou pool psycopg avec POSTGRES_POOL=1
+DATABASE_PROFILE = os.environ.get('DATABASE_PROFILE', 'sqlite-basic')
+SQLITE_PATH = os.environ.get('SQLITE_PATH') or BASE_DIR / 'db.sqlite3'
+
+# PRAGMA du profil sqlite (busy_timeout en premier : le passage en WAL peut attendre un verrou)
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,          # ms d'attente sur un verrou avant "database is locked"
+    'journal_mode': 'WAL',         # lectures concurrentes pendant une écriture
+    'synchronous': 'NORMAL',       # sûr en WAL, sans fsync à chaque commit
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -20000,          # 20 Mo de cache de pages par connexion
+    'temp_store': 'MEMORY',
 }
 
+if DATABASE_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'artisancommerce'),
+            'USER': os.environ.get('POSTGRES_USER', 'artisancommerce'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_HEALTH_CHECKS': True,
+            'CONN_MAX_AGE': 600,
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('POSTGRES_POOL') == '1':
+        # Pool psycopg (pip install "psycopg[pool]") : incompatible avec CONN_MAX_AGE,
+        # le pool vérifie lui-même chaque connexion avant de la prêter
+        from psycopg_pool import ConnectionPool
+
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('POSTGRES_POOL_MIN', 2)),
+            'max_size': int(os.environ.get('POSTGRES_POOL_MAX', 20)),
+            'timeout': 10,
+            'check': ConnectionPool.check_connection,
+        }
+elif DATABASE_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': SQLITE_PATH,
+            'CONN_HEALTH_CHECKS': True,
+            'CONN_MAX_AGE': 600,
+            'OPTIONS': {
+                # Verrou d'écriture pris dès BEGIN : une transaction qui lit puis écrit
+                # (réservation du stock) attend son tour au lieu d'échouer en "locked"
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+elif DATABASE_PROFILE == 'sqlite-basic':
+    SQLITE_PRAGMAS = {}
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': SQLITE_PATH,
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"DATABASE_PROFILE inconnu : {DATABASE_PROFILE}")
+
+# Répliques en lecture du catalogue (voir mon_marché/routers.py) : chemins SQLite
+# (SQLITE_REPLICAS, tenus à jour par "manage.py sync_replicas") ou hôtes PostgreSQL
+# (POSTGRES_REPLICA_HOSTS, réplication native), séparés par des virgules.
+if DATABASE_PROFILE == 'postgres':
+    replica_overrides = [{'HOST': host} for host in os.environ.get('POSTGRES_REPLICA_HOSTS', '').split(',') if host]
+else:
+    replica_overrides = [{'NAME': path} for path in os.environ.get('SQLITE_REPLICAS', '').split(',') if path]
+DATABASE_REPLICAS = []
+for number, overrides in enumerate(replica_overrides, start=1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'OPTIONS': dict(DATABASES['default'].get('OPTIONS', {})),
+        # En test, la réplique est la base de test principale
+        'TEST': {'MIRROR': 'default'},
+        **overrides,
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['mon_marché.routers.ReplicaRouter']
+# Durée pendant laquelle un client relit sur la principale après une écriture du catalogue
+# (au moins le retard des répliques, soit l'intervalle de sync_replicas)
+REPLICA_STICKY_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# Le catalogue, les cartes produit, les favoris et les ETag sont invalidés par
+# des écritures dans le cache : il doit être partagé par tous les processus
+# (workers web, runworkers, commandes de gestion). CACHE_BACKEND :
+#   locmem    mémoire du processus (défaut, développement avec un seul processus :
+#             une modification faite par un autre processus n'y est pas vue)
+#   redis     serveur Redis (REDIS_URL, pip install redis)
+#   database  table de la base principale ("manage.py createcachetable")
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+            'KEY_PREFIX': 'artisancommerce',
+        }
+    }
+elif CACHE_BACKEND == 'database':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'artisancommerce_cache',
+        }
+    }
+elif CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'artisancommerce',
+        }
+    }
+else:
+    raise ImproperlyConfigured(f"CACHE_BACKEND inconnu : {CACHE_BACKEND}")
+
+# Vues catalogue async (index, products, detail, search) : activées par asgi.py
+ASYNC_CATALOG_VIEWS = os.environ.get('ASYNC_CATALOG_VIEWS') == '1'
+
+# File de tâches (voir mon_marché/tasks.py), consommée par "manage.py runworkers".
+# TASKS_EAGER exécute les tâches dans le processus après le commit (tests, démo sans worker).
+TASKS_EAGER = False
+
+# Mesures par vue exposées sur /metrics (voir mon_marché/metrics.py).
+# Avec plusieurs processus (workers), un dossier partagé permet d'additionner leurs mesures.
+METRICS_MULTIPROCESS_DIR = os.environ.get('METRICS_MULTIPROCESS_DIR') or None
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+METRICS_N_PLUS_ONE_THRESHOLD = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -1,5 +1,12 @@
+from datetime import date, timedelta
+
 from django.contrib import admin
-from.models import Categorie,Product, Commande,UserProfile, User
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.utils import timezone
+from .models import (Categorie, Product, Commande, UserProfile, User, OrderLine,
+                     ContactMessage, PaymentEvent, Task, NewsletterCampaign, SalesRollup)
+from .rollups import dashboard
 from django.contrib.auth.admin import UserAdmin
 # Register your models here.
 # Register your models here.
@@ -13,9 +20,23 @@ class AdminProduct(admin.ModelAdmin):
       list_display = ('title', 'price', 'Categorie', 'date_ajout')
       search_fields = ('title',) 
       list_editable = ('price',)
+class OrderLineInline(admin.TabularInline):
+    model = OrderLine
+    extra = 0
+    raw_id_fields = ('product',)
+
 class AdminCommande(admin.ModelAdmin):
+  inlines = [OrderLineInline]
   list_display = ('id', 'user', 'nom', 'email', 'items', 'total', 'ville', 'pays', 'date_commande')
   search_fields = ('nom', 'email', 'ville')  
+  actions = ['cancel_orders']
+
+  def cancel_orders(self, request, queryset):
+      # save() par commande pour que le signal remette le stock en vente
+      for commande in queryset.exclude(order_status='cancelled'):
+          commande.order_status = 'cancelled'
+          commande.save(update_fields=['order_status'])
+  cancel_orders.short_description = "Annuler les commandes (remise en stock)"
 
 class UserProfileInline(admin.StackedInline):
     model = UserProfile
@@ -30,7 +51,6 @@ admin.site.register(Categorie,AdminCategorie)
 admin.site.register(Commande, AdminCommande)
 admin.site.unregister(User)
 admin.site.register(User, CustomUserAdmin)
-from .models import ContactMessage
 
 @admin.register(ContactMessage)
 class ContactMessageAdmin(admin.ModelAdmin):
@@ -43,4 +63,81 @@ class ContactMessageAdmin(admin.ModelAdmin):
         queryset.update(is_read=True)
     mark_as_read.short_description = "Marquer comme lu"
     
-    actions = [mark_as_read]
\ No newline at end of file
+    actions = [mark_as_read]
+
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+    # Journal en ajout seul : consultation uniquement
+    list_display = ['transaction_id', 'provider', 'reference', 'status', 'resultat', 'date_reception', 'date_traitement']
+    list_filter = ['provider', 'status', 'resultat']
+    search_fields = ['transaction_id', 'reference']
+    raw_id_fields = ['commande']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'status', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'date_fin']
+    list_filter = ['status', 'name']
+    search_fields = ['name', 'last_error']
+    readonly_fields = ['date_creation', 'date_fin', 'locked_until', 'locked_by', 'last_error']
+    actions = ['retry_tasks']
+    
+    def retry_tasks(self, request, queryset):
+        queryset.filter(status='failed').update(status='pending', attempts=0, run_at=timezone.now(), locked_until=None)
+    retry_tasks.short_description = "Relancer les tâches échouées"
+
+@admin.register(NewsletterCampaign)
+class NewsletterCampaignAdmin(admin.ModelAdmin):
+    list_display = ['sujet', 'status', 'date_creation', 'date_debut', 'date_fin']
+    readonly_fields = ['status', 'date_debut', 'date_fin']
+    actions = ['send_campaigns']
+    
+    def send_campaigns(self, request, queryset):
+        from .newsletter import send_campaign_task
+        for campaign in queryset.exclude(status='sent'):
+            send_campaign_task.delay(campaign.pk)
+    send_campaigns.short_description = "Envoyer (par les workers)"
+
+@admin.register(SalesRollup)
+class SalesRollupAdmin(admin.ModelAdmin):
+    # Tableau de bord des ventes : ne lit que les agrégats journaliers (voir rollups.py)
+    DEFAULT_DAYS = 30
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+    
+    def _date(self, request, name, default):
+        try:
+            return date.fromisoformat(request.GET.get(name, ''))
+        except ValueError:
+            return default
+    
+    def changelist_view(self, request, extra_context=None):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        until = self._date(request, 'until', timezone.localdate())
+        since = self._date(request, 'since', until - timedelta(days=self.DEFAULT_DAYS - 1))
+        context = {
+            **self.admin_site.each_context(request),
+            'title': "Tableau de bord des ventes",
+            'opts': self.model._meta,
+            'since': since,
+            'until': until,
+            **dashboard(since, until),
+            **(extra_context or {}),
+        }
+        return TemplateResponse(request, 'admin/mon_marché/salesrollup/dashboard.html', context)
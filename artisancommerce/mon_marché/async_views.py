@@ -0,0 +1,98 @@
+# async_views.py - Variantes asynchrones des pages catalogue, servies sous ASGI
+#
+# Mêmes requêtes et mêmes templates que views.py (voir listings.py). L'ORM
+# async de Django passe par sync_to_async(thread_sensitive=True) : les
+# requêtes d'une page s'exécutent l'une après l'autre sur le thread
+# synchrone, asyncio.gather ne les rend pas parallèles. L'intérêt est de
+# libérer la boucle d'événements pendant les requêtes. Le rendu du template
+# reste synchrone (context processors, objets paresseux).
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render
+
+from . import favorites
+from .conditional import conditional_page, detail_etag, listing_etag
+from .listings import arelated_products, index_listing, products_listing, search_listing
+from .models import Product, ProductReview
+
+arender = sync_to_async(render)
+# request.user est chargé de façon synchrone ; l'ETag a en général déjà lu les favoris
+afavorite_ids = sync_to_async(favorites.favorite_ids)
+amark_favorites = sync_to_async(favorites.mark)
+
+
+async def alist(queryset):
+    return [obj async for obj in queryset]
+
+
+@conditional_page(listing_etag)
+async def index(request):
+    """Page d'accueil avec produits vedettes"""
+    # La construction de la requête peut interroger le cache (catégories, FTS)
+    paginator, search_query = await sync_to_async(index_listing)(request.GET)
+    product_object = await paginator.aget_page(request.GET.get('cursor'))
+    await amark_favorites(request, product_object)
+
+    context = {
+        'product_object': product_object,
+        'search_query': search_query
+    }
+    return await arender(request, 'index.html', context)
+
+
+@conditional_page(detail_etag)
+async def detail(request, myid):
+    """
+    Page détail d'un produit : produit, favoris, avis et produits similaires
+    (requêtes exécutées l'une après l'autre sur le thread synchrone)
+    """
+    product, favorite_ids, reviews, related = await asyncio.gather(
+        aget_object_or_404(Product.objects.select_related('Categorie'), id=myid),
+        afavorite_ids(request),
+        alist(ProductReview.objects.filter(product_id=myid).select_related('user')),
+        arelated_products(myid),
+    )
+
+    context = {
+        'product': product,
+        'is_favorite': product.id in favorite_ids,
+        'discount_percent': product.get_discount_percent(),
+        'reviews': reviews,
+        'avg_rating': product.get_average_rating(),
+        'rating_histogram': product.get_rating_histogram(),
+        'related_products': related
+    }
+    return await arender(request, 'detail.html', context)
+
+
+@conditional_page(listing_etag)
+async def products(request):
+    """Page liste des produits, favoris marqués depuis le cache"""
+    paginator, category_id, search, sort_by = await sync_to_async(products_listing)(request.GET)
+    page_obj = await paginator.aget_page(request.GET.get('cursor'))
+    await amark_favorites(request, page_obj)
+
+    context = {
+        'page_obj': page_obj,
+        'current_category': category_id,
+        'search_query': search,
+        'sort_by': sort_by
+    }
+    return await arender(request, 'products.html', context)
+
+
+async def search(request):
+    """Vue de recherche : les résultats sont chargés en entier, leur nombre est len()"""
+    products, query, selected_categories, sort_by = await sync_to_async(search_listing)(request.GET)
+    results = await alist(products)
+    await amark_favorites(request, results)
+
+    context = {
+        'query': query,
+        'products': results,
+        'products_count': len(results),
+        'selected_categories': selected_categories,
+        'sort_by': sort_by,
+    }
+    return await arender(request, 'search_results.html', context)
@@ -0,0 +1,235 @@
+# cart.py - Panier côté serveur et calcul des prix
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Cart, CartItem, Product
+
+SESSION_CART_KEY = 'cart_id'
+SHIPPING_COST = Decimal('2000')  # Frais de livraison fixes
+MAX_QUANTITY = 99
+
+
+class CartError(ValueError):
+    pass
+
+
+# ==================== LIGNES ET TOTAUX ====================
+
+class CartLine:
+    def __init__(self, product, quantity):
+        self.product = product
+        self.quantity = quantity
+
+    @property
+    def unit_price(self):
+        return self.product.price
+
+    @property
+    def line_total(self):
+        return self.product.price * self.quantity
+
+    def as_order_line(self, order):
+        from .models import OrderLine
+
+        return OrderLine(
+            order=order,
+            product=self.product,
+            product_name=self.product.title,
+            unit_price=self.unit_price,
+            quantity=self.quantity,
+            line_total=self.line_total,
+        )
+
+    def as_order_item(self):
+        """Format des articles stockés dans Commande.items"""
+        return {
+            'product_id': self.product.id,
+            'name': self.product.title,
+            'price': str(self.unit_price),
+            'quantity': self.quantity,
+            'total': str(self.line_total),
+        }
+
+
+class CartSummary:
+    def __init__(self, lines, shipping_cost=SHIPPING_COST):
+        self.lines = lines
+        self.subtotal = sum((line.line_total for line in lines), Decimal(0))
+        self.shipping_cost = shipping_cost if lines else Decimal(0)
+        self.total = self.subtotal + self.shipping_cost
+
+    @property
+    def count(self):
+        return sum(line.quantity for line in self.lines)
+
+    def as_json(self):
+        return {
+            'items': [
+                {
+                    'product_id': line.product.id,
+                    'name': line.product.title,
+                    'image': line.product.get_image_url('thumb'),
+                    'unit_price': str(line.unit_price),
+                    'quantity': line.quantity,
+                    'line_total': str(line.line_total),
+                    'stock': line.product.stock,
+                }
+                for line in self.lines
+            ],
+            'count': self.count,
+            'subtotal': str(self.subtotal),
+            'shipping_cost': str(self.shipping_cost),
+            'total': str(self.total),
+        }
+
+
+def price_quantities(quantities):
+    """
+    Calcule les lignes d'un panier {product_id: quantité} avec les prix de la
+    base : une seule requête id__in, les produits inactifs ou inconnus sont ignorés.
+    """
+    if not quantities:
+        return CartSummary([])
+    products = Product.objects.filter(id__in=quantities.keys(), is_active=True).in_bulk()
+    lines = [
+        CartLine(products[product_id], quantity)
+        for product_id, quantity in quantities.items()
+        if product_id in products
+    ]
+    return CartSummary(lines)
+
+
+def summarize(cart):
+    """Lignes et totaux d'un panier enregistré, en une requête (jointure sur les produits)"""
+    if cart is None or cart.pk is None:
+        return CartSummary([])
+    items = (CartItem.objects.filter(cart=cart, product__is_active=True)
+             .select_related('product').order_by('date_ajout'))
+    return CartSummary([CartLine(item.product, item.quantity) for item in items])
+
+
+# ==================== VALIDATION ====================
+
+def parse_quantity(value):
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError):
+        raise CartError("Quantité invalide")
+    if quantity < 0:
+        raise CartError("Quantité invalide")
+    return min(quantity, MAX_QUANTITY)
+
+
+def parse_quantities(raw):
+    """
+    Normalise des articles envoyés par le client en {product_id: quantité}.
+    Accepte le format localStorage ({id: [qté, nom, total]} ou {id: {quantity}})
+    et le format liste ([{product_id, quantity}]). Les prix envoyés sont ignorés.
+    """
+    if isinstance(raw, dict):
+        entries = raw.items()
+    elif isinstance(raw, list):
+        entries = [(item.get('product_id'), item) for item in raw if isinstance(item, dict)]
+    else:
+        raise CartError("Articles invalides")
+
+    quantities = {}
+    for product_id, value in entries:
+        try:
+            product_id = int(product_id)
+        except (TypeError, ValueError):
+            raise CartError("Produit invalide")
+        if isinstance(value, list):
+            value = value[0] if value else 0
+        elif isinstance(value, dict):
+            value = value.get('quantity', 0)
+        quantity = parse_quantity(value)
+        if quantity:
+            quantities[product_id] = min(quantities.get(product_id, 0) + quantity, MAX_QUANTITY)
+    return quantities
+
+
+# ==================== PANIER DE LA REQUÊTE ====================
+
+def get_cart(request, create=True):
+    """
+    Panier de l'utilisateur connecté, ou panier anonyme dont l'id est gardé
+    en session (l'id survit au changement de clé de session à la connexion).
+    """
+    if request.user.is_authenticated:
+        if create:
+            cart, _ = Cart.objects.get_or_create(user=request.user)
+            return cart
+        return Cart.objects.filter(user=request.user).first()
+
+    cart_id = request.session.get(SESSION_CART_KEY)
+    cart = Cart.objects.filter(id=cart_id, user__isnull=True).first() if cart_id else None
+    if cart is None and create:
+        cart = Cart.objects.create()
+        request.session[SESSION_CART_KEY] = cart.id
+    return cart
+
+
+@transaction.atomic
+def set_quantities(cart, quantities, mode='add'):
+    """
+    Applique des quantités {product_id: quantité} au panier :
+    ``add`` les ajoute, ``set`` les fixe (0 = retirer), ``replace`` fixe et
+    retire aussi les produits absents. Nombre de requêtes constant : lecture
+    des articles et des produits, puis écritures groupées.
+    """
+    existing = {item.product_id: item for item in cart.items.all()}
+    valid_ids = set(
+        Product.objects.filter(id__in=quantities.keys(), is_active=True).values_list('id', flat=True)
+    ) if quantities else set()
+
+    to_create, to_update, to_delete = [], [], []
+    for product_id, quantity in quantities.items():
+        item = existing.get(product_id)
+        if product_id not in valid_ids:
+            if item is not None:
+                to_delete.append(item.id)
+            continue
+        if item is None:
+            if quantity:
+                to_create.append(CartItem(cart=cart, product_id=product_id, quantity=quantity))
+            continue
+        new_quantity = min(item.quantity + quantity, MAX_QUANTITY) if mode == 'add' else quantity
+        if new_quantity:
+            item.quantity = new_quantity
+            to_update.append(item)
+        else:
+            to_delete.append(item.id)
+
+    if mode == 'replace':
+        to_delete.extend(item.id for product_id, item in existing.items() if product_id not in quantities)
+
+    if to_create:
+        CartItem.objects.bulk_create(to_create)
+    if to_update:
+        CartItem.objects.bulk_update(to_update, ['quantity'])
+    if to_delete:
+        CartItem.objects.filter(id__in=to_delete).delete()
+    Cart.objects.filter(pk=cart.pk).update(date_modification=timezone.now())
+
+
+def remove_item(cart, product_id):
+    CartItem.objects.filter(cart=cart, product_id=product_id).delete()
+
+
+def clear(cart):
+    if cart is not None and cart.pk is not None:
+        cart.items.all().delete()
+
+
+@transaction.atomic
+def merge_carts(source, target):
+    """Fusionne un panier anonyme dans celui de l'utilisateur, puis le supprime"""
+    if source is None or target is None or source.pk == target.pk:
+        return
+    quantities = dict(source.items.values_list('product_id', 'quantity'))
+    if quantities:
+        set_quantities(target, quantities, mode='add')
+    source.delete()
@@ -0,0 +1,60 @@
+# catalog.py - Cache du catalogue des catégories
+import time
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, Q
+
+# Le numéro de version fait partie de chaque clé : l'incrémenter invalide
+# d'un coup toutes les entrées du catalogue, pour tous les processus qui
+# partagent le cache (CACHE_BACKEND redis ou database). Avec locmem, chaque
+# processus a sa propre version : une modification faite par un autre
+# processus (worker, commande de gestion) n'y est pas vue.
+VERSION_KEY = 'catalog:version'
+CATEGORIES_KEY = 'catalog:categories'
+CATALOG_TIMEOUT = 60 * 60 * 24
+
+
+def get_catalog_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Clé absente ou évincée : nouvelle version pour ne jamais relire d'anciennes entrées
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """
+    Invalide le catalogue. Dans une transaction, à appeler via
+    transaction.on_commit (voir signals.invalidate_catalog)
+    """
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def get_categories():
+    """
+    Liste des catégories triées par nom, chacune annotée avec
+    ``active_product_count`` (nombre de produits actifs). Une seule requête
+    par version du catalogue.
+    """
+    version = get_catalog_version()
+    categories = cache.get(CATEGORIES_KEY, version=version)
+    if categories is None:
+        from .models import Categorie
+
+        # Lu sur la principale : une réplique en retard figerait un état
+        # périmé dans le cache jusqu'à la version suivante
+        categories = list(Categorie.objects.using(DEFAULT_DB_ALIAS).annotate(
+            active_product_count=Count('products', filter=Q(products__is_active=True)),
+        ))
+        cache.set(CATEGORIES_KEY, categories, CATALOG_TIMEOUT, version=version)
+    return categories
+
+
+def get_category_counts():
+    """Nombre de produits actifs par id de catégorie"""
+    return {category.id: category.active_product_count for category in get_categories()}
@@ -0,0 +1,306 @@
+# catalog_io.py - Import / export du catalogue en CSV ou JSONL, par lots
+import csv
+import json
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import catalog, search
+from .models import Categorie, Product, unique_slug
+
+# Colonnes des fichiers (l'export produit exactement ce que l'import relit)
+COLUMNS = ['slug', 'title', 'category', 'price', 'old_price', 'description',
+           'stock', 'is_new', 'is_active', 'image_url']
+# Champs du modèle écrits par l'import
+UPDATE_FIELDS = ['title', 'Categorie', 'price', 'old_price', 'description',
+                 'stock', 'is_new', 'is_active', 'image_url']
+
+TRUE_VALUES = {'1', 'true', 'vrai', 'oui', 'yes', 'y'}
+
+
+class RowError(ValueError):
+    pass
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return 'jsonl' if str(path).endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+# ==================== LECTURE / ÉCRITURE ====================
+
+def read_rows(stream, fmt):
+    """Itère sur les lignes du fichier (dictionnaires), sans tout charger"""
+    if fmt == 'jsonl':
+        for line in stream:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield {'__error__': f"JSON invalide : {e}"}
+    else:
+        yield from csv.DictReader(stream)
+
+
+class RowWriter:
+    def __init__(self, stream, fmt):
+        self.stream = stream
+        self.fmt = fmt
+        if fmt == 'csv':
+            self.writer = csv.DictWriter(stream, fieldnames=COLUMNS)
+            self.writer.writeheader()
+
+    def write(self, row):
+        if self.fmt == 'csv':
+            self.writer.writerow(row)
+        else:
+            self.stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+
+def open_input(path):
+    return sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+
+
+def open_output(path):
+    return sys.stdout if path == '-' else open(path, 'w', newline='', encoding='utf-8')
+
+
+# ==================== VALIDATION ====================
+
+def _decimal(value, name, required=False):
+    if value in (None, ''):
+        if required:
+            raise RowError(f"{name} manquant")
+        return None
+    try:
+        number = Decimal(str(value).replace(',', '.').replace(' ', ''))
+    except InvalidOperation:
+        raise RowError(f"{name} invalide : {value!r}")
+    if number < 0:
+        raise RowError(f"{name} négatif : {value!r}")
+    return number
+
+
+def _int(value, name, default=0):
+    if value in (None, ''):
+        return default
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise RowError(f"{name} invalide : {value!r}")
+    if number < 0:
+        raise RowError(f"{name} négatif : {value!r}")
+    return number
+
+
+def _bool(value, default):
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def parse_row(raw):
+    """Ligne du fichier -> valeurs du modèle (la catégorie reste un nom)"""
+    if '__error__' in raw:
+        raise RowError(raw['__error__'])
+    title = (raw.get('title') or '').strip()
+    if not title:
+        raise RowError("title manquant")
+    category = (raw.get('category') or '').strip()
+    if not category:
+        raise RowError("category manquante")
+    return {
+        'slug': slugify(raw.get('slug') or '')[:50],
+        'title': title[:200],
+        'category': category,
+        'price': _decimal(raw.get('price'), 'price', required=True),
+        'old_price': _decimal(raw.get('old_price'), 'old_price'),
+        'description': raw.get('description') or '',
+        'stock': _int(raw.get('stock'), 'stock'),
+        'is_new': _bool(raw.get('is_new'), False),
+        'is_active': _bool(raw.get('is_active'), True),
+        'image_url': (raw.get('image_url') or None),
+    }
+
+
+# ==================== IMPORT ====================
+
+class CategoryMap:
+    """Catégories par nom (insensible à la casse), chargées une fois"""
+
+    def __init__(self, create_missing):
+        self.create_missing = create_missing
+        self.ids = {name.lower(): pk for pk, name in Categorie.objects.values_list('id', 'name')}
+
+    def resolve(self, names):
+        """Crée d'un coup les catégories manquantes d'un lot (si autorisé)"""
+        missing = {name.lower(): name for name in names if name.lower() not in self.ids}
+        if missing and self.create_missing:
+            Categorie.objects.bulk_create([Categorie(name=name) for name in missing.values()])
+            self.ids.update(
+                (name.lower(), pk)
+                for pk, name in Categorie.objects.filter(name__in=missing.values()).values_list('id', 'name')
+            )
+
+    def get(self, name):
+        return self.ids.get(name.lower())
+
+
+class SlugAllocator:
+    """
+    Slugs uniques attribués en mémoire : tous les slugs existants sont lus
+    une fois (une colonne), puis chaque nouveau produit reçoit le premier
+    slug libre sans requête supplémentaire.
+    """
+
+    def __init__(self):
+        self.taken = set(Product.objects.values_list('slug', flat=True).iterator(chunk_size=5000))
+
+    def allocate(self, title):
+        slug = unique_slug(slugify(title) or 'produit', self.taken)
+        self.taken.add(slug)
+        return slug
+
+    def reserve(self, slug):
+        self.taken.add(slug)
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class ImportStats:
+    def __init__(self):
+        self.rows = self.created = self.updated = self.unchanged = 0
+        self.errors = []
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+def _import_batch(batch, categories, slugs, stats, now):
+    parsed = []
+    for line_number, raw in batch:
+        try:
+            parsed.append((line_number, parse_row(raw)))
+        except RowError as e:
+            stats.errors.append((line_number, str(e)))
+
+    categories.resolve({values['category'] for _, values in parsed})
+
+    # Produits existants du lot, par slug : une requête
+    existing = Product.objects.in_bulk(
+        [values['slug'] for _, values in parsed if values['slug']], field_name='slug',
+    )
+
+    to_create, to_update, seen = [], [], set()
+    for line_number, values in parsed:
+        category_id = categories.get(values.pop('category'))
+        if category_id is None:
+            stats.errors.append((line_number, "catégorie inconnue (voir --create-categories)"))
+            continue
+        slug = values.pop('slug')
+        if slug in seen:
+            stats.errors.append((line_number, f"slug en double dans le lot : {slug}"))
+            continue
+
+        product = existing.get(slug) if slug else None
+        if product is None:
+            if slug:
+                if slug in slugs.taken:
+                    slug = slugs.allocate(slug)
+                else:
+                    slugs.reserve(slug)
+            else:
+                slug = slugs.allocate(values['title'])
+            seen.add(slug)
+            to_create.append(Product(slug=slug, Categorie_id=category_id, **values))
+            continue
+
+        seen.add(slug)
+        values['Categorie_id'] = category_id
+        changed = False
+        for field, value in values.items():
+            if getattr(product, field) != value:
+                setattr(product, field, value)
+                changed = True
+        if changed:
+            product.date_modification = now
+            to_update.append(product)
+        else:
+            stats.unchanged += 1
+
+    with transaction.atomic():
+        if to_create:
+            Product.objects.bulk_create(to_create)
+        if to_update:
+            Product.objects.bulk_update(to_update, UPDATE_FIELDS + ['date_modification'])
+    stats.created += len(to_create)
+    stats.updated += len(to_update)
+    stats.rows += len(batch)
+
+
+def import_rows(rows, batch_size=1000, create_categories=False, progress=None):
+    """
+    Importe des lignes (itérable) par lots : produits existants retrouvés par
+    slug et mis à jour (bulk_update des seuls produits modifiés), nouveaux
+    produits créés par bulk_create. La mémoire reste bornée par la taille
+    du lot, plus l'ensemble des slugs et la table des catégories.
+
+    bulk_create / bulk_update ne déclenchent pas les signaux : l'index de
+    recherche est reconstruit et le cache du catalogue invalidé à la fin.
+    """
+    stats = ImportStats()
+    categories = CategoryMap(create_categories)
+    slugs = SlugAllocator()
+    now = timezone.now()
+
+    numbered = enumerate(rows, start=1)
+    for batch in _batches(numbered, batch_size):
+        _import_batch(batch, categories, slugs, stats, now)
+        if progress:
+            progress(stats)
+
+    if stats.created or stats.updated:
+        search.rebuild_index()
+        transaction.on_commit(catalog.bump_catalog_version)
+    return stats
+
+
+# ==================== EXPORT ====================
+
+EXPORT_FIELDS = ['slug', 'title', 'Categorie__name', 'price', 'old_price', 'description',
+                 'stock', 'is_new', 'is_active', 'image_url']
+
+
+def export_rows(queryset, writer, chunk_size=2000, progress=None, progress_every=10000):
+    """Écrit les produits en flux (values_list + iterator) ; retourne le nombre de lignes"""
+    count = 0
+    rows = queryset.order_by('id').values_list(*EXPORT_FIELDS).iterator(chunk_size=chunk_size)
+    for values in rows:
+        row = dict(zip(COLUMNS, values))
+        for field in ('price', 'old_price'):
+            if row[field] is not None:
+                row[field] = str(row[field])
+        writer.write(row)
+        count += 1
+        if progress and count % progress_every == 0:
+            progress(count)
+    return count
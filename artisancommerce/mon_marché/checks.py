@@ -0,0 +1,17 @@
+# checks.py - Vérifications de déploiement ("manage.py check --deploy")
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Les invalidations (catalogue, favoris, ETag) ne valent que pour un cache partagé"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND', '')
+    if not backend.endswith('LocMemCache'):
+        return []
+    return [Warning(
+        "Le cache par défaut est propre à chaque processus (LocMemCache) : les autres "
+        "workers et les commandes de gestion n'invalident pas ses entrées.",
+        hint="Choisir CACHE_BACKEND=redis ou CACHE_BACKEND=database en production.",
+        id='mon_marche.W001',
+    )]
@@ -0,0 +1,126 @@
+# co_purchase.py - Produits achetés ensemble (co-occurrences dans les commandes)
+#
+# Matrice produit x produit creuse, construite comme une matrice COO : chaque
+# couple (a, b) d'une commande est codé en un entier a * base + b dans un
+# tableau compact (array 'q', 8 octets par couple), puis les couples triés
+# sont comptés par plages : c'est la somme des doublons d'une matrice creuse,
+# sans dictionnaire de couples en mémoire. Le tri se fait sur place par blocs
+# fusionnés à la lecture : seul un bloc existe à la fois en liste d'entiers
+# Python (~40 octets par couple). Le score est la similarité cosinus
+#     commandes(a et b) / sqrt(commandes(a) * commandes(b))
+# qui évite de recommander partout les produits les plus vendus.
+import heapq
+import logging
+import math
+from array import array
+from collections import Counter
+from itertools import combinations, groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Max
+
+from .catalog import bump_catalog_version
+from .models import OrderLine, Product, ProductNeighbour
+from .reports import SOLD_LINES
+from .tasks import task
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 10
+MIN_SUPPORT = 2         # commandes communes minimum pour retenir un couple
+MAX_BASKET = 50         # paniers plus grands ignorés (commandes de gros : coût quadratique)
+SORT_CHUNK = 1 << 18    # couples triés à la fois (liste temporaire de ~10 Mo)
+
+
+def baskets(since=None, chunk_size=10000):
+    """Produits distincts de chaque commande vendue, lus dans l'ordre des commandes"""
+    lines = OrderLine.objects.filter(SOLD_LINES, product__isnull=False)
+    if since:
+        lines = lines.filter(order__date_commande__gte=since)
+    rows = lines.order_by('order_id').values_list('order_id', 'product_id').iterator(chunk_size=chunk_size)
+    for _, group in groupby(rows, key=itemgetter(0)):
+        yield sorted({product_id for _, product_id in group})
+
+
+def sorted_codes(pairs, chunk_size=SORT_CHUNK):
+    """
+    Trie le tableau sur place par blocs et retourne la fusion des blocs (un
+    itérateur croissant) : jamais de liste de tous les couples en mémoire.
+    Le tableau ne doit plus changer de taille pendant la lecture.
+    """
+    view = memoryview(pairs)
+    blocks = []
+    for start in range(0, len(pairs), chunk_size):
+        block = view[start:start + chunk_size]
+        block[:] = array('q', sorted(block))
+        blocks.append(block)
+    return heapq.merge(*blocks) if len(blocks) > 1 else iter(blocks[0] if blocks else ())
+
+
+def co_occurrences(baskets, base, max_basket=MAX_BASKET, chunk_size=SORT_CHUNK):
+    """
+    (commandes par produit, couples codés a * base + b (a < b) en ordre
+    croissant). Un couple apparaît autant de fois que de commandes communes.
+    """
+    orders = Counter()
+    pairs = array('q')
+    for basket in baskets:
+        if len(basket) > max_basket:
+            continue
+        orders.update(basket)
+        pairs.extend(a * base + b for a, b in combinations(basket, 2))
+    return orders, sorted_codes(pairs, chunk_size)
+
+
+def top_neighbours(orders, pairs, base, top_k=TOP_K, min_support=MIN_SUPPORT):
+    """{produit: [(score, commandes communes, voisin)] par score décroissant}"""
+    heaps = {}
+
+    def push(product_id, entry):
+        heap = heaps.setdefault(product_id, [])
+        if len(heap) < top_k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    for code, run in groupby(pairs):
+        count = sum(1 for _ in run)
+        if count < min_support:
+            continue
+        a, b = divmod(code, base)
+        score = count / math.sqrt(orders[a] * orders[b])
+        push(a, (score, count, b))
+        push(b, (score, count, a))
+    return {product_id: sorted(heap, reverse=True) for product_id, heap in heaps.items()}
+
+
+def build_neighbours(top_k=TOP_K, min_support=MIN_SUPPORT, max_basket=MAX_BASKET, since=None, batch_size=5000):
+    """Recalcule toute la table ProductNeighbour ; retourne (produits, couples écrits)"""
+    base = (Product.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+    orders, pairs = co_occurrences(baskets(since), base, max_basket)
+    neighbours = top_neighbours(orders, pairs, base, top_k, min_support)
+    del pairs
+
+    rows = (
+        ProductNeighbour(product_id=product_id, neighbour_id=neighbour_id, rank=rank,
+                         score=score, co_count=count)
+        for product_id, entries in neighbours.items()
+        for rank, (score, count, neighbour_id) in enumerate(entries, start=1)
+    )
+    written = 0
+    with transaction.atomic():
+        ProductNeighbour.objects.all().delete()
+        while batch := [row for _, row in zip(range(batch_size), rows)]:
+            ProductNeighbour.objects.bulk_create(batch)
+            written += len(batch)
+        # L'ETag des pages détail couvre les produits associés par la version du catalogue
+        transaction.on_commit(bump_catalog_version)
+    logger.info("Produits associés : %s produits, %s voisins", len(neighbours), written)
+    return len(neighbours), written
+
+
+@task(unique=True, max_attempts=3, timeout=60 * 60)
+def rebuild_neighbours(top_k=TOP_K, min_support=MIN_SUPPORT):
+    """Tâche planifiée (ex. chaque nuit) : build_neighbours avec les réglages par défaut"""
+    build_neighbours(top_k=top_k, min_support=min_support)
@@ -0,0 +1,105 @@
+# conditional.py - GET conditionnels (ETag / 304) pour les pages du catalogue
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db.models import Max
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .catalog import get_catalog_version
+from .favorites import favorites_digest
+from .models import Product
+
+
+def _digest(*parts):
+    return hashlib.md5(':'.join(str(part) for part in parts).encode(), usedforsecurity=False).hexdigest()
+
+
+def user_state(request):
+    """
+    Ce qui change le rendu d'une page pour un même catalogue : l'utilisateur
+    (menu, favoris) et le cookie CSRF dont le jeton est inclus dans la page.
+    """
+    csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    if not request.user.is_authenticated:
+        return ('anon', csrf_cookie)
+    return (request.user.pk, favorites_digest(request), csrf_cookie)
+
+
+def _has_pending_messages(request):
+    # len() ne consomme pas les messages
+    return len(get_messages(request)) > 0
+
+
+def catalog_state():
+    """
+    Dernière modification d'un produit et nombre de produits actifs, lus en
+    base : ils voient aussi les update() (déclinaisons d'images, actions de
+    l'admin) et les écritures des autres processus, sans passer par le cache.
+    """
+    last_modified = Product.objects.aggregate(last=Max('date_modification'))['last']
+    return last_modified, Product.objects.filter(is_active=True).count()
+
+
+def listing_etag(request, *args, **kwargs):
+    """
+    ETag des listes (accueil, produits) : état des produits en base, version
+    du catalogue (catégories, avis, produits associés), paramètres de la
+    requête (recherche, tri, curseur) et état de l'utilisateur.
+    """
+    if _has_pending_messages(request):
+        return None
+    return _digest(*catalog_state(), get_catalog_version(), request.get_full_path(), *user_state(request))
+
+
+def detail_etag(request, myid, *args, **kwargs):
+    """
+    ETag de la page produit : la ligne du produit (stock et agrégats d'avis
+    sont modifiés par UPDATE, sans toucher date_modification) plus la version
+    du catalogue pour les produits similaires.
+    """
+    if _has_pending_messages(request):
+        return None
+    row = Product.objects.filter(pk=myid).values_list(
+        'date_modification', 'stock', 'review_count', 'rating_sum', 'is_active',
+    ).first()
+    if row is None:
+        return None
+    return _digest(get_catalog_version(), *row, *user_state(request))
+
+
+def conditional_page(etag_func):
+    """
+    Calcule l'ETag avant la vue : si le client a déjà cette version, la
+    réponse est un 304 sans requête de liste ni rendu de template. Les pages
+    restent privées et revalidées à chaque affichage. Accepte aussi les vues
+    async : l'ETag (requêtes ORM synchrones) est alors calculé via sync_to_async.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                etag = await sync_to_async(etag_func)(request, *args, **kwargs)
+                conditional_view = condition(etag_func=lambda *a, **kw: etag)(view)
+                response = await conditional_view(request, *args, **kwargs)
+                if response.has_header('ETag'):
+                    patch_cache_control(response, private=True, no_cache=True)
+                return response
+
+            return async_wrapper
+
+        conditional_view = condition(etag_func=etag_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if response.has_header('ETag'):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return wrapper
+    return decorator
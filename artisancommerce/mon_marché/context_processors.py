@@ -0,0 +1,11 @@
+# context_processors.py - Variables communes à tous les templates
+from django.utils.functional import SimpleLazyObject
+
+from .catalog import get_categories
+
+
+def catalog(request):
+    """Expose les catégories en cache ; rien n'est lu tant qu'un template ne les utilise pas"""
+    return {
+        'categories': SimpleLazyObject(get_categories),
+    }
@@ -0,0 +1,26 @@
+# database.py - Réglages appliqués à chaque nouvelle connexion (voir DATABASE_PROFILE)
+from django.conf import settings
+
+
+def configure_sqlite(connection):
+    """
+    Applique SQLITE_PRAGMAS à une connexion SQLite. Avec des connexions
+    persistantes (CONN_MAX_AGE), cela n'a lieu qu'une fois par connexion.
+    Les bases en mémoire (tests) ignorent WAL et mmap.
+    """
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def sqlite_pragmas(connection):
+    """Valeurs effectives des PRAGMA réglés (diagnostic, benchmark)"""
+    with connection.cursor() as cursor:
+        values = {}
+        for name in getattr(settings, 'SQLITE_PRAGMAS', {}) or ('journal_mode', 'synchronous', 'busy_timeout'):
+            cursor.execute(f'PRAGMA {name}')
+            values[name] = cursor.fetchone()[0]
+        return values
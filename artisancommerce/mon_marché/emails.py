@@ -0,0 +1,33 @@
+# emails.py - Emails transactionnels, envoyés par les workers
+from django.conf import settings
+from django.core.mail import send_mail
+from django.urls import reverse
+
+from .models import Commande
+from .tasks import task
+
+
+@task(max_attempts=5, retry_delay=60)
+def send_order_confirmation(order_id):
+    """Email de confirmation de commande (une erreur SMTP relance la tâche)"""
+    commande = Commande.objects.filter(pk=order_id).prefetch_related('lines').first()
+    if commande is None or not commande.email:
+        return
+    lines = '\n'.join(
+        f"- {line.quantity} x {line.product_name} : {line.line_total} FCFA"
+        for line in commande.lines.all()
+    )
+    message = (
+        f"Bonjour {commande.nom},\n\n"
+        f"Nous avons bien reçu votre commande {commande.order_number}.\n\n"
+        f"{lines}\n\n"
+        f"Livraison : {commande.shipping_cost} FCFA\n"
+        f"Total : {commande.total} FCFA\n\n"
+        f"Suivre votre commande : {settings.SITE_URL}{reverse('order_detail', args=[commande.id])}\n"
+    )
+    send_mail(
+        f"Confirmation de votre commande {commande.order_number}",
+        message,
+        settings.DEFAULT_FROM_EMAIL,
+        [commande.email],
+    )
@@ -0,0 +1,66 @@
+# favorites.py - Favoris de chaque utilisateur, en cache
+#
+# Les pages catalogue marquent les produits favoris de l'utilisateur. Les
+# identifiants sont lus une fois par requête depuis le cache (tableau trié
+# d'entiers, compact à sérialiser) et invalidés après chaque ajout ou retrait
+# (voir signals.py). Le test d'appartenance se fait sur un frozenset.
+# L'invalidation suppose un cache partagé par les workers (CACHE_BACKEND redis
+# ou database) : avec locmem, un autre processus garde l'ancien état (cœurs et
+# ETag des pages) jusqu'à FAVORITES_TIMEOUT.
+import hashlib
+from array import array
+
+from django.core.cache import cache
+
+from .models import Favorite
+
+FAVORITES_TIMEOUT = 60 * 60 * 24
+_EMPTY = (frozenset(), 'anon')
+
+
+def _key(user_id):
+    return f'favorites:{user_id}'
+
+
+def _load(user_id):
+    ids = cache.get(_key(user_id))
+    if ids is None:
+        ids = array('q', Favorite.objects.filter(user_id=user_id).order_by('product_id')
+                    .values_list('product_id', flat=True))
+        cache.set(_key(user_id), ids, FAVORITES_TIMEOUT)
+    return ids
+
+
+def _state(request):
+    """(identifiants, empreinte), mémorisés sur la requête"""
+    state = getattr(request, '_favorites', None)
+    if state is None:
+        if not request.user.is_authenticated:
+            state = _EMPTY
+        else:
+            ids = _load(request.user.pk)
+            state = (frozenset(ids), hashlib.md5(ids.tobytes(), usedforsecurity=False).hexdigest())
+        request._favorites = state
+    return state
+
+
+def favorite_ids(request):
+    return _state(request)[0]
+
+
+def favorites_digest(request):
+    """Change à chaque ajout ou retrait de favori (ETag des pages)"""
+    return _state(request)[1]
+
+
+def mark(request, products):
+    """Pose ``is_favorite`` sur chaque produit (rien pour un visiteur anonyme)"""
+    if request.user.is_authenticated:
+        ids = favorite_ids(request)
+        for product in products:
+            product.is_favorite = product.id in ids
+    return products
+
+
+def invalidate(user_id):
+    cache.delete(_key(user_id))
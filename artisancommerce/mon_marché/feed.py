@@ -0,0 +1,128 @@
+# feed.py - Flux JSON du catalogue (API en lecture seule)
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+from . import images
+from .catalog import get_categories
+from .listings import products_listing
+from .pagination import SORT_ORDERINGS, InvalidCursor
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+class InvalidParameter(ValueError):
+    """Paramètre de requête invalide (réponse 400)"""
+
+
+class InvalidFields(InvalidParameter):
+    pass
+
+
+def _file_url(name):
+    return default_storage.url(name) if name else None
+
+
+def _image(row):
+    return _file_url(row['image']) or row['image_url']
+
+
+def _thumbnail(row):
+    return images.variant_url(row['image_variants'], 'thumb') or _image(row)
+
+
+def _average_rating(row):
+    return round(row['rating_sum'] / row['review_count'], 1) if row['review_count'] else 0
+
+
+# Champ exposé -> (colonnes values() nécessaires, calcul à partir de la ligne).
+# Un calcul None signifie "valeur de la colonne du même nom".
+PRODUCT_FIELDS = {
+    'id': (['id'], None),
+    'title': (['title'], None),
+    'slug': (['slug'], None),
+    'price': (['price'], None),
+    'old_price': (['old_price'], None),
+    'description': (['description'], None),
+    'stock': (['stock'], None),
+    'is_new': (['is_new'], None),
+    'category_id': (['Categorie_id'], lambda row: row['Categorie_id']),
+    'category_name': (['Categorie__name'], lambda row: row['Categorie__name']),
+    'date_ajout': (['date_ajout'], None),
+    'date_modification': (['date_modification'], None),
+    'review_count': (['review_count'], None),
+    'average_rating': (['rating_sum', 'review_count'], _average_rating),
+    'image': (['image', 'image_url'], _image),
+    'thumbnail': (['image', 'image_url', 'image_variants'], _thumbnail),
+    'url': (['id'], lambda row: reverse('detail', args=[row['id']])),
+}
+DEFAULT_PRODUCT_FIELDS = ['id', 'title', 'price', 'old_price', 'category_id', 'stock', 'average_rating', 'thumbnail', 'url']
+
+CATEGORY_FIELDS = {
+    'id': lambda category: category.id,
+    'name': lambda category: category.name,
+    'description': lambda category: category.description,
+    'image': lambda category: category.get_image_url(),
+    'product_count': lambda category: category.active_product_count,
+}
+
+
+def parse_fields(raw, available, default):
+    """Liste des champs demandés par ?fields=a,b,c (champs inconnus : InvalidFields)"""
+    if not raw:
+        return list(default)
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise InvalidFields(f"Champs inconnus : {', '.join(unknown)}")
+    return fields
+
+
+def parse_limit(raw):
+    """Taille de page de ?limit= (au plus MAX_LIMIT)"""
+    if not raw:
+        return DEFAULT_LIMIT
+    if not raw.isdigit() or int(raw) < 1:
+        raise InvalidParameter(f"limit doit être un entier entre 1 et {MAX_LIMIT}")
+    return min(int(raw), MAX_LIMIT)
+
+
+def product_page(params, fields):
+    """
+    Page de produits sérialisée à partir de lignes values() : seules les
+    colonnes des champs demandés (et de la clé de tri) sont lues, sans
+    instancier de modèles. Retourne (lignes, curseur suivant, curseur précédent).
+    Un paramètre invalide lève InvalidParameter.
+    """
+    category = params.get('category')
+    if category and not category.isdigit():
+        raise InvalidParameter("category doit être un identifiant de catégorie")
+    sort = params.get('sort')
+    if sort and sort not in SORT_ORDERINGS:
+        raise InvalidParameter(f"Tri inconnu : {sort}")
+    per_page = parse_limit(params.get('limit'))
+
+    paginator, _, _, _ = products_listing(params)
+    paginator.per_page = per_page
+
+    columns = {column for field in fields for column in PRODUCT_FIELDS[field][0]}
+    columns.update(field.lstrip('-') for field in paginator.ordering)
+    paginator.queryset = paginator.queryset.values(*columns)
+    try:
+        page = paginator.get_page(params.get('cursor'), strict=True)
+    except InvalidCursor:
+        raise InvalidParameter("Curseur invalide")
+
+    results = []
+    for row in page:
+        item = {}
+        for field in fields:
+            compute = PRODUCT_FIELDS[field][1]
+            item[field] = compute(row) if compute else row[field]
+        results.append(item)
+    return results, page.next_cursor, page.previous_cursor
+
+
+def category_rows(fields):
+    """Catégories du cache du catalogue, avec les champs demandés"""
+    return [{field: CATEGORY_FIELDS[field](category) for field in fields} for category in get_categories()]
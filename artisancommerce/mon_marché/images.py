@@ -0,0 +1,124 @@
+# images.py - Déclinaisons des images (miniatures + WebP) générées en arrière-plan
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from .tasks import task
+
+# Nom de taille -> (largeur, hauteur, recadrage). "thumb" est recadrée au
+# carré pour les cartes produit ; les autres gardent leurs proportions.
+IMAGE_SIZES = {
+    'thumb': (400, 400, True),
+    'medium': (800, 800, False),
+    'large': (1600, 1600, False),
+}
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+
+# ==================== GÉNÉRATION ====================
+
+def _derivative_name(source_name, size, extension):
+    directory, filename = os.path.split(source_name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'derivatives', f'{stem}_{size}.{extension}')
+
+
+def _save(image, name, fmt, **options):
+    buffer = BytesIO()
+    image.save(buffer, fmt, **options)
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def generate_derivatives(source_name):
+    """
+    Génère chaque taille en WebP et dans un format de repli (PNG si l'image a
+    de la transparence, JPEG sinon). Retourne le dictionnaire stocké dans
+    ``image_variants`` : {'source': nom, 'thumb': {'webp': ..., 'fallback': ...}, ...}
+    """
+    from PIL import Image, ImageOps
+
+    with default_storage.open(source_name, 'rb') as source:
+        original = Image.open(source)
+        original.load()
+    original = ImageOps.exif_transpose(original)
+    has_alpha = original.mode in ('RGBA', 'LA') or 'transparency' in original.info
+    original = original.convert('RGBA' if has_alpha else 'RGB')
+
+    variants = {'source': source_name}
+    for size, (width, height, crop) in IMAGE_SIZES.items():
+        if crop:
+            resized = ImageOps.fit(original, (width, height), Image.LANCZOS)
+        else:
+            resized = original.copy()
+            resized.thumbnail((width, height), Image.LANCZOS)
+
+        webp = _save(resized, _derivative_name(source_name, size, 'webp'), 'WEBP', quality=WEBP_QUALITY, method=4)
+        if has_alpha:
+            fallback = _save(resized, _derivative_name(source_name, size, 'png'), 'PNG', optimize=True)
+        else:
+            fallback = _save(resized, _derivative_name(source_name, size, 'jpg'), 'JPEG',
+                             quality=JPEG_QUALITY, optimize=True, progressive=True)
+        variants[size] = {'webp': webp, 'fallback': fallback, 'width': resized.width}
+    return variants
+
+
+@task(max_attempts=3, timeout=10 * 60)
+def process_image(model_label, pk, field_name):
+    """Génère les déclinaisons d'une image et les enregistre sur l'objet"""
+    from django.apps import apps
+
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return None
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return None
+    variants = generate_derivatives(field_file.name)
+
+    updates = {'image_variants': variants}
+    # date_modification fait partie de la clé du cache des cartes produit
+    if any(field.name == 'date_modification' for field in model._meta.fields):
+        from django.utils import timezone
+        updates['date_modification'] = timezone.now()
+    # Seulement si l'image n'a pas changé entre-temps
+    model.objects.filter(pk=pk, **{field_name: field_file.name}).update(**updates)
+    return variants
+
+
+def schedule_derivatives(instance, field_name):
+    """Met la génération en file pour les workers"""
+    process_image.delay(instance._meta.label, instance.pk, field_name)
+
+
+def needs_derivatives(instance, field_name):
+    field_file = getattr(instance, field_name)
+    if not field_file:
+        return False
+    return (instance.image_variants or {}).get('source') != field_file.name
+
+
+# ==================== URLS ====================
+
+def variant_url(variants, size, kind='fallback'):
+    """URL d'une déclinaison, ou None si elle n'a pas (encore) été générée"""
+    entry = (variants or {}).get(size)
+    if not entry or not entry.get(kind):
+        return None
+    return default_storage.url(entry[kind])
+
+
+def srcset(variants, kind='webp'):
+    """Attribut srcset listant toutes les tailles disponibles ("url 400w, url 800w")"""
+    candidates, widths = [], set()
+    for size in IMAGE_SIZES:
+        entry = (variants or {}).get(size)
+        # Une petite source donne plusieurs tailles identiques (pas d'agrandissement)
+        if entry and entry.get(kind) and entry['width'] not in widths:
+            widths.add(entry['width'])
+            candidates.append(f"{default_storage.url(entry[kind])} {entry['width']}w")
+    return ', '.join(candidates)
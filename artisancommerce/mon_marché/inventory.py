@@ -0,0 +1,76 @@
+# inventory.py - Réservation et libération du stock des commandes
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .models import Commande, Product
+
+
+class InsufficientStock(Exception):
+    def __init__(self, products):
+        self.products = products
+        names = ', '.join(product.title for product in products)
+        super().__init__(f"Stock insuffisant pour : {names}")
+
+
+def _quantity_case(quantities):
+    return Case(
+        *[When(id=product_id, then=Value(quantity)) for product_id, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+
+def reserve_stock(quantities):
+    """
+    Décrémente le stock de toutes les lignes {product_id: quantité} en un seul
+    UPDATE conditionnel : SET stock = stock - q WHERE id IN (...) AND stock >= q.
+    Chaque ligne est vérifiée et décrémentée atomiquement par la base, sans
+    verrou global ; si une ligne manque de stock, toute la réservation est
+    annulée et InsufficientStock est levée. Doit être appelée dans une transaction.
+    """
+    quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+    if not quantities:
+        return
+    quantity = _quantity_case(quantities)
+    try:
+        with transaction.atomic():
+            updated = Product.objects.filter(
+                id__in=quantities.keys(),
+                stock__gte=quantity,
+            ).update(stock=F('stock') - quantity)
+            if updated != len(quantities):
+                # Annule le décrément déjà appliqué aux autres lignes
+                raise InsufficientStock([])
+    except InsufficientStock:
+        short = Product.objects.filter(id__in=quantities.keys()).exclude(stock__gte=quantity)
+        raise InsufficientStock(list(short.only('id', 'title')))
+
+
+def order_quantities(commande):
+    """Quantités {product_id: quantité} d'une commande"""
+    quantities = {}
+    for item in commande.items or []:
+        try:
+            product_id = int(item.get('product_id'))
+            quantity = int(item.get('quantity', 0))
+        except (TypeError, ValueError):
+            continue
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return quantities
+
+
+def release_stock(commande):
+    """
+    Remet en stock les quantités d'une commande annulée ou dont le paiement a
+    échoué. Idempotent : le drapeau stock_reserved est basculé par un UPDATE
+    conditionnel, une seule libération peut donc réussir.
+    """
+    with transaction.atomic():
+        released = Commande.objects.filter(pk=commande.pk, stock_reserved=True).update(stock_reserved=False)
+        if not released:
+            return False
+        commande.stock_reserved = False
+        quantities = {pid: q for pid, q in order_quantities(commande).items() if q > 0}
+        if quantities:
+            quantity = _quantity_case(quantities)
+            Product.objects.filter(id__in=quantities.keys()).update(stock=F('stock') + quantity)
+    return True
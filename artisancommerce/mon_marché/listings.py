@@ -0,0 +1,113 @@
+# listings.py - Requêtes des pages catalogue, partagées par les vues sync et async
+from django.db.models import Subquery
+
+from .models import Product
+from .pagination import SORT_ORDERINGS, CursorPaginator
+from .search import search_products
+
+INDEX_PER_PAGE = 8
+PRODUCTS_PER_PAGE = 12
+
+# Tri de la page de recherche (non paginée)
+SEARCH_ORDERINGS = {
+    'relevance': ('-search_rank', '-date_ajout'),
+    'price-asc': ('price',),
+    'price-desc': ('-price',),
+    'name': ('title',),
+    'newest': ('-date_ajout',),
+}
+
+
+def active_products():
+    return Product.objects.filter(is_active=True).select_related('Categorie')
+
+
+def index_listing(params):
+    """Produits de l'accueil : (paginateur, recherche)"""
+    product_list = active_products()
+    search_query = params.get('search', '')
+    if search_query:
+        product_list = search_products(product_list, search_query)
+    ordering = SORT_ORDERINGS['relevance' if search_query else 'newest']
+    return CursorPaginator(product_list, INDEX_PER_PAGE, ordering), search_query
+
+
+def products_listing(params):
+    """Page produits : (paginateur, catégorie, recherche, tri)"""
+    product_list = active_products()
+
+    category_id = params.get('category')
+    if category_id and not category_id.isdigit():
+        category_id = None
+    if category_id:
+        product_list = product_list.filter(Categorie_id=category_id)
+
+    search = params.get('search', '')
+    if search:
+        product_list = search_products(product_list, search)
+
+    # Tri (par pertinence par défaut lors d'une recherche)
+    sort_by = params.get('sort', 'relevance' if search else 'newest')
+    if sort_by not in SORT_ORDERINGS or (sort_by == 'relevance' and not search):
+        sort_by = 'newest'
+
+    paginator = CursorPaginator(product_list, PRODUCTS_PER_PAGE, SORT_ORDERINGS[sort_by])
+    return paginator, category_id, search, sort_by
+
+
+def search_listing(params):
+    """Page de recherche : (produits triés, requête, catégories choisies, tri)"""
+    query = params.get('q', '').strip()
+    products = active_products()
+    if query:
+        products = search_products(products, query, include_categories=True)
+
+    selected_categories = [cat for cat in params.get('categories', '').split(',') if cat.isdigit()]
+    if selected_categories:
+        products = products.filter(Categorie_id__in=selected_categories)
+
+    sort_by = params.get('sort', 'relevance' if query else 'newest')
+    if sort_by not in SEARCH_ORDERINGS or (sort_by == 'relevance' and not query):
+        sort_by = 'newest'
+    return products.order_by(*SEARCH_ORDERINGS[sort_by]), query, selected_categories, sort_by
+
+
+def same_category_products(product_id, category_id=None, limit=4, exclude=()):
+    """
+    Produits de la même catégorie. Sans ``category_id``, la catégorie est lue
+    par sous-requête : la requête ne dépend pas du chargement du produit.
+    """
+    if category_id is None:
+        category_id = Subquery(Product.objects.filter(pk=product_id).values('Categorie_id')[:1])
+    return Product.objects.filter(
+        Categorie_id=category_id,
+        is_active=True,
+    ).exclude(id__in=[product_id, *exclude])[:limit]
+
+
+def neighbour_products(product_id, limit=4):
+    """Produits souvent achetés avec celui-ci (table ProductNeighbour, index (product, rank))"""
+    return Product.objects.filter(
+        neighbour_of__product_id=product_id,
+        is_active=True,
+    ).order_by('neighbour_of__rank')[:limit]
+
+
+def related_products(product_id, category_id=None, limit=4):
+    """Achats conjoints précalculés, complétés par la même catégorie s'il en manque"""
+    related = list(neighbour_products(product_id, limit))
+    if len(related) < limit:
+        related += same_category_products(
+            product_id, category_id, limit - len(related), exclude=[product.id for product in related]
+        )
+    return related
+
+
+async def arelated_products(product_id, category_id=None, limit=4):
+    """Version async de related_products"""
+    related = [product async for product in neighbour_products(product_id, limit)]
+    if len(related) < limit:
+        related += [product async for product in same_category_products(
+            product_id, category_id, limit - len(related), exclude=[product.id for product in related]
+        )]
+    return related
@@ -0,0 +1,121 @@
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+DEFAULT_PATHS = ['/', '/products/', '/products/?sort=price-asc', '/search/?q=a']
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare le débit des pages catalogue en WSGI (vues sync, N threads) et "
+        "en ASGI (vues async, N requêtes concurrentes sur une boucle) dans le "
+        "processus, avec le même nombre de workers. Pour une mesure de bout en "
+        "bout, lancer gunicorn -w N artisancommerce.wsgi et uvicorn --workers N "
+        "artisancommerce.asgi:application avec un outil de charge externe."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['wsgi', 'asgi', 'both'], default='both')
+        parser.add_argument('--workers', type=int, default=8, help="Threads (WSGI) ou tâches concurrentes (ASGI)")
+        parser.add_argument('--requests', type=int, default=400, help="Requêtes par mode")
+        parser.add_argument('--path', action='append', dest='paths', help="Page à mesurer (répétable)")
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        if options['mode'] == 'both':
+            # Un processus par mode : ASYNC_CATALOG_VIEWS est lu au chargement des URL
+            for mode in ('wsgi', 'asgi'):
+                command = [sys.executable, sys.argv[0], 'bench_catalog', '--mode', mode,
+                           '--workers', str(options['workers']), '--requests', str(options['requests'])]
+                for path in paths:
+                    command += ['--path', path]
+                env = dict(os.environ, ASYNC_CATALOG_VIEWS='1' if mode == 'asgi' else '0')
+                subprocess.run(command, env=env, check=True)
+            return
+
+        if 'testserver' not in settings.ALLOWED_HOSTS:
+            settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+        expected = options['mode'] == 'asgi'
+        if settings.ASYNC_CATALOG_VIEWS != expected:
+            self.stderr.write("Attention : ASYNC_CATALOG_VIEWS ne correspond pas au mode mesuré")
+
+        urls = [paths[i % len(paths)] for i in range(options['requests'])]
+        runner = self._run_asgi if options['mode'] == 'asgi' else self._run_wsgi
+        # Tour de chauffe (caches, connexions) non mesuré
+        runner(paths, options['workers'])
+        start = time.perf_counter()
+        latencies, errors = runner(urls, options['workers'])
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(
+            f"{options['mode'].upper():4} workers={options['workers']} requêtes={len(urls)} "
+            f"débit={len(urls) / elapsed:.1f} req/s "
+            f"p50={statistics.median(latencies) * 1000:.1f}ms "
+            f"p95={percentile(latencies, 0.95) * 1000:.1f}ms "
+            f"erreurs={errors}"
+        )
+
+    def _run_wsgi(self, urls, workers):
+        from django.db import connections
+        from django.test import Client
+
+        latencies, errors, lock = [], [], threading.Lock()
+        queue = list(reversed(urls))
+
+        def worker():
+            client = Client()
+            while True:
+                with lock:
+                    if not queue:
+                        break
+                    url = queue.pop()
+                started = time.perf_counter()
+                response = client.get(url)
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+                    if response.status_code >= 400:
+                        errors.append(url)
+            connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, len(errors)
+
+    def _run_asgi(self, urls, workers):
+        from django.test import AsyncClient
+
+        async def main():
+            latencies, errors = [], []
+            queue = asyncio.Queue()
+            for url in urls:
+                queue.put_nowait(url)
+
+            async def worker():
+                client = AsyncClient()
+                while not queue.empty():
+                    url = queue.get_nowait()
+                    started = time.perf_counter()
+                    response = await client.get(url)
+                    latencies.append(time.perf_counter() - started)
+                    if response.status_code >= 400:
+                        errors.append(url)
+
+            await asyncio.gather(*(worker() for _ in range(workers)))
+            return latencies, len(errors)
+
+        return asyncio.run(main())
@@ -0,0 +1,73 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from contextlib import closing
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare le débit des validations de commande concurrentes selon le profil de base "
+        "de données (DATABASE_PROFILE). Chaque profil SQLite travaille sur sa propre copie "
+        "de la base source (remise en journal DELETE) ; le profil postgres utilise la base "
+        "configurée par POSTGRES_* telle quelle. Les mesures sont faites par bench_storefront "
+        "avec le seul scénario checkout, dans un processus par profil."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='sqlite-basic,sqlite',
+                            help="Profils à comparer, séparés par des virgules (sqlite-basic, sqlite, postgres)")
+        parser.add_argument('--source', help="Base SQLite à copier (défaut : SQLITE_PATH)")
+        parser.add_argument('--concurrency', type=int, default=8, help="Clients simultanés")
+        parser.add_argument('--requests', type=int, default=400, help="Commandes par profil")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        profiles = [profile.strip() for profile in options['profiles'].split(',') if profile.strip()]
+        source = Path(options['source'] or settings.SQLITE_PATH)
+        if any(profile.startswith('sqlite') for profile in profiles) and not source.exists():
+            raise CommandError(f"Base source introuvable : {source}")
+
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for profile in profiles:
+                env = dict(os.environ, DATABASE_PROFILE=profile)
+                if profile.startswith('sqlite'):
+                    env['SQLITE_PATH'] = str(self._copy(source, Path(directory) / f'{profile}.sqlite3'))
+                output = Path(directory) / f'{profile}.json'
+                command = [
+                    sys.executable, sys.argv[0], 'bench_storefront', '--mix', 'checkout=1',
+                    '--concurrency', str(options['concurrency']), '--requests', str(options['requests']),
+                    '--seed', str(options['seed']), '--warmup', '20', '--output', str(output),
+                ]
+                self.stdout.write(f"Profil {profile}...")
+                completed = subprocess.run(command, env=env, capture_output=True, text=True)
+                if completed.returncode or not output.exists():
+                    self.stderr.write(f"Profil {profile} : échec\n{completed.stderr.strip()[-2000:]}")
+                    continue
+                results[profile] = json.loads(output.read_text())
+
+        self.stdout.write(
+            f"\n{'profil':14} {'réussies/s':>11} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'erreurs':>8}"
+        )
+        for profile, result in results.items():
+            total = result['total']
+            # Un échec ("database is locked") est rapide : seul le débit des commandes réussies compte
+            succeeded = result['throughput'] * (total['requests'] - total['errors']) / total['requests']
+            self.stdout.write(
+                f"{profile:14} {succeeded:11.1f} {total['p50_ms']:9.1f} {total['p95_ms']:9.1f} "
+                f"{total['p99_ms']:9.1f} {total['errors']:8}"
+            )
+
+    def _copy(self, source, target):
+        """Copie cohérente (API de sauvegarde SQLite), en journal DELETE comme une base neuve"""
+        with closing(sqlite3.connect(source)) as src, closing(sqlite3.connect(target)) as dst:
+            src.backup(dst)
+            dst.execute('PRAGMA journal_mode = DELETE')
+        return target
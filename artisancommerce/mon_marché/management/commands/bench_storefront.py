@@ -0,0 +1,210 @@
+import json
+import random
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.utils import timezone
+
+from mon_marché.metrics import QueryCollector
+from mon_marché.models import Product
+from mon_marché.pagination import SORT_ORDERINGS
+
+from .bench_catalog import percentile
+
+# Répartition par défaut des requêtes (poids)
+DEFAULT_MIX = 'home=20,products=25,detail=30,search=15,checkout=10'
+SAMPLE_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = (
+        "Rejoue un mélange des pages les plus sollicitées (accueil, liste triée, détail, "
+        "recherche, validation de commande) et affiche p50/p95/p99 et requêtes SQL par "
+        "page. La séquence d'URL dépend de --seed : deux exécutions sur les mêmes données "
+        "sont comparables (--output puis --compare). La validation de commande crée des "
+        "commandes : lancer sur une base de test (voir seed_synthetic)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=1, help="Threads clients")
+        parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Poids par scénario (défaut : {DEFAULT_MIX})")
+        parser.add_argument('--warmup', type=int, default=50, help="Requêtes de chauffe non mesurées")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help="Enregistre les résultats (JSON)")
+        parser.add_argument('--compare', help="Résultats d'une exécution précédente à comparer")
+
+    def handle(self, *args, **options):
+        if 'testserver' not in settings.ALLOWED_HOSTS:
+            settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+        mix = self._parse_mix(options['mix'])
+        rng = random.Random(options['seed'])
+        self._load_samples(rng, 'checkout' in mix)
+
+        names, weights = zip(*mix.items())
+        plan = [self._request(rng, name) for name in rng.choices(names, weights, k=options['requests'])]
+        warmup = [self._request(rng, name) for name in names] * max(options['warmup'] // len(names), 1)
+
+        self._run(warmup, options['concurrency'])
+        started = time.perf_counter()
+        samples = self._run(plan, options['concurrency'])
+        elapsed = time.perf_counter() - started
+
+        results = {
+            'date': timezone.now().isoformat(),
+            'options': {key: options[key] for key in ('requests', 'concurrency', 'mix', 'seed')},
+            'throughput': round(len(plan) / elapsed, 1),
+            'scenarios': {name: self._summary(samples[name]) for name in names if samples.get(name)},
+            'total': self._summary([sample for name in names for sample in samples.get(name, [])]),
+        }
+        previous = self._load_previous(options['compare'])
+        self._report(results, previous)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+
+    # ==================== PLAN DE REQUÊTES ====================
+
+    def _parse_mix(self, value):
+        mix = {}
+        for part in value.split(','):
+            name, _, weight = part.partition('=')
+            if name not in ('home', 'products', 'detail', 'search', 'checkout'):
+                raise CommandError(f"Scénario inconnu : {name}")
+            try:
+                mix[name] = float(weight or 1)
+            except ValueError:
+                raise CommandError(f"Poids invalide : {part}")
+        return mix
+
+    def _load_samples(self, rng, checkout):
+        """Échantillon de produits et de comptes, tiré une fois pour toute l'exécution"""
+        active = Product.objects.filter(is_active=True).order_by('id')
+        rows = list(active.values_list('id', 'title', 'Categorie_id', 'stock'))
+        if not rows:
+            raise CommandError("Aucun produit actif : lancer d'abord seed_synthetic")
+        rows = rng.sample(rows, min(SAMPLE_SIZE, len(rows)))
+        self.product_ids = [row[0] for row in rows]
+        self.category_ids = sorted({row[2] for row in rows})
+        self.search_terms = sorted({word.lower() for row in rows for word in row[1].split() if len(word) > 3})
+        self.in_stock = [row[0] for row in rows if row[3] >= 10] or self.product_ids
+        self.users = []
+        if checkout:
+            self.users = list(User.objects.filter(is_active=True).order_by('id').values_list('id', flat=True)[:200])
+            if not self.users:
+                raise CommandError("Aucun utilisateur pour le scénario checkout")
+
+    def _request(self, rng, name):
+        """(scénario, méthode, URL, corps JSON)"""
+        if name == 'home':
+            return name, 'get', '/', None
+        if name == 'products':
+            url = f"/products/?sort={rng.choice(sorted(set(SORT_ORDERINGS) - {'relevance'}))}"
+            if rng.random() < 0.4:
+                url += f'&category={rng.choice(self.category_ids)}'
+            return name, 'get', url, None
+        if name == 'detail':
+            return name, 'get', f'/detail/{rng.choice(self.product_ids)}/', None
+        if name == 'search':
+            return name, 'get', f'/search/?q={rng.choice(self.search_terms)}', None
+        body = {
+            'items': [{'product_id': product_id, 'quantity': 1}
+                      for product_id in rng.sample(self.in_stock, min(rng.randint(1, 3), len(self.in_stock)))],
+            'payment_method': rng.choice(('wave', 'orange', 'cash')),
+            'name': 'Client Benchmark',
+            'phone': '0700000000',
+            'address': 'Cocody, rue 1',
+            'ville': 'Abidjan',
+        }
+        return name, 'post', '/checkout/process/', json.dumps(body)
+
+    # ==================== EXÉCUTION ====================
+
+    def _run(self, plan, concurrency):
+        """Exécute le plan ; retourne {scénario: [(durée, requêtes SQL, erreur)]}"""
+        samples, lock = {}, threading.Lock()
+        queue = list(reversed(plan))
+
+        def worker(index):
+            client = Client(raise_request_exception=False)
+            if self.users:
+                client.force_login(User.objects.get(pk=self.users[index % len(self.users)]))
+            while True:
+                with lock:
+                    if not queue:
+                        break
+                    name, method, url, body = queue.pop()
+                collector = QueryCollector()
+                started = time.perf_counter()
+                with collector.install():
+                    if method == 'post':
+                        response = client.post(url, body, content_type='application/json')
+                    else:
+                        response = client.get(url)
+                duration = time.perf_counter() - started
+                with lock:
+                    samples.setdefault(name, []).append((duration, collector.count, response.status_code >= 400))
+            connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return samples
+
+    # ==================== RÉSULTATS ====================
+
+    def _summary(self, samples):
+        durations = [duration * 1000 for duration, _, _ in samples]
+        queries = [count for _, count, _ in samples]
+        return {
+            'requests': len(samples),
+            'errors': sum(1 for _, _, error in samples if error),
+            'p50_ms': round(statistics.median(durations), 2),
+            'p95_ms': round(percentile(durations, 0.95), 2),
+            'p99_ms': round(percentile(durations, 0.99), 2),
+            'queries_mean': round(statistics.mean(queries), 2),
+            'queries_max': max(queries),
+        }
+
+    def _load_previous(self, path):
+        if not path:
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Impossible de lire {path} : {e}")
+
+    def _report(self, results, previous):
+        header = f"{'scénario':10} {'req':>6} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'SQL moy':>8} {'SQL max':>8}"
+        self.stdout.write(header)
+        rows = [*results['scenarios'].items(), ('total', results['total'])]
+        for name, summary in rows:
+            self.stdout.write(
+                f"{name:10} {summary['requests']:6} {summary['errors']:4} {summary['p50_ms']:9.1f} "
+                f"{summary['p95_ms']:9.1f} {summary['p99_ms']:9.1f} {summary['queries_mean']:8.1f} "
+                f"{summary['queries_max']:8}"
+            )
+            before = (previous or {}).get('scenarios', {}).get(name) if name != 'total' else (previous or {}).get('total')
+            if before:
+                self.stdout.write("  vs précédent : " + ", ".join(
+                    f"{key} {self._delta(before[key], summary[key])}"
+                    for key in ('p50_ms', 'p95_ms', 'p99_ms', 'queries_mean')
+                ))
+        self.stdout.write(f"Débit : {results['throughput']} req/s")
+        if previous:
+            self.stdout.write(f"Débit précédent : {previous['throughput']} req/s")
+
+    @staticmethod
+    def _delta(before, after):
+        if not before:
+            return f"{before} -> {after}"
+        return f"{(after - before) / before * 100:+.1f}%"
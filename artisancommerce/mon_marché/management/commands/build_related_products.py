@@ -0,0 +1,45 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from mon_marché import co_purchase
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule les produits achetés ensemble (table ProductNeighbour) à partir des "
+        "lignes des commandes vendues : top-K par produit, classés par similarité cosinus. "
+        "La page détail les affiche avant les produits de la même catégorie."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=co_purchase.TOP_K, help="Voisins gardés par produit")
+        parser.add_argument('--min-support', type=int, default=co_purchase.MIN_SUPPORT,
+                            help="Commandes communes minimum pour un couple")
+        parser.add_argument('--max-basket', type=int, default=co_purchase.MAX_BASKET,
+                            help="Commandes de plus de N produits ignorées")
+        parser.add_argument('--days', type=int, help="Seulement les commandes des N derniers jours")
+        parser.add_argument('--background', action='store_true',
+                            help="Met le recalcul en file (réglages par défaut) au lieu de l'exécuter")
+
+    def handle(self, *args, **options):
+        if options['top_k'] < 1 or options['min_support'] < 1:
+            raise CommandError("--top-k et --min-support doivent être positifs")
+        if options['background']:
+            co_purchase.rebuild_neighbours.delay(top_k=options['top_k'], min_support=options['min_support'])
+            self.stdout.write("Recalcul mis en file")
+            return
+
+        since = timezone.now() - timedelta(days=options['days']) if options['days'] else None
+        started = time.perf_counter()
+        products, written = co_purchase.build_neighbours(
+            top_k=options['top_k'],
+            min_support=options['min_support'],
+            max_basket=options['max_basket'],
+            since=since,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{written} voisin(s) pour {products} produit(s) en {time.perf_counter() - started:.1f}s"
+        ))
@@ -0,0 +1,53 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mon_marché import catalog_io
+from mon_marché.models import Product
+
+
+class Command(BaseCommand):
+    help = "Exporte les produits en CSV ou JSONL (format relu par catalog_import)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier de sortie (- pour la sortie standard)")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Déduit de l'extension par défaut")
+        parser.add_argument('--active-only', action='store_true', help="Produits actifs uniquement")
+        parser.add_argument('--category', help="Nom de la catégorie à exporter")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Lignes lues par requête")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = catalog_io.detect_format(path, options['format'])
+
+        products = Product.objects.all()
+        if options['active_only']:
+            products = products.filter(is_active=True)
+        if options['category']:
+            products = products.filter(Categorie__name__iexact=options['category'])
+
+        try:
+            stream = catalog_io.open_output(path)
+        except OSError as e:
+            raise CommandError(f"Impossible d'écrire {path} : {e}")
+
+        started = time.monotonic()
+        progress = None
+        if options['verbosity'] > 1 and path != '-':
+            progress = lambda count: self.stdout.write(f"{count} ligne(s)")
+        try:
+            count = catalog_io.export_rows(
+                products, catalog_io.RowWriter(stream, fmt),
+                chunk_size=options['chunk_size'], progress=progress,
+            )
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+        if path != '-':
+            elapsed = time.monotonic() - started
+            rate = count / elapsed if elapsed else 0
+            self.stdout.write(self.style.SUCCESS(
+                f"{count} produit(s) exporté(s) en {elapsed:.1f} s ({rate:.0f} lignes/s)"
+            ))
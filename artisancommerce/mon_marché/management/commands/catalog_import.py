@@ -0,0 +1,52 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from mon_marché import catalog_io
+
+
+class Command(BaseCommand):
+    help = "Importe des produits depuis un fichier CSV ou JSONL (création ou mise à jour par slug)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier à importer (- pour l'entrée standard)")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Déduit de l'extension par défaut")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Lignes par lot (une transaction par lot)")
+        parser.add_argument('--create-categories', action='store_true',
+                            help="Crée les catégories inconnues au lieu de rejeter les lignes")
+        parser.add_argument('--max-errors', type=int, default=20, help="Erreurs détaillées affichées")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = catalog_io.detect_format(path, options['format'])
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size doit être positif")
+        try:
+            stream = catalog_io.open_input(path)
+        except OSError as e:
+            raise CommandError(f"Impossible de lire {path} : {e}")
+
+        try:
+            stats = catalog_io.import_rows(
+                catalog_io.read_rows(stream, fmt),
+                batch_size=options['batch_size'],
+                create_categories=options['create_categories'],
+                progress=self._progress if options['verbosity'] > 1 else None,
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for line_number, message in stats.errors[:options['max_errors']]:
+            self.stderr.write(f"Ligne {line_number} : {message}")
+        if len(stats.errors) > options['max_errors']:
+            self.stderr.write(f"... et {len(stats.errors) - options['max_errors']} autre(s) erreur(s)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats.rows} ligne(s) en {stats.elapsed:.1f} s ({stats.rate:.0f} lignes/s) : "
+            f"{stats.created} créé(s), {stats.updated} mis à jour, {stats.unchanged} inchangé(s), "
+            f"{len(stats.errors)} erreur(s)"
+        ))
+
+    def _progress(self, stats):
+        self.stdout.write(f"{stats.rows} ligne(s) ({stats.rate:.0f} lignes/s)")
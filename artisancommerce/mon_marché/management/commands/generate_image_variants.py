@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from mon_marché import images
+from mon_marché.models import Categorie, Product, UserProfile
+
+IMAGE_MODELS = [(Product, 'image'), (Categorie, 'image'), (UserProfile, 'profile_pic')]
+
+
+class Command(BaseCommand):
+    help = "Génère les miniatures et variantes WebP des images existantes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Régénère aussi les images déjà traitées")
+        parser.add_argument('--now', action='store_true', help="Traite ici au lieu de passer par les workers")
+
+    def handle(self, *args, **options):
+        jobs = []
+        for model, field_name in IMAGE_MODELS:
+            rows = model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            for pk, name, variants in rows.values_list('pk', field_name, 'image_variants').iterator():
+                if options['force'] or (variants or {}).get('source') != name:
+                    jobs.append((model._meta.label, pk, field_name))
+
+        if not options['now']:
+            for job in jobs:
+                images.process_image.delay(*job)
+            self.stdout.write(self.style.SUCCESS(f"{len(jobs)} image(s) mise(s) en file pour les workers"))
+            return
+
+        failed = 0
+        for job in jobs:
+            try:
+                images.process_image(*job)
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"{job[0]} #{job[1]} : {e}")
+        self.stdout.write(self.style.SUCCESS(f"{len(jobs) - failed} image(s) traitée(s), {failed} échec(s)"))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from mon_marché.payments import process_pending_events
+
+
+class Command(BaseCommand):
+    help = "Applique les notifications de paiement en attente (rattrapage du worker)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true', help="Tourne en continu")
+        parser.add_argument('--interval', type=float, default=5.0, help="Pause entre deux passages (secondes)")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending_events(batch_size=options['batch_size'])
+            if processed or not options['loop']:
+                self.stdout.write(f"{processed} événement(s) traité(s)")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
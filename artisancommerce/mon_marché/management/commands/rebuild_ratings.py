@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from mon_marché.models import Product, ProductReview
+
+AGGREGATE_FIELDS = ['review_count', 'rating_sum'] + [f'rating_{stars}_count' for stars in range(1, 6)]
+
+
+class Command(BaseCommand):
+    help = "Recalcule les agrégats d'avis (nombre, somme, histogramme) de tous les produits"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        # Une seule requête groupée : (produit, note) -> nombre d'avis
+        histograms = {}
+        rows = ProductReview.objects.values('product_id', 'rating').annotate(n=Count('id')).order_by()
+        for row in rows:
+            histograms.setdefault(row['product_id'], []).append((row['rating'], row['n']))
+
+        # bulk_update n'a besoin que de la clé primaire et des champs à écrire
+        updated = []
+        for product_id, histogram in histograms.items():
+            product = Product(id=product_id, **{field: 0 for field in AGGREGATE_FIELDS})
+            for rating, count in histogram:
+                product.review_count += count
+                product.rating_sum += rating * count
+                field = Product.rating_field(rating)
+                setattr(product, field, getattr(product, field) + count)
+            updated.append(product)
+
+        with transaction.atomic():
+            Product.objects.update(**{field: 0 for field in AGGREGATE_FIELDS})
+            Product.objects.bulk_update(updated, AGGREGATE_FIELDS, batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f"Agrégats recalculés pour {len(updated)} produit(s)"))
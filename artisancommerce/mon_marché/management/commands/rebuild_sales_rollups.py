@@ -0,0 +1,35 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from mon_marché import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcule les statistiques de ventes journalières (SalesRollup) d'une plage de "
+        "jours, par défaut depuis la première commande. À lancer après une importation "
+        "en masse ou pour réparer une période ; les commandes suivantes sont comptées au fil de l'eau."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, help="Premier jour (AAAA-MM-JJ)")
+        parser.add_argument('--until', type=date.fromisoformat, help="Dernier jour inclus (défaut : aujourd'hui)")
+        parser.add_argument('--days', type=int, help="Les N derniers jours (au lieu de --since)")
+
+    def handle(self, *args, **options):
+        since, until = options['since'], options['until']
+        if options['days']:
+            if since:
+                raise CommandError("--days et --since sont incompatibles")
+            since = timezone.localdate() - timedelta(days=options['days'] - 1)
+        if since and until and since > until:
+            raise CommandError("--since doit précéder --until")
+
+        def progress(day, written):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {day} : {written} ligne(s)")
+
+        written = rollups.rebuild(since, until, progress=progress)
+        self.stdout.write(self.style.SUCCESS(f"{written} ligne(s) d'agrégats écrites"))
@@ -0,0 +1,95 @@
+import logging
+import multiprocessing
+import os
+import signal
+
+from django.core.management.base import BaseCommand
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_loop(index, stop_event, poll_interval, burst):
+    """Boucle d'un processus worker : réclame et exécute les tâches une par une"""
+    import django
+    from django.apps import apps
+    from django.db import DatabaseError, connections
+
+    if not apps.ready:
+        # Démarrage "spawn" : le processus enfant repart de zéro
+        django.setup()
+    # Démarrage "fork" : ne jamais réutiliser la connexion du parent
+    connections.close_all()
+    # Ctrl-C est géré par le parent, qui laisse finir la tâche en cours
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    from mon_marché import tasks
+
+    worker_id = tasks.worker_id(index)
+    while not stop_event.is_set():
+        try:
+            ran = tasks.run_next(worker_id)
+        except DatabaseError:
+            logger.exception("Erreur de base de données dans le worker %s", worker_id)
+            connections.close_all()
+            ran = False
+        if not ran:
+            if burst:
+                break
+            stop_event.wait(poll_interval)
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Lance des processus workers qui exécutent la file de tâches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=os.cpu_count() or 2,
+                            help="Nombre de processus workers")
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Attente (secondes) quand la file est vide")
+        parser.add_argument('--burst', action='store_true',
+                            help="S'arrête dès que la file est vide")
+
+    def handle(self, *args, **options):
+        from django.db import connections
+
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+        stop_event = context.Event()
+
+        def stop(signum, frame):
+            self.stdout.write("Arrêt demandé, fin des tâches en cours...")
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+        connections.close_all()
+
+        def start(index):
+            process = context.Process(
+                target=_worker_loop,
+                args=(index, stop_event, options['poll_interval'], options['burst']),
+                name=f'worker-{index}',
+                daemon=False,
+            )
+            process.start()
+            return process
+
+        concurrency = max(options['concurrency'], 1)
+        processes = {index: start(index) for index in range(concurrency)}
+        self.stdout.write(f"{concurrency} worker(s) démarré(s)")
+
+        while processes:
+            for index, process in list(processes.items()):
+                process.join(timeout=0.5)
+                if process.is_alive():
+                    continue
+                del processes[index]
+                # Un worker mort hors arrêt demandé est relancé ; sa tâche sera
+                # reprise par un autre après le délai de visibilité
+                if process.exitcode != 0 and not stop_event.is_set() and not options['burst']:
+                    self.stderr.write(f"Worker {index} arrêté (code {process.exitcode}), relance")
+                    processes[index] = start(index)
+
+        self.stdout.write("Workers arrêtés")
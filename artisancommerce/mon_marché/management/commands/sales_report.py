@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from mon_marché import reports
+
+
+class Command(BaseCommand):
+    help = "Affiche les meilleures ventes, le chiffre d'affaires par jour et les stocks à surveiller"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help="Période analysée (jours)")
+        parser.add_argument('--limit', type=int, default=10)
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(days=options['days'])
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Meilleures ventes"))
+        for row in reports.best_sellers(limit=options['limit'], since=since):
+            self.stdout.write(f"  {row['product__title']:<40} {row['units']:>6} unités  {row['revenue']:>12} F CFA")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Chiffre d'affaires par jour (commandes payées)"))
+        for row in reports.revenue_by_day(since=since):
+            self.stdout.write(f"  {row['day']}  {row['revenue']:>12} F CFA  {row['units']:>6} unités")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Stocks à surveiller"))
+        for row in reports.stock_report(since=since):
+            self.stdout.write(f"  {row['title']:<40} stock {row['stock']:>5}  vendus {row['units_sold']:>5}")
@@ -0,0 +1,339 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from mon_marché import catalog, rollups, search
+from mon_marché.cart import SHIPPING_COST
+from mon_marché.catalog_io import SlugAllocator
+from mon_marché.models import (Categorie, Commande, Favorite, OrderLine, Product, ProductReview,
+                               ShippingAddress, UserProfile)
+
+# Vocabulaire des données générées
+CATEGORIES = ['Vannerie', 'Textile', 'Poterie', 'Bijoux', 'Sculpture', 'Maroquinerie',
+              'Décoration', 'Mode', 'Beauté naturelle', 'Épicerie fine', 'Musique', 'Art mural']
+OBJECTS = ['Panier', 'Pagne', 'Masque', 'Bracelet', 'Collier', 'Vase', 'Sac', 'Tabouret',
+           'Statuette', 'Boucles d’oreilles', 'Coussin', 'Nappe', 'Djembé', 'Savon', 'Beurre de karité',
+           'Sandales', 'Chemise', 'Tableau', 'Bol', 'Lampe']
+MATERIALS = ['en raphia', 'en wax', 'en bois d’ébène', 'en terre cuite', 'en perles', 'en bronze',
+             'en cuir', 'en kente', 'en bogolan', 'en rotin', 'en coton tissé', 'en calebasse']
+STYLES = ['traditionnel', 'moderne', 'baoulé', 'sénoufo', 'dan', 'artisanal', 'fait main', 'brodé']
+FIRST_NAMES = ['Aya', 'Konan', 'Adjoua', 'Yao', 'Awa', 'Kouassi', 'Mariam', 'Koffi', 'Fatou',
+               'Ibrahim', 'Affoué', 'Seydou', 'Amenan', 'Moussa', 'Akissi', 'Drissa']
+LAST_NAMES = ['Kouamé', 'Traoré', 'Koné', 'Yao', 'Ouattara', 'Diabaté', 'Kouadio', 'Bamba',
+              'Coulibaly', 'N’Guessan', 'Touré', 'Assi', 'Gbagbo', 'Fofana']
+CITIES = ['Abidjan', 'Bouaké', 'Yamoussoukro', 'San-Pédro', 'Daloa', 'Korhogo', 'Man', 'Gagnoa']
+DISTRICTS = ['Cocody', 'Plateau', 'Yopougon', 'Marcory', 'Treichville', 'Riviera', 'Angré', 'Koumassi']
+REVIEW_COMMENTS = ['Très belle pièce, conforme à la photo.', 'Livraison rapide, je recommande.',
+                   'Bonne qualité pour le prix.', 'Un peu plus petit que prévu.',
+                   'Magnifique travail artisanal.', 'Couleurs superbes.', 'Déçu par la finition.']
+
+# (statut paiement, statut commande, poids)
+ORDER_OUTCOMES = [
+    ('paid', 'delivered', 62), ('paid', 'shipped', 10), ('paid', 'confirmed', 6),
+    ('pending', 'pending', 9), ('failed', 'cancelled', 7), ('refunded', 'cancelled', 2),
+    ('pending', 'cancelled', 4),
+]
+PAYMENT_METHODS = [('wave', 50), ('orange', 30), ('cash', 20)]
+RATINGS = [(1, 5), (2, 7), (3, 15), (4, 35), (5, 38)]
+
+HISTORY_DAYS = 730
+PASSWORD = 'synthetic'
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """bulk_create conserve les dates générées (auto_now_add les remplacerait par maintenant)"""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _field(model, name):
+    return model._meta.get_field(name)
+
+
+class Command(BaseCommand):
+    help = (
+        "Génère un jeu de données synthétique réaliste (catégories, produits, utilisateurs, "
+        f"adresses, favoris, avis, commandes) par bulk_create. Mot de passe des comptes : {PASSWORD!r}. "
+        "À lancer sur une base de test : les données s'ajoutent à l'existant."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--favorites', type=int, help="Favoris (défaut : 3 par utilisateur)")
+        parser.add_argument('--reviews', type=int, help="Avis (défaut : 2 par produit)")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42, help="Graine : même graine, mêmes données")
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.verbosity = options['verbosity']
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        self.prefix = f"synth{options['seed']}_"
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise CommandError(f"Des comptes {self.prefix}* existent déjà : choisir une autre --seed")
+
+        users = options['users']
+        products = options['products']
+        favorites = options['favorites'] if options['favorites'] is not None else users * 3
+        reviews = options['reviews'] if options['reviews'] is not None else products * 2
+        if (favorites or reviews) and not (users and products):
+            raise CommandError("Favoris et avis demandent des utilisateurs et des produits")
+
+        self._step("Catégories", self._categories)
+        self._step("Produits", self._products, products)
+        self._step("Utilisateurs, profils et adresses", self._users, users)
+        self._step("Favoris", self._favorites, min(favorites, users * products))
+        self._step("Avis", self._reviews, min(reviews, users * products))
+        if options['orders']:
+            if not (users and self.product_ids):
+                raise CommandError("Les commandes demandent des utilisateurs et des produits")
+            self._step("Commandes", self._orders, options['orders'])
+            # bulk_create sans signal : agrégats recalculés en SQL
+            self._step("Statistiques de ventes", rollups.rebuild)
+
+        self._step("Agrégats des avis", call_command, 'rebuild_ratings', stdout=self.stdout)
+        self._step("Index de recherche", search.rebuild_index)
+        catalog.bump_catalog_version()
+
+    def _step(self, label, func, *args, **kwargs):
+        started = time.monotonic()
+        count = func(*args, **kwargs)
+        elapsed = time.monotonic() - started
+        rate = f" ({count / elapsed:.0f}/s)" if isinstance(count, int) and elapsed else ''
+        done = f"{count} ligne(s) " if isinstance(count, int) else ''
+        self.stdout.write(f"{label} : {done}en {elapsed:.1f} s{rate}")
+
+    def _date(self, days=HISTORY_DAYS):
+        return self.now - timedelta(seconds=self.rng.randrange(days * 86400))
+
+    def _batched_create(self, model, objects):
+        """bulk_create par lots depuis un générateur ; retourne le nombre de lignes"""
+        count, batch = 0, []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) == self.batch_size:
+                model.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_create(batch)
+            count += len(batch)
+        return count
+
+    # ==================== CATALOGUE ====================
+
+    def _categories(self):
+        existing = set(Categorie.objects.filter(name__in=CATEGORIES).values_list('name', flat=True))
+        Categorie.objects.bulk_create([
+            Categorie(name=name, description=f"Artisanat ivoirien : {name.lower()}")
+            for name in CATEGORIES if name not in existing
+        ])
+        self.category_ids = list(Categorie.objects.filter(name__in=CATEGORIES).values_list('id', flat=True))
+        return len(CATEGORIES) - len(existing)
+
+    def _products(self, count):
+        slugs = SlugAllocator()
+        rng = self.rng
+
+        def generate():
+            for _ in range(count):
+                title = f"{rng.choice(OBJECTS)} {rng.choice(MATERIALS)} {rng.choice(STYLES)}"
+                price = Decimal(rng.randrange(2, 200) * 500)
+                yield Product(
+                    title=title,
+                    slug=slugs.allocate(title),
+                    price=price,
+                    old_price=price * Decimal('1.25') if rng.random() < 0.15 else None,
+                    description=f"{title.capitalize()}, réalisé par des artisans de {rng.choice(CITIES)}.",
+                    Categorie_id=rng.choice(self.category_ids),
+                    stock=0 if rng.random() < 0.05 else rng.randrange(1, 200),
+                    is_new=rng.random() < 0.1,
+                    is_active=rng.random() < 0.97,
+                    date_ajout=self._date(),
+                )
+
+        first_id = (Product.objects.order_by('-id').values_list('id', flat=True).first() or 0)
+        with explicit_dates(_field(Product, 'date_ajout')):
+            created = self._batched_create(Product, generate())
+
+        rows = Product.objects.filter(id__gt=first_id).values_list('id', 'title', 'price').order_by('id')
+        self.product_ids, self.products = [], {}
+        for product_id, title, price in rows.iterator(chunk_size=self.batch_size):
+            self.product_ids.append(product_id)
+            self.products[product_id] = (title, price)
+        # Popularité en loi de Zipf : quelques produits concentrent les ventes
+        ranked = self.product_ids[:]
+        rng.shuffle(ranked)
+        self.ranked_products = ranked
+        self.popularity = list(accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(ranked))))
+        return created
+
+    def _popular_products(self, k):
+        return self.rng.choices(self.ranked_products, cum_weights=self.popularity, k=k)
+
+    # ==================== UTILISATEURS ====================
+
+    def _users(self, count):
+        rng = self.rng
+        password = make_password(PASSWORD)
+
+        def generate():
+            for i in range(count):
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                yield User(
+                    username=f'{self.prefix}{i}',
+                    email=f'{self.prefix}{i}@example.com',
+                    first_name=first,
+                    last_name=last,
+                    password=password,
+                    date_joined=self._date(),
+                )
+
+        created = self._batched_create(User, generate())
+        self.user_ids = list(
+            User.objects.filter(username__startswith=self.prefix).order_by('id').values_list('id', flat=True)
+        )
+
+        def profiles():
+            for user_id in self.user_ids:
+                yield UserProfile(
+                    user_id=user_id,
+                    phone=f'07{rng.randrange(10**8):08d}',
+                    ville=rng.choice(CITIES),
+                    newsletter=rng.random() < 0.3,
+                )
+
+        def addresses():
+            for user_id in self.user_ids:
+                for n in range(rng.choice((1, 1, 1, 2, 3))):
+                    yield ShippingAddress(
+                        user_id=user_id,
+                        nom_complet=f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                        phone=f'07{rng.randrange(10**8):08d}',
+                        address=f"{rng.choice(DISTRICTS)}, rue {rng.randrange(1, 300)}",
+                        ville=rng.choice(CITIES),
+                        address_type=rng.choice(('domicile', 'bureau', 'autre')),
+                        is_default=n == 0,
+                        date_ajout=self._date(),
+                    )
+
+        self._batched_create(UserProfile, profiles())
+        with explicit_dates(_field(ShippingAddress, 'date_ajout')):
+            self._batched_create(ShippingAddress, addresses())
+        return created
+
+    def _pairs(self, count, products):
+        """Couples (utilisateur, produit) distincts"""
+        seen = set()
+        while len(seen) < count:
+            for product_id in products(self.batch_size):
+                pair = (self.rng.choice(self.user_ids), product_id)
+                if pair not in seen:
+                    seen.add(pair)
+                    yield pair
+                    if len(seen) == count:
+                        return
+
+    def _favorites(self, count):
+        def generate():
+            for user_id, product_id in self._pairs(count, self._popular_products):
+                yield Favorite(user_id=user_id, product_id=product_id, date_added=self._date())
+
+        with explicit_dates(_field(Favorite, 'date_added')):
+            return self._batched_create(Favorite, generate())
+
+    def _reviews(self, count):
+        ratings, weights = zip(*RATINGS)
+
+        def generate():
+            for user_id, product_id in self._pairs(count, self._popular_products):
+                yield ProductReview(
+                    user_id=user_id,
+                    product_id=product_id,
+                    rating=self.rng.choices(ratings, weights)[0],
+                    comment=self.rng.choice(REVIEW_COMMENTS),
+                    is_verified_purchase=self.rng.random() < 0.6,
+                    date_added=self._date(),
+                )
+
+        with explicit_dates(_field(ProductReview, 'date_added')):
+            return self._batched_create(ProductReview, generate())
+
+    # ==================== COMMANDES ====================
+
+    def _orders(self, count):
+        rng = self.rng
+        outcomes, outcome_weights = zip(*((o[:2], o[2]) for o in ORDER_OUTCOMES))
+        methods, method_weights = zip(*PAYMENT_METHODS)
+        # Numéros uniques sans passer par Commande.save : préfixe propre à la graine
+        run = rng.getrandbits(24)
+
+        created = 0
+        with explicit_dates(_field(Commande, 'date_commande')):
+            for start in range(0, count, self.batch_size):
+                commandes, lines = [], []
+                for n in range(start, min(start + self.batch_size, count)):
+                    date = self._date()
+                    payment_status, order_status = rng.choices(outcomes, outcome_weights)[0]
+                    items, order_lines, subtotal = [], [], Decimal(0)
+                    for product_id in set(self._popular_products(rng.choice((1, 1, 1, 2, 2, 3, 4)))):
+                        title, price = self.products[product_id]
+                        quantity = rng.choice((1, 1, 1, 2, 3))
+                        total = price * quantity
+                        subtotal += total
+                        items.append({'product_id': product_id, 'name': title, 'price': str(price),
+                                      'quantity': quantity, 'total': str(total)})
+                        order_lines.append(OrderLine(product_id=product_id, product_name=title,
+                                                     unit_price=price, quantity=quantity, line_total=total))
+                    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                    commande = Commande(
+                        order_number=f'CMD-{date.year}-{run:06X}{n:08X}',
+                        user_id=rng.choice(self.user_ids),
+                        items=items,
+                        subtotal=subtotal,
+                        shipping_cost=SHIPPING_COST,
+                        total=subtotal + SHIPPING_COST,
+                        nom=f'{first} {last}',
+                        email=f'{first.lower()}.{n}@example.com',
+                        phone=f'07{rng.randrange(10**8):08d}',
+                        address=f"{rng.choice(DISTRICTS)}, rue {rng.randrange(1, 300)}",
+                        ville=rng.choice(CITIES),
+                        payment_method=rng.choices(methods, method_weights)[0],
+                        payment_status=payment_status,
+                        order_status=order_status,
+                        date_commande=date,
+                        date_paiement=date + timedelta(minutes=rng.randrange(1, 90))
+                        if payment_status in ('paid', 'refunded') else None,
+                    )
+                    commandes.append(commande)
+                    lines.append(order_lines)
+
+                with transaction.atomic():
+                    Commande.objects.bulk_create(commandes)
+                    for commande, order_lines in zip(commandes, lines):
+                        for line in order_lines:
+                            line.order_id = commande.id
+                    OrderLine.objects.bulk_create([line for order_lines in lines for line in order_lines])
+                created += len(commandes)
+                if self.verbosity > 1:
+                    self.stdout.write(f"  {created} commande(s)")
+        return created
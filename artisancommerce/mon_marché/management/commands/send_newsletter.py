@@ -0,0 +1,77 @@
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand, CommandError
+
+from mon_marché import newsletter
+from mon_marché.models import NewsletterCampaign
+
+
+class Command(BaseCommand):
+    help = "Envoie une campagne newsletter (ou reprend une campagne interrompue)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaign', type=int, help="Id d'une campagne existante (reprise)")
+        parser.add_argument('--subject', help="Sujet d'une nouvelle campagne")
+        parser.add_argument('--body-file', help="Fichier texte du message ({{ nom }}, {{ email }})")
+        parser.add_argument('--html-file', help="Fichier HTML du message (facultatif)")
+        parser.add_argument('--batch-size', type=int, default=newsletter.BATCH_SIZE,
+                            help="Messages par connexion SMTP")
+        parser.add_argument('--rate', type=float, default=newsletter.RATE,
+                            help="Messages par seconde (0 = illimité)")
+        parser.add_argument('--smtp-host', help="Serveur SMTP à utiliser à la place des réglages (ex. serveur de test local)")
+        parser.add_argument('--smtp-port', type=int, default=1025)
+        parser.add_argument('--dry-run', action='store_true', help="Compte les destinataires sans rien envoyer")
+        parser.add_argument('--background', action='store_true', help="Confie l'envoi aux workers")
+
+    def handle(self, *args, **options):
+        campaign = self._get_campaign(options)
+
+        if options['dry_run']:
+            count = sum(1 for _ in newsletter.recipients(campaign, chunk_size=options['batch_size']))
+            self.stdout.write(f"Campagne #{campaign.pk} : {count} destinataire(s) restant(s)")
+            return
+
+        if options['background']:
+            newsletter.send_campaign_task.delay(campaign.pk)
+            self.stdout.write(self.style.SUCCESS(f"Campagne #{campaign.pk} mise en file pour les workers"))
+            return
+
+        connection = None
+        if options['smtp_host']:
+            connection = get_connection(
+                'django.core.mail.backends.smtp.EmailBackend',
+                host=options['smtp_host'], port=options['smtp_port'],
+                username='', password='', use_tls=False, use_ssl=False,
+            )
+        try:
+            stats = newsletter.send_campaign(
+                campaign,
+                batch_size=options['batch_size'],
+                rate=options['rate'],
+                connection=connection,
+            )
+        except newsletter.CONNECTION_ERRORS as e:
+            raise CommandError(
+                f"Connexion SMTP perdue ({e}). Relancer avec --campaign {campaign.pk} pour reprendre."
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Campagne #{campaign.pk} : {stats['sent']} envoyé(s), {stats['failed']} échec(s)"
+        ))
+
+    def _get_campaign(self, options):
+        if options['campaign']:
+            try:
+                return NewsletterCampaign.objects.get(pk=options['campaign'])
+            except NewsletterCampaign.DoesNotExist:
+                raise CommandError(f"Campagne #{options['campaign']} introuvable")
+
+        if not options['subject'] or not options['body_file']:
+            raise CommandError("--subject et --body-file sont requis pour une nouvelle campagne")
+        with open(options['body_file'], encoding='utf-8') as f:
+            text = f.read()
+        html = ''
+        if options['html_file']:
+            with open(options['html_file'], encoding='utf-8') as f:
+                html = f.read()
+        campaign = NewsletterCampaign.objects.create(sujet=options['subject'], contenu_texte=text, contenu_html=html)
+        self.stdout.write(f"Campagne #{campaign.pk} créée")
+        return campaign
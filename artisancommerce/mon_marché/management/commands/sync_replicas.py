@@ -0,0 +1,52 @@
+import signal
+import sqlite3
+import time
+from contextlib import closing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        "Recopie la base SQLite principale dans les répliques (SQLITE_REPLICAS) par l'API "
+        "de sauvegarde SQLite : chaque copie est vue d'un bloc par les lecteurs. Sert à "
+        "tester le routage des lectures en local ; en PostgreSQL, la réplication est native."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=5, help="Secondes entre deux copies")
+        parser.add_argument('--once', action='store_true', help="Une seule copie puis sortie")
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if primary.vendor != 'sqlite':
+            raise CommandError("Copie réservée à SQLite : les répliques PostgreSQL sont alimentées par la réplication")
+        if not replicas:
+            raise CommandError("Aucune réplique configurée (SQLITE_REPLICAS)")
+
+        self.running = True
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGTERM, self._stop)
+        while self.running:
+            started = time.monotonic()
+            for alias in replicas:
+                self._copy(primary.settings_dict['NAME'], connections[alias].settings_dict['NAME'])
+            elapsed = time.monotonic() - started
+            if options['verbosity'] > 1 or options['once']:
+                self.stdout.write(f"{len(replicas)} réplique(s) à jour en {elapsed:.2f} s")
+            if options['once']:
+                break
+            time.sleep(max(options['interval'] - elapsed, 0))
+
+    def _copy(self, source, target):
+        timeout = settings.SQLITE_PRAGMAS.get('busy_timeout', 5000) / 1000
+        with closing(sqlite3.connect(source, timeout=timeout)) as src, \
+                closing(sqlite3.connect(target, timeout=timeout)) as dst:
+            # pages=-1 : tout en une étape, les lecteurs voient l'ancienne ou la nouvelle copie
+            src.backup(dst, pages=-1)
+
+    def _stop(self, signum, frame):
+        self.running = False
@@ -0,0 +1,325 @@
+# metrics.py - Mesures par vue (requêtes SQL, durée, taille) au format Prometheus
+#
+# Les mesures sont agrégées dans le processus. Avec METRICS_MULTIPROCESS_DIR,
+# chaque processus écrit régulièrement son état dans ce dossier (un fichier
+# par processus : pid et heure de démarrage, un pid réutilisé n'écrase rien)
+# et /metrics additionne les fichiers : les workers sont vus ensemble. Les
+# fichiers des processus terminés sont cumulés dans dead.json puis supprimés :
+# les totaux ne baissent jamais et le dossier ne grossit pas. Le dossier doit
+# être local à la machine (présence des processus vérifiée par leur pid).
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de cumul des processus terminés
+    fcntl = None
+
+from django.conf import settings
+from django.db import connections
+
+from .templatetags.product_cards import card_cache_stats
+
+logger = logging.getLogger(__name__)
+
+# Nombre d'exécutions d'une même requête SQL à partir duquel on suspecte un N+1
+N_PLUS_ONE_THRESHOLD = getattr(settings, 'METRICS_N_PLUS_ONE_THRESHOLD', 5)
+MULTIPROCESS_DIR = getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+FLUSH_INTERVAL = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (1_000, 5_000, 10_000, 50_000, 100_000, 500_000, 1_000_000)
+
+HISTOGRAMS = {
+    'http_request_duration_seconds': ("Durée totale de la requête", DURATION_BUCKETS),
+    'db_query_duration_seconds': ("Temps SQL cumulé par requête", DURATION_BUCKETS),
+    'db_queries_per_request': ("Requêtes SQL par requête HTTP", QUERY_COUNT_BUCKETS),
+    'http_response_size_bytes': ("Taille du corps de la réponse", SIZE_BUCKETS),
+}
+COUNTERS = {
+    'http_requests_total': "Requêtes HTTP traitées",
+    'db_n_plus_one_total': "Requêtes HTTP ayant répété une même requête SQL (N+1 suspecté)",
+    'product_card_cache_total': "Lectures du cache des cartes produit",
+}
+
+
+# ==================== AGRÉGATION ====================
+
+class Registry:
+    """Compteurs et histogrammes indexés par (nom, étiquettes)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.started = time.time_ns()
+        self.counters = Counter()
+        self.histograms = {}
+
+    def _check_fork(self):
+        # Un processus forké hérite des valeurs du parent : il repart de zéro
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.started = time.time_ns()
+            self.counters.clear()
+            self.histograms.clear()
+
+    def process_key(self):
+        """Nom du fichier d'état du processus : '<pid>-<démarrage>'"""
+        with self.lock:
+            self._check_fork()
+            return f'{self.pid}-{self.started}'
+
+    def inc(self, name, labels, value=1):
+        with self.lock:
+            self._check_fork()
+            self.counters[name, labels] += value
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        with self.lock:
+            self._check_fork()
+            entry = self.histograms.setdefault((name, labels), [[0] * (len(buckets) + 1), 0])
+            entry[0][bisect_left(buckets, value)] += 1
+            entry[1] += value
+
+    def snapshot(self):
+        """État sérialisable en JSON (les étiquettes deviennent des listes)"""
+        with self.lock:
+            self._check_fork()
+            counters = [[name, list(labels), value] for (name, labels), value in self.counters.items()]
+            histograms = [[name, list(labels), list(counts), total]
+                          for (name, labels), (counts, total) in self.histograms.items()]
+        cards = card_cache_stats()
+        counters += [['product_card_cache_total', [['outcome', 'hit']], cards['hits']],
+                     ['product_card_cache_total', [['outcome', 'miss']], cards['misses']]]
+        return {'counters': counters, 'histograms': histograms}
+
+
+registry = Registry()
+
+
+def merge(snapshots):
+    """Additionne des états (un par processus)"""
+    counters, histograms = Counter(), {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            counters[name, tuple(map(tuple, labels))] += value
+        for name, labels, counts, total in snapshot['histograms']:
+            entry = histograms.setdefault((name, tuple(map(tuple, labels))), [[0] * len(counts), 0])
+            entry[0] = [a + b for a, b in zip(entry[0], counts)]
+            entry[1] += total
+    return counters, histograms
+
+
+def as_snapshot(counters, histograms):
+    """Inverse de merge() : un seul état sérialisable"""
+    return {
+        'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+        'histograms': [[name, list(labels), counts, total] for (name, labels), (counts, total) in histograms.items()],
+    }
+
+
+# ==================== PARTAGE ENTRE PROCESSUS ====================
+
+_last_flush = 0.0
+
+ARCHIVE = 'dead.json'
+PROCESS_FILE_RE = re.compile(r'^(?P<pid>\d+)-(?P<started>\d+)\.json$')
+
+
+def _write_json(directory, name, data):
+    # Écriture atomique : un lecteur ne voit jamais un fichier à moitié écrit
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp, directory / name)
+
+
+def _read_json(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _dead_files(directory):
+    """Fichiers de processus terminés : pid absent, ou pid repris par un processus plus récent"""
+    latest = {}
+    for path in directory.glob('*-*.json'):
+        match = PROCESS_FILE_RE.match(path.name)
+        if match:
+            latest.setdefault(int(match['pid']), []).append((int(match['started']), path))
+    dead = []
+    for pid, files in latest.items():
+        files.sort()
+        dead += [path for _, path in (files if not _pid_alive(pid) else files[:-1])]
+    return dead
+
+
+def compact(directory):
+    """
+    Cumule les fichiers des processus terminés dans dead.json. Les noms
+    cumulés y sont notés avant la suppression des fichiers : après une
+    interruption, collect() ne les compte pas deux fois.
+    """
+    if fcntl is None:
+        return
+    with open(directory / '.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive = _read_json(directory / ARCHIVE) or {'counters': [], 'histograms': [], 'folded': []}
+        folded = {name for name in archive['folded'] if (directory / name).exists()}
+        dead = [path for path in _dead_files(directory) if path.name not in folded]
+        if not dead and len(folded) == len(archive['folded']):
+            return
+        snapshots = [archive] + [snapshot for snapshot in map(_read_json, dead) if snapshot]
+        archive = {**as_snapshot(*merge(snapshots)), 'folded': sorted(folded | {path.name for path in dead})}
+        _write_json(directory, ARCHIVE, archive)
+        for path in dead:
+            path.unlink(missing_ok=True)
+
+
+def flush(force=False):
+    """Écrit l'état du processus dans METRICS_MULTIPROCESS_DIR (au plus toutes les FLUSH_INTERVAL s)"""
+    global _last_flush
+    if not MULTIPROCESS_DIR:
+        return
+    now = time.monotonic()
+    if not force and now - _last_flush < FLUSH_INTERVAL:
+        return
+    _last_flush = now
+    directory = Path(MULTIPROCESS_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    _write_json(directory, f'{registry.process_key()}.json', registry.snapshot())
+
+
+def collect():
+    """(compteurs, histogrammes) du processus, ou de tous les processus en mode partagé"""
+    if not MULTIPROCESS_DIR:
+        return merge([registry.snapshot()])
+    flush(force=True)
+    directory = Path(MULTIPROCESS_DIR)
+    compact(directory)
+    archive = _read_json(directory / ARCHIVE) or {'counters': [], 'histograms': [], 'folded': []}
+    snapshots = [archive]
+    for path in directory.glob('*.json'):
+        if path.name == ARCHIVE or path.name in archive['folded']:
+            continue
+        snapshot = _read_json(path)
+        if snapshot is not None:
+            snapshots.append(snapshot)
+    return merge(snapshots)
+
+
+# ==================== MESURE D'UNE REQUÊTE ====================
+
+class QueryCollector:
+    """execute_wrapper qui compte et chronomètre les requêtes SQL d'une requête HTTP"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            # SQL sans les paramètres : une boucle qui charge ligne par ligne
+            # produit le même texte à chaque tour
+            self.statements[sql] += 1
+
+    def install(self):
+        """Contexte installant le collecteur sur toutes les bases configurées"""
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(self))
+        return stack
+
+    def repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+        return [(sql, count) for sql, count in self.statements.items() if count >= threshold]
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else '<unresolved>'
+
+
+def record_request(request, response, collector, duration):
+    view = view_label(request)
+    labels = (('view', view),)
+    registry.inc('http_requests_total', labels + (('method', request.method), ('status', str(response.status_code))))
+    registry.observe('http_request_duration_seconds', labels, duration)
+    registry.observe('db_query_duration_seconds', labels, collector.duration)
+    registry.observe('db_queries_per_request', labels, collector.count)
+    if not response.streaming:
+        registry.observe('http_response_size_bytes', labels, len(response.content))
+
+    repeated = collector.repeated()
+    if repeated:
+        registry.inc('db_n_plus_one_total', labels)
+        for sql, count in repeated:
+            logger.warning("N+1 suspecté dans %s : %s exécutions de %s", view, count, sql[:300])
+    flush()
+
+
+# ==================== FORMAT PROMETHEUS ====================
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Exposition texte Prometheus (version 0.0.4)"""
+    counters, histograms = collect()
+    lines = []
+    for name, help_text in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for (metric, labels), (counts, total) in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels + (("le", bound),))} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(total)}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,97 @@
+# middleware.py - Instrumentation des requêtes (voir metrics.py) et répliques (voir routers.py)
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+
+from . import metrics, routers
+
+
+class MetricsMiddleware:
+    """
+    Mesure chaque requête : nombre et durée des requêtes SQL (execute_wrapper),
+    durée totale et taille de la réponse, par vue. À placer en tête de
+    MIDDLEWARE pour compter aussi les requêtes des autres middlewares.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        collector = metrics.QueryCollector()
+        start = time.perf_counter()
+        with collector.install():
+            response = self.get_response(request)
+        metrics.record_request(request, response, collector, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        collector = metrics.QueryCollector()
+        start = time.perf_counter()
+        # Les connexions sont propres à chaque thread : le collecteur est installé
+        # dans le thread où sync_to_async exécute l'ORM pour cette requête
+        wrappers = await sync_to_async(collector.install)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(wrappers.close)()
+        metrics.record_request(request, response, collector, time.perf_counter() - start)
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    Garde les lectures du catalogue sur la base principale pendant
+    REPLICA_STICKY_SECONDS après une écriture du catalogue par ce client
+    (cookie portant l'échéance). Sans réplique configurée, ne fait rien.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not routers.replica_aliases():
+            return self.get_response(request)
+        state, token = routers.begin(self._pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.end(token)
+        return self._finish(state, response)
+
+    async def __acall__(self, request):
+        if not routers.replica_aliases():
+            return await self.get_response(request)
+        state, token = routers.begin(self._pinned(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.end(token)
+        return self._finish(state, response)
+
+    def _pinned(self, request):
+        try:
+            return float(request.COOKIES.get(routers.STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def _finish(self, state, response):
+        if state.wrote:
+            response.set_cookie(
+                routers.STICKY_COOKIE, str(int(time.time()) + routers.STICKY_SECONDS),
+                max_age=routers.STICKY_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
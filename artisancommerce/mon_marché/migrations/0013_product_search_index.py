@@ -0,0 +1,80 @@
+from django.db import migrations
+
+FTS_TABLE = 'mon_marché_product_fts'
+PG_SEARCH_CONFIG = 'fr_unaccent'
+PG_INDEX_NAME = 'product_search_gin'
+
+
+def sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        options = {row[0] for row in cursor.fetchall()}
+    return 'ENABLE_FTS5' in options
+
+
+def postgres_search_index():
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    return GinIndex(
+        SearchVector('title', weight='A', config=PG_SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=PG_SEARCH_CONFIG),
+        name=PG_INDEX_NAME,
+    )
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    Product = apps.get_model('mon_marché', 'Product')
+
+    if connection.vendor == 'sqlite':
+        if not sqlite_has_fts5(connection):
+            return
+        product_table = Product._meta.db_table
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS "{FTS_TABLE}" USING fts5('
+            f"title, description, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO "{FTS_TABLE}" (rowid, title, description) '
+            f'SELECT id, title, description FROM "{product_table}"'
+        )
+
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+        schema_editor.execute(
+            f'DROP TEXT SEARCH CONFIGURATION IF EXISTS {PG_SEARCH_CONFIG}'
+        )
+        schema_editor.execute(
+            f'CREATE TEXT SEARCH CONFIGURATION {PG_SEARCH_CONFIG} (COPY = french)'
+        )
+        schema_editor.execute(
+            f'ALTER TEXT SEARCH CONFIGURATION {PG_SEARCH_CONFIG} '
+            f'ALTER MAPPING FOR hword, hword_part, word WITH unaccent, french_stem'
+        )
+        schema_editor.add_index(Product, postgres_search_index())
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    Product = apps.get_model('mon_marché', 'Product')
+
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS "{FTS_TABLE}"')
+
+    elif connection.vendor == 'postgresql':
+        schema_editor.remove_index(Product, postgres_search_index())
+        schema_editor.execute(
+            f'DROP TEXT SEARCH CONFIGURATION IF EXISTS {PG_SEARCH_CONFIG}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mon_marché', '0012_contactmessage'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
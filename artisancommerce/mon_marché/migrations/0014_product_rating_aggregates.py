@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:03
+
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Product = apps.get_model('mon_marché', 'Product')
+    ProductReview = apps.get_model('mon_marché', 'ProductReview')
+
+    rows = ProductReview.objects.values('product_id', 'rating').annotate(n=Count('id')).order_by()
+    for row in rows:
+        field = f"rating_{min(max(row['rating'], 1), 5)}_count"
+        Product.objects.filter(pk=row['product_id']).update(
+            review_count=F('review_count') + row['n'],
+            rating_sum=F('rating_sum') + row['rating'] * row['n'],
+            **{field: F(field) + row['n']},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mon_marché', '0013_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, verbose_name='Somme des notes'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, verbose_name="Nombre d'avis"),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
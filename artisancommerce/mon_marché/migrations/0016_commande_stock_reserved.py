@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mon_marché', '0015_cart_cartitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='commande',
+            name='stock_reserved',
+            field=models.BooleanField(default=False, verbose_name='Stock réservé'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def to_decimal(value):
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+
+
+def lines_from_items(OrderLine, order, items, product_ids):
+    lines = []
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        try:
+            quantity = int(item.get('quantity') or 0)
+        except (TypeError, ValueError):
+            continue
+        if quantity <= 0:
+            continue
+        try:
+            product_id = int(item.get('product_id'))
+        except (TypeError, ValueError):
+            product_id = None
+        unit_price = to_decimal(item.get('price'))
+        line_total = to_decimal(item.get('total'))
+        if unit_price is None and line_total is not None:
+            unit_price = line_total / quantity
+        unit_price = (unit_price or Decimal(0)).quantize(Decimal('0.01'))
+        if line_total is None:
+            line_total = unit_price * quantity
+        lines.append(OrderLine(
+            order=order,
+            product_id=product_id if product_id in product_ids else None,
+            product_name=str(item.get('name') or '')[:200],
+            unit_price=unit_price,
+            quantity=quantity,
+            line_total=line_total.quantize(Decimal('0.01')),
+        ))
+    return lines
+
+
+def backfill_order_lines(apps, schema_editor):
+    Commande = apps.get_model('mon_marché', 'Commande')
+    OrderLine = apps.get_model('mon_marché', 'OrderLine')
+    Product = apps.get_model('mon_marché', 'Product')
+
+    product_ids = set(Product.objects.values_list('id', flat=True))
+    orders = Commande.objects.filter(lines__isnull=True).only('id', 'items').order_by('id')
+    batch = []
+    for order in orders.iterator(chunk_size=BATCH_SIZE):
+        batch.extend(lines_from_items(OrderLine, order, order.items, product_ids))
+        if len(batch) >= BATCH_SIZE:
+            OrderLine.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        OrderLine.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mon_marché', '0017_orderline'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_order_lines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mon_marché', '0018_backfill_orderlines'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='commande',
+            index=models.Index(fields=['user', '-date_commande', '-id'], name='commande_user_date_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mon_marché', '0020_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('provider', models.CharField(default='wave', max_length=20)),
+                ('transaction_id', models.CharField(max_length=200)),
+                ('reference', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(blank=True, max_length=50)),
+                ('payload', models.JSONField(default=dict)),
+                ('date_reception', models.DateTimeField(auto_now_add=True)),
+                ('date_traitement', models.DateTimeField(blank=True, null=True)),
+                ('resultat', models.CharField(blank=True, max_length=50)),
+                ('commande', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payment_events', to='mon_marché.commande')),
+            ],
+            options={
+                'verbose_name': 'Événement de paiement',
+                'verbose_name_plural': 'Événements de paiement',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['date_traitement', 'id'], name='payment_event_pending_idx')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'transaction_id'), name='payment_event_unique_transaction')],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mon_marché', '0022_task'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NewsletterCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sujet', models.CharField(max_length=200)),
+                ('contenu_texte', models.TextField(verbose_name='Contenu (texte)')),
+                ('contenu_html', models.TextField(blank=True, verbose_name='Contenu (HTML)')),
+                ('status', models.CharField(choices=[('draft', 'Brouillon'), ('sending', "En cours d'envoi"), ('sent', 'Envoyée')], default='draft', max_length=20)),
+                ('date_creation', models.DateTimeField(auto_now_add=True)),
+                ('date_debut', models.DateTimeField(blank=True, null=True)),
+                ('date_fin', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Campagne Newsletter',
+                'verbose_name_plural': 'Campagnes Newsletter',
+                'ordering': ['-date_creation'],
+            },
+        ),
+        migrations.CreateModel(
+            name='NewsletterDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('status', models.CharField(choices=[('sent', 'Envoyé'), ('failed', 'Échec')], max_length=20)),
+                ('error', models.TextField(blank=True)),
+                ('date_envoi', models.DateTimeField(default=django.utils.timezone.now)),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='mon_marché.newslettercampaign')),
+            ],
+            options={
+                'verbose_name': 'Envoi Newsletter',
+                'verbose_name_plural': 'Envois Newsletter',
+                'constraints': [models.UniqueConstraint(fields=('campaign', 'email'), name='newsletter_delivery_unique')],
+            },
+        ),
+    ]
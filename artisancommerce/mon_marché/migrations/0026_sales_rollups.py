@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mon_marché', '0025_product_neighbours'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Jour')),
+                ('dimension', models.CharField(choices=[('product', 'Produit'), ('category', 'Catégorie'), ('payment_method', 'Moyen de paiement'), ('ville', 'Ville'), ('order_status', 'Statut de commande')], max_length=20)),
+                ('key', models.CharField(blank=True, max_length=200, verbose_name='Valeur')),
+                ('state', models.CharField(choices=[('pending', 'En attente'), ('paid', 'Payé'), ('failed', 'Échoué'), ('refunded', 'Remboursé'), ('cancelled', 'Annulée')], max_length=20, verbose_name='État')),
+                ('orders', models.IntegerField(default=0, verbose_name='Commandes')),
+                ('units', models.IntegerField(default=0, verbose_name='Unités')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name="Chiffre d'affaires")),
+            ],
+            options={
+                'verbose_name': 'Statistique de ventes',
+                'verbose_name_plural': 'Statistiques de ventes',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.AddField(
+            model_name='commande',
+            name='rollup_state',
+            field=models.CharField(blank=True, editable=False, max_length=80),
+        ),
+        migrations.AddIndex(
+            model_name='commande',
+            index=models.Index(fields=['-date_commande'], name='commande_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='salesrollup',
+            constraint=models.UniqueConstraint(fields=('dimension', 'day', 'key', 'state'), name='sales_rollup_uniq'),
+        ),
+    ]
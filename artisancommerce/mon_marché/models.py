@@ -1,16 +1,20 @@
 # models.py - Version complète et améliorée
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.core.validators import MinValueValidator
 import uuid
 
+from . import images
+
 # ==================== CATÉGORIES ====================
 class Categorie(models.Model):
     name = models.CharField(max_length=200, verbose_name="Nom de la catégorie")
     description = models.TextField(blank=True, verbose_name="Description")
     image = models.ImageField(upload_to='categories/', blank=True, null=True)
     image_url = models.URLField(blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     date_ajout = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -21,14 +25,24 @@ class Categorie(models.Model):
     def __str__(self):
         return self.name
     
-    def get_image_url(self):
+    def get_image_url(self, size=None):
         if self.image and hasattr(self.image, 'url'):
-            return self.image.url
+            return (size and images.variant_url(self.image_variants, size)) or self.image.url
         elif self.image_url:
             return self.image_url
         return 'https://via.placeholder.com/300x200?text=No+Image'
 
 # ==================== PRODUITS ====================
+def unique_slug(base, taken, max_length=50):
+    """Premier slug libre parmi base, base-2, base-3... (``taken`` : slugs déjà pris)"""
+    base = base[:max_length]
+    slug, n = base, 2
+    while slug in taken:
+        suffix = f'-{n}'
+        slug = f'{base[:max_length - len(suffix)]}{suffix}'
+        n += 1
+    return slug
+
 class Product(models.Model):
     title = models.CharField(max_length=200, verbose_name="Titre")
     slug = models.SlugField(unique=True, blank=True)
@@ -38,23 +52,45 @@ class Product(models.Model):
     Categorie = models.ForeignKey(Categorie, related_name='products', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='products/', blank=True, null=True) 
     image_url = models.URLField(blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     stock = models.PositiveIntegerField(default=0, verbose_name="Stock disponible")
     is_new = models.BooleanField(default=False, verbose_name="Nouveau produit")
     is_active = models.BooleanField(default=True, verbose_name="Actif")
     date_ajout = models.DateTimeField(auto_now_add=True)
     date_modification = models.DateTimeField(auto_now=True)
     
+    # Agrégats des avis, maintenus par ProductReview (voir rebuild_ratings)
+    review_count = models.PositiveIntegerField(default=0, verbose_name="Nombre d'avis")
+    rating_sum = models.PositiveIntegerField(default=0, verbose_name="Somme des notes")
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    
     class Meta:
         ordering = ['-date_ajout'] 
+        indexes = [
+            # Listes paginées (voir pagination.SORT_ORDERINGS) : index partiels sur les
+            # produits actifs, dans l'ordre du tri, sans tri temporaire ni lecture complète
+            models.Index(fields=['-date_ajout', '-id'], condition=Q(is_active=True), name='product_active_date_idx'),
+            models.Index(fields=['Categorie', '-date_ajout', '-id'], condition=Q(is_active=True),
+                         name='product_cat_active_date_idx'),
+            models.Index(fields=['price', 'id'], condition=Q(is_active=True), name='product_active_price_idx'),
+            models.Index(fields=['title', 'id'], condition=Q(is_active=True), name='product_active_title_idx'),
+            # Dernière modification du catalogue (ETag des listes)
+            models.Index(fields=['date_modification'], name='product_modified_idx'),
+        ]
         verbose_name = "Produit"
         verbose_name_plural = "Produits"
     
     def __str__(self):
         return self.title
     
-    def get_image_url(self):
+    def get_image_url(self, size=None):
+        """URL de l'image ; avec ``size`` ('thumb', 'medium', 'large'), la déclinaison si elle existe"""
         if self.image and hasattr(self.image, 'url'):
-            return self.image.url
+            return (size and images.variant_url(self.image_variants, size)) or self.image.url
         elif self.image_url:
             return self.image_url
         return 'https://via.placeholder.com/400x400?text=No+Image'
@@ -67,10 +103,28 @@ class Product(models.Model):
     def is_in_stock(self):
         return self.stock > 0
     
+    def get_average_rating(self):
+        if not self.review_count:
+            return 0
+        return round(self.rating_sum / self.review_count, 1)
+    
+    def get_rating_histogram(self):
+        """Nombre d'avis par note, de 5 à 1 étoile"""
+        return [(stars, getattr(self, f'rating_{stars}_count')) for stars in range(5, 0, -1)]
+    
+    @staticmethod
+    def rating_field(rating):
+        """Nom du champ d'histogramme pour une note (bornée à 1-5)"""
+        return f'rating_{min(max(int(rating), 1), 5)}_count'
+    
     def save(self, *args, **kwargs):
         if not self.slug:
             from django.utils.text import slugify
-            self.slug = slugify(self.title)
+            base = (slugify(self.title) or 'produit')[:50]
+            taken = set(
+                Product.objects.filter(slug__startswith=base).exclude(pk=self.pk).values_list('slug', flat=True)
+            )
+            self.slug = unique_slug(base, taken)
         super().save(*args, **kwargs)
 
 # ==================== PROFIL UTILISATEUR ====================
@@ -82,6 +136,7 @@ class UserProfile(models.Model):
     pays = models.CharField(max_length=100, default="Côte d'Ivoire")
     zipcode = models.CharField(max_length=10, blank=True, verbose_name="Code postal")
     profile_pic = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     date_naissance = models.DateField(null=True, blank=True)
     
     # Préférences
@@ -99,6 +154,11 @@ class UserProfile(models.Model):
     def get_full_address(self):
         parts = [self.address, self.ville, self.pays, self.zipcode]
         return ", ".join([p for p in parts if p])
+    
+    def get_image_url(self, size=None):
+        if self.profile_pic and hasattr(self.profile_pic, 'url'):
+            return (size and images.variant_url(self.image_variants, size)) or self.profile_pic.url
+        return None
 
 # ==================== ADRESSES DE LIVRAISON ====================
 class ShippingAddress(models.Model):
@@ -121,6 +181,10 @@ class ShippingAddress(models.Model):
     
     class Meta:
         ordering = ['-is_default', '-date_ajout']
+        indexes = [
+            # Adresses d'un utilisateur, adresse par défaut
+            models.Index(fields=['user', 'is_default'], name='address_user_default_idx'),
+        ]
         verbose_name = "Adresse de livraison"
         verbose_name_plural = "Adresses de livraison"
     
@@ -186,6 +250,12 @@ class Commande(models.Model):
     ]
     order_status = models.CharField(max_length=50, choices=ORDER_STATUS, default='pending')
     
+    # Stock décrémenté à la création, remis en stock à l'annulation (voir inventory.py)
+    stock_reserved = models.BooleanField(default=False, verbose_name="Stock réservé")
+    
+    # État sous lequel la commande est comptée dans SalesRollup ("paid:shipped"), vide si pas encore comptée
+    rollup_state = models.CharField(max_length=80, blank=True, editable=False)
+    
     # Notes
     notes = models.TextField(blank=True, verbose_name="Notes de commande")
     
@@ -196,6 +266,14 @@ class Commande(models.Model):
     
     class Meta:
         ordering = ['-date_commande']
+        indexes = [
+            # Historique d'un utilisateur trié par date (profil, page commandes)
+            models.Index(fields=['user', '-date_commande', '-id'], name='commande_user_date_idx'),
+            # Suivi des paiements (admin, rapports) par statut puis date
+            models.Index(fields=['payment_status', '-date_commande'], name='commande_payment_date_idx'),
+            # Plages de dates (recalcul des statistiques de ventes, liste de l'admin)
+            models.Index(fields=['-date_commande'], name='commande_date_idx'),
+        ]
         verbose_name = "Commande"
         verbose_name_plural = "Commandes"
     
@@ -211,6 +289,188 @@ class Commande(models.Model):
     def get_items_count(self):
         return sum(item.get('quantity', 0) for item in self.items)
 
+# ==================== LIGNES DE COMMANDE ====================
+class OrderLine(models.Model):
+    # Version normalisée de Commande.items, pour les agrégats SQL (ventes, chiffre d'affaires)
+    order = models.ForeignKey(Commande, on_delete=models.CASCADE, related_name='lines')
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, blank=True, related_name='order_lines')
+    product_name = models.CharField(max_length=200, verbose_name="Produit")
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Prix unitaire")
+    quantity = models.PositiveIntegerField(verbose_name="Quantité")
+    line_total = models.DecimalField(max_digits=12, decimal_places=2, verbose_name="Total ligne")
+    
+    class Meta:
+        ordering = ['id']
+        verbose_name = "Ligne de commande"
+        verbose_name_plural = "Lignes de commande"
+    
+    def __str__(self):
+        return f"{self.quantity} x {self.product_name}"
+
+# ==================== ACHATS CONJOINTS ====================
+class ProductNeighbour(models.Model):
+    # Top-K des produits achetés avec ``product``, recalculé en lot (voir co_purchase.py).
+    # L'index (product, rank) sert la page détail en une seule recherche.
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='neighbours', db_index=False)
+    neighbour = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='neighbour_of')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    co_count = models.PositiveIntegerField(verbose_name="Commandes communes")
+
+    class Meta:
+        ordering = ['product', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='product_neighbour_rank_uniq'),
+        ]
+        verbose_name = "Produit acheté ensemble"
+        verbose_name_plural = "Produits achetés ensemble"
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.neighbour_id} (#{self.rank})"
+
+# ==================== STATISTIQUES DE VENTES ====================
+class SalesRollup(models.Model):
+    # Agrégats journaliers des commandes par dimension, tenus à jour par
+    # rollups.py : le tableau de bord ne lit que cette table
+    DIMENSIONS = [
+        ('product', 'Produit'),
+        ('category', 'Catégorie'),
+        ('payment_method', 'Moyen de paiement'),
+        ('ville', 'Ville'),
+        ('order_status', 'Statut de commande'),
+    ]
+    # Statut de paiement, sauf pour une commande annulée
+    STATES = Commande.PAYMENT_STATUS + [('cancelled', 'Annulée')]
+
+    day = models.DateField(verbose_name="Jour")
+    dimension = models.CharField(max_length=20, choices=DIMENSIONS)
+    key = models.CharField(max_length=200, blank=True, verbose_name="Valeur")
+    state = models.CharField(max_length=20, choices=STATES, verbose_name="État")
+    orders = models.IntegerField(default=0, verbose_name="Commandes")
+    units = models.IntegerField(default=0, verbose_name="Unités")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Chiffre d'affaires")
+
+    class Meta:
+        ordering = ['-day']
+        constraints = [
+            # Sert aussi les lectures du tableau de bord : dimension puis plage de jours
+            models.UniqueConstraint(fields=['dimension', 'day', 'key', 'state'], name='sales_rollup_uniq'),
+        ]
+        verbose_name = "Statistique de ventes"
+        verbose_name_plural = "Statistiques de ventes"
+
+    def __str__(self):
+        return f"{self.day} {self.dimension}={self.key} ({self.state})"
+
+# ==================== ÉVÉNEMENTS DE PAIEMENT ====================
+class PaymentEvent(models.Model):
+    # Notifications brutes des prestataires, en ajout seul : une ligne par
+    # transaction, les renvois et doublons sont ignorés à l'insertion
+    provider = models.CharField(max_length=20, default='wave')
+    transaction_id = models.CharField(max_length=200)
+    reference = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=50, blank=True)
+    payload = models.JSONField(default=dict)
+    date_reception = models.DateTimeField(auto_now_add=True)
+    
+    # Renseignés par le worker (voir payments.py)
+    commande = models.ForeignKey(Commande, on_delete=models.SET_NULL, null=True, blank=True, related_name='payment_events')
+    date_traitement = models.DateTimeField(null=True, blank=True)
+    resultat = models.CharField(max_length=50, blank=True)
+    
+    class Meta:
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'transaction_id'], name='payment_event_unique_transaction'),
+        ]
+        indexes = [
+            # Événements restant à traiter
+            models.Index(fields=['date_traitement', 'id'], name='payment_event_pending_idx'),
+        ]
+        verbose_name = "Événement de paiement"
+        verbose_name_plural = "Événements de paiement"
+    
+    def __str__(self):
+        return f"{self.provider} {self.transaction_id} ({self.status})"
+
+# ==================== TÂCHES EN ARRIÈRE-PLAN ====================
+class Task(models.Model):
+    # File de tâches en base, consommée par "manage.py runworkers" (voir tasks.py)
+    STATUS = [
+        ('pending', 'En attente'),
+        ('running', 'En cours'),
+        ('done', 'Terminée'),
+        ('failed', 'Échouée'),
+    ]
+    name = models.CharField(max_length=200, verbose_name="Tâche")
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    # Une seule tâche en attente par clé (ex. un seul passage de traitement planifié)
+    unique_key = models.CharField(max_length=200, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS, default='pending')
+    
+    # Reprises et délai de visibilité
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Tentatives")
+    max_attempts = models.PositiveIntegerField(default=5)
+    timeout = models.PositiveIntegerField(default=300, verbose_name="Délai de visibilité (s)")
+    run_at = models.DateTimeField(default=timezone.now, verbose_name="Exécution prévue")
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_fin = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # Tâches dues (en attente) et tâches dont le délai de visibilité a expiré
+            models.Index(fields=['status', 'run_at'], name='task_status_run_at_idx'),
+            models.Index(fields=['status', 'locked_until'], name='task_status_locked_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['unique_key'],
+                condition=models.Q(status='pending'),
+                name='task_unique_pending_key',
+            ),
+        ]
+        verbose_name = "Tâche"
+        verbose_name_plural = "Tâches"
+    
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+# ==================== PANIER ====================
+class Cart(models.Model):
+    # Panier d'un utilisateur connecté, ou panier anonyme référencé par la session
+    user = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True, related_name='cart')
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_modification = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Panier"
+        verbose_name_plural = "Paniers"
+    
+    def __str__(self):
+        owner = self.user.username if self.user_id else "anonyme"
+        return f"Panier #{self.pk} ({owner})"
+
+class CartItem(models.Model):
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='cart_items')
+    quantity = models.PositiveIntegerField(default=1, validators=[MinValueValidator(1)])
+    date_ajout = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ('cart', 'product')
+        ordering = ['date_ajout']
+        verbose_name = "Article du panier"
+        verbose_name_plural = "Articles du panier"
+    
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id}"
+
 # ==================== FAVORIS ====================
 class Favorite(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='favorites')
@@ -243,6 +503,35 @@ class ProductReview(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.product.title} ({self.rating}★)"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Note enregistrée, pour ajuster les agrégats du produit en cas de modification
+        instance._saved_rating = instance.__dict__.get('rating')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # Les agrégats du produit sont mis à jour dans la même transaction, par UPDATE F()
+        with transaction.atomic():
+            old_rating = getattr(self, '_saved_rating', None)
+            is_new = self._state.adding
+            if not is_new and old_rating is None:
+                old_rating = ProductReview.objects.filter(pk=self.pk).values_list('rating', flat=True).first()
+            super().save(*args, **kwargs)
+            
+            updates = {}
+            if is_new or old_rating is None:
+                updates['review_count'] = F('review_count') + 1
+                updates['rating_sum'] = F('rating_sum') + self.rating
+                updates[Product.rating_field(self.rating)] = F(Product.rating_field(self.rating)) + 1
+            elif old_rating != self.rating:
+                updates['rating_sum'] = F('rating_sum') + (self.rating - old_rating)
+                updates[Product.rating_field(old_rating)] = F(Product.rating_field(old_rating)) - 1
+                updates[Product.rating_field(self.rating)] = F(Product.rating_field(self.rating)) + 1
+            if updates:
+                Product.objects.filter(pk=self.product_id).update(**updates)
+            self._saved_rating = self.rating
 
 # ==================== NEWSLETTER ====================
 class NewsletterSubscriber(models.Model):
@@ -257,6 +546,52 @@ class NewsletterSubscriber(models.Model):
     
     def __str__(self):
         return self.email
+
+class NewsletterCampaign(models.Model):
+    STATUS = [
+        ('draft', 'Brouillon'),
+        ('sending', 'En cours d\'envoi'),
+        ('sent', 'Envoyée'),
+    ]
+    sujet = models.CharField(max_length=200)
+    # Gabarits Django : {{ nom }} et {{ email }} sont disponibles
+    contenu_texte = models.TextField(verbose_name="Contenu (texte)")
+    contenu_html = models.TextField(blank=True, verbose_name="Contenu (HTML)")
+    status = models.CharField(max_length=20, choices=STATUS, default='draft')
+    date_creation = models.DateTimeField(auto_now_add=True)
+    date_debut = models.DateTimeField(null=True, blank=True)
+    date_fin = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-date_creation']
+        verbose_name = "Campagne Newsletter"
+        verbose_name_plural = "Campagnes Newsletter"
+    
+    def __str__(self):
+        return self.sujet
+
+class NewsletterDelivery(models.Model):
+    # Progression par destinataire : une reprise saute les adresses déjà servies
+    STATUS = [
+        ('sent', 'Envoyé'),
+        ('failed', 'Échec'),
+    ]
+    campaign = models.ForeignKey(NewsletterCampaign, on_delete=models.CASCADE, related_name='deliveries')
+    email = models.EmailField()
+    status = models.CharField(max_length=20, choices=STATUS)
+    error = models.TextField(blank=True)
+    date_envoi = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'email'], name='newsletter_delivery_unique'),
+        ]
+        verbose_name = "Envoi Newsletter"
+        verbose_name_plural = "Envois Newsletter"
+    
+    def __str__(self):
+        return f"{self.email} ({self.status})"
+
 # ==================== MESSAGES DE CONTACT ====================
 class ContactMessage(models.Model):
     nom = models.CharField(max_length=200, verbose_name="Nom complet")
@@ -0,0 +1,172 @@
+# newsletter.py - Envoi des campagnes newsletter par lots
+import logging
+import smtplib
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.template import Context, Template
+from django.utils import timezone
+
+from .models import NewsletterCampaign, NewsletterDelivery, NewsletterSubscriber
+from .tasks import task
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, 'NEWSLETTER_BATCH_SIZE', 100)
+# Messages par seconde (0 = pas de limite) : les fournisseurs SMTP plafonnent le débit
+RATE = getattr(settings, 'NEWSLETTER_RATE', 10)
+
+# Erreurs qui coupent la connexion : le lot s'arrête, la campagne reprendra plus tard
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+
+# ==================== DESTINATAIRES ====================
+
+def _stream(queryset, name_field, chunk_size):
+    """(adresse, nom) triés par adresse, sans doublons consécutifs, lus par morceaux"""
+    previous = None
+    rows = queryset.order_by('address').values_list('address', name_field)
+    for email, name in rows.iterator(chunk_size=chunk_size):
+        if email and email != previous:
+            previous = email
+            yield email, name or ''
+
+
+def recipients(campaign, chunk_size=BATCH_SIZE):
+    """
+    Abonnés actifs puis utilisateurs ayant coché la newsletter dans leur
+    profil (adresses en minuscules), sans celles déjà traitées pour cette
+    campagne : une reprise ne renvoie rien deux fois. Les lignes sont lues
+    par morceaux (iterator), jamais chargées toutes en mémoire.
+    """
+    already_done = NewsletterDelivery.objects.filter(campaign=campaign).values('email')
+    subscribers = NewsletterSubscriber.objects.filter(is_active=True).annotate(address=Lower('email'))
+
+    yield from _stream(subscribers.exclude(address__in=already_done), 'nom', chunk_size)
+    users = (
+        User.objects.filter(is_active=True, profile__newsletter=True)
+        .exclude(Q(email='') | Q(email__isnull=True))
+        .annotate(address=Lower('email'))
+        .exclude(address__in=already_done)
+        .exclude(address__in=subscribers.values('address'))
+    )
+    yield from _stream(users, 'first_name', chunk_size)
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ==================== ENVOI ====================
+
+class Throttle:
+    """Espace les envois pour ne pas dépasser ``rate`` messages par seconde"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_slot = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if now < self.next_slot:
+            time.sleep(self.next_slot - now)
+        self.next_slot = max(now, self.next_slot) + self.interval
+
+
+def _build_message(campaign, text_template, html_template, email, name, connection):
+    context = Context({'nom': name, 'email': email})
+    message = EmailMultiAlternatives(
+        campaign.sujet,
+        text_template.render(context),
+        settings.DEFAULT_FROM_EMAIL,
+        [email],
+        connection=connection,
+    )
+    if html_template is not None:
+        message.attach_alternative(html_template.render(context), 'text/html')
+    return message
+
+
+def _send_batch(campaign, batch, connection, templates, throttle):
+    """
+    Envoie un lot sur une seule connexion SMTP et enregistre le résultat de
+    chaque adresse en une requête. Un refus d'adresse est noté en échec ; une
+    coupure de connexion interrompt le lot après avoir enregistré ce qui est parti.
+    """
+    deliveries, interrupted = [], None
+    connection.open()
+    try:
+        for email, name in batch:
+            throttle.wait()
+            message = _build_message(campaign, *templates, email, name, connection)
+            try:
+                connection.send_messages([message])
+            except CONNECTION_ERRORS as e:
+                interrupted = e
+                break
+            except (smtplib.SMTPException, ValueError) as e:
+                deliveries.append(NewsletterDelivery(campaign=campaign, email=email, status='failed', error=str(e)))
+            else:
+                deliveries.append(NewsletterDelivery(campaign=campaign, email=email, status='sent'))
+    finally:
+        try:
+            connection.close()
+        except CONNECTION_ERRORS:
+            pass
+        if deliveries:
+            NewsletterDelivery.objects.bulk_create(
+                deliveries,
+                update_conflicts=True,
+                unique_fields=['campaign', 'email'],
+                update_fields=['status', 'error', 'date_envoi'],
+            )
+    if interrupted is not None:
+        raise interrupted
+    return deliveries
+
+
+def send_campaign(campaign, batch_size=BATCH_SIZE, rate=RATE, connection=None):
+    """
+    Envoie (ou reprend) une campagne : destinataires lus par morceaux, une
+    connexion SMTP par lot, débit limité, progression enregistrée à chaque
+    lot. Retourne {'sent': n, 'failed': n}.
+    """
+    connection = connection or get_connection()
+    templates = (
+        Template(campaign.contenu_texte),
+        Template(campaign.contenu_html) if campaign.contenu_html else None,
+    )
+    throttle = Throttle(rate)
+
+    NewsletterCampaign.objects.filter(pk=campaign.pk, date_debut__isnull=True).update(date_debut=timezone.now())
+    NewsletterCampaign.objects.filter(pk=campaign.pk).update(status='sending')
+
+    stats = {'sent': 0, 'failed': 0}
+    for batch in _batches(recipients(campaign, chunk_size=batch_size), batch_size):
+        for delivery in _send_batch(campaign, batch, connection, templates, throttle):
+            stats[delivery.status] += 1
+        logger.info("Campagne %s : %s envoyé(s), %s échec(s)", campaign.pk, stats['sent'], stats['failed'])
+
+    NewsletterCampaign.objects.filter(pk=campaign.pk).update(status='sent', date_fin=timezone.now())
+    return stats
+
+
+@task(max_attempts=10, retry_delay=60, timeout=60 * 60)
+def send_campaign_task(campaign_id):
+    """Envoi par un worker ; une coupure SMTP relance la tâche, qui reprend là où elle s'est arrêtée"""
+    campaign = NewsletterCampaign.objects.filter(pk=campaign_id).exclude(status='sent').first()
+    if campaign is not None:
+        send_campaign(campaign)
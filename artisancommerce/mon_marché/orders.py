@@ -0,0 +1,41 @@
+# orders.py - Lecture de l'historique des commandes d'un utilisateur
+from django.db.models import Count, Prefetch, Q, Sum
+
+from .models import Commande, OrderLine
+from .pagination import CursorPaginator
+
+# Tri de l'historique, servi par l'index composite (user, date_commande)
+HISTORY_ORDERING = ('-date_commande', '-id')
+
+# Colonnes affichées dans la liste : le JSON items n'est jamais chargé
+HISTORY_FIELDS = (
+    'id', 'order_number', 'date_commande', 'total',
+    'payment_method', 'payment_status', 'order_status',
+)
+
+
+def order_stats(user):
+    """Nombre de commandes et total dépensé (commandes payées), en une seule requête"""
+    stats = Commande.objects.filter(user=user).aggregate(
+        total_orders=Count('id'),
+        total_spent=Sum('total', filter=Q(payment_status='paid')),
+    )
+    stats['total_spent'] = stats['total_spent'] or 0
+    return stats
+
+
+def order_history_page(user, cursor=None, per_page=10):
+    """
+    Page de l'historique : projection only() sur les commandes, lignes
+    préchargées en une requête, pagination par curseur sur (date, id).
+    """
+    lines = OrderLine.objects.select_related('product').only(
+        'id', 'order_id', 'product_name', 'unit_price', 'quantity',
+        'product__id', 'product__image', 'product__image_url',
+    )
+    commandes = (
+        Commande.objects.filter(user=user)
+        .only(*HISTORY_FIELDS)
+        .prefetch_related(Prefetch('lines', queryset=lines))
+    )
+    return CursorPaginator(commandes, per_page, HISTORY_ORDERING).get_page(cursor)
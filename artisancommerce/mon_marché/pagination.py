@@ -0,0 +1,161 @@
+# pagination.py - Pagination par curseur (keyset) des listes de produits
+import base64
+import datetime
+import json
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+# Ordres de tri supportés : l'id sert toujours de départage pour que la clé soit unique
+SORT_ORDERINGS = {
+    'newest': ('-date_ajout', '-id'),
+    'price-asc': ('price', 'id'),
+    'price-desc': ('-price', '-id'),
+    'name': ('title', 'id'),
+    'relevance': ('-search_rank', '-date_ajout', '-id'),
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class CursorEncoder(json.JSONEncoder):
+    """Sérialise les clés sans perte (DjangoJSONEncoder tronque les microsecondes)"""
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        if isinstance(o, Decimal):
+            return str(o)
+        return super().default(o)
+
+
+def encode_cursor(values, direction, ordering):
+    payload = json.dumps({'v': values, 'd': direction, 'o': ','.join(ordering)}, cls=CursorEncoder)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, ordering):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, direction = payload['v'], payload['d']
+        signature = payload['o']
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor(token)
+    # Un curseur n'est valable que pour l'ordre de tri qui l'a produit
+    if (direction not in ('next', 'prev') or signature != ','.join(ordering)
+            or not isinstance(values, list) or len(values) != len(ordering)):
+        raise InvalidCursor(token)
+    return values, direction
+
+
+def _keyset_filter(ordering, values, forward):
+    """
+    Construit la condition "après la ligne (v1, v2, ...)" pour l'ordre donné :
+    (f1 > v1) OR (f1 = v1 AND f2 > v2) OR ...
+    """
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        descending = field.startswith('-')
+        name = field.lstrip('-')
+        lookup = 'lt' if descending == forward else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+class CursorPage:
+    """Page de résultats ; s'itère comme une page de Paginator"""
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Pagination par curseur : ni COUNT(*) ni OFFSET, chaque page coûte une
+    seule requête "WHERE clé > curseur ORDER BY clé LIMIT n+1", quelle que
+    soit sa profondeur.
+    """
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+
+    def _key(self, obj):
+        # Instances de modèle, ou dictionnaires d'un queryset values()
+        if isinstance(obj, dict):
+            return [obj[field.lstrip('-')] for field in self.ordering]
+        return [getattr(obj, field.lstrip('-')) for field in self.ordering]
+
+    def _page_query(self, cursor, strict=False):
+        values, direction = None, 'next'
+        queryset = self.queryset
+        if cursor:
+            try:
+                values, direction = decode_cursor(cursor, self.ordering)
+                # Un curseur modifié peut porter des valeurs du mauvais type
+                queryset = queryset.filter(_keyset_filter(self.ordering, values, direction == 'next'))
+            except (InvalidCursor, ValidationError, ValueError, TypeError):
+                if strict:
+                    raise InvalidCursor(cursor)
+                values, direction, queryset = None, 'next', self.queryset
+
+        forward = direction == 'next'
+        if forward:
+            ordering = self.ordering
+        else:
+            ordering = tuple(f[1:] if f.startswith('-') else f'-{f}' for f in self.ordering)
+        return queryset.order_by(*ordering)[:self.per_page + 1], values, forward
+
+    def _build_page(self, rows, values, forward):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not forward:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or not forward:
+                next_cursor = encode_cursor(self._key(rows[-1]), 'next', self.ordering)
+            if values is not None and (forward or has_more):
+                previous_cursor = encode_cursor(self._key(rows[0]), 'prev', self.ordering)
+        return CursorPage(rows, next_cursor, previous_cursor)
+
+    def get_page(self, cursor=None, strict=False):
+        """
+        Retourne la page désignée par le jeton ; un jeton invalide renvoie la
+        première page, ou lève InvalidCursor avec ``strict`` (API)
+        """
+        queryset, values, forward = self._page_query(cursor, strict)
+        return self._build_page(list(queryset), values, forward)
+
+    async def aget_page(self, cursor=None, strict=False):
+        """Version asynchrone de get_page (vues ASGI)"""
+        queryset, values, forward = self._page_query(cursor, strict)
+        return self._build_page([row async for row in queryset], values, forward)
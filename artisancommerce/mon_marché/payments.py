@@ -0,0 +1,161 @@
+# payments.py - Réception idempotente des notifications de paiement (webhooks)
+import hashlib
+import hmac
+import logging
+import re
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .inventory import release_stock
+from .models import Commande, PaymentEvent
+from .rollups import refresh_order as refresh_order_rollups
+from .tasks import task
+
+logger = logging.getLogger(__name__)
+
+SUCCESS_STATUSES = {'success', 'succeeded', 'complete', 'completed'}
+FAILED_STATUSES = {'failed', 'cancelled', 'expired'}
+
+# Numéro généré par Commande.save ("CMD-2025-1A2B3C"), et ancien format "CMD-<id>"
+ORDER_NUMBER_RE = re.compile(r'^CMD-\d{4}-[0-9A-F]+$', re.IGNORECASE)
+LEGACY_REFERENCE_RE = re.compile(r'^CMD-(\d+)$', re.IGNORECASE)
+
+
+def parse_order_reference(reference):
+    """Filtre de recherche de la commande désignée par une référence, ou None"""
+    reference = (reference or '').strip()
+    if ORDER_NUMBER_RE.match(reference):
+        return {'order_number': reference.upper()}
+    match = LEGACY_REFERENCE_RE.match(reference)
+    if match:
+        return {'pk': int(match.group(1))}
+    return None
+
+
+# ==================== RÉCEPTION ====================
+
+# Écart maximal entre l'horodatage signé et l'heure de réception (rejeu)
+SIGNATURE_TOLERANCE = 5 * 60
+
+
+def verify_wave_signature(header, raw_body, secret=None, now=None):
+    """
+    Vérifie l'en-tête Wave-Signature "t=<horodatage>,v1=<signature>" : HMAC
+    SHA-256 de l'horodatage suivi du corps brut, avec WAVE_SECRET_KEY. Une
+    notification trop ancienne est refusée même bien signée.
+    """
+    secret = settings.WAVE_SECRET_KEY if secret is None else secret
+    timestamp, signatures = None, []
+    for part in (header or '').split(','):
+        name, _, value = part.strip().partition('=')
+        if name == 't':
+            timestamp = value
+        elif name == 'v1':
+            signatures.append(value)
+    if not (timestamp and timestamp.isdigit() and signatures):
+        return False
+    if abs((time.time() if now is None else now) - int(timestamp)) > SIGNATURE_TOLERANCE:
+        return False
+    expected = hmac.new(secret.encode(), timestamp.encode() + raw_body, hashlib.sha256).hexdigest()
+    return any(hmac.compare_digest(expected, signature) for signature in signatures)
+
+
+def record_event(provider, payload, raw_body=b''):
+    """
+    Enregistre une notification en un seul INSERT ... ON CONFLICT DO NOTHING :
+    une notification déjà reçue (même transaction_id) est ignorée par la base.
+    Sans transaction_id, l'empreinte du corps sert de clé. Le traitement est
+    confié aux workers (une seule tâche de traitement en attente à la fois).
+    """
+    transaction_id = str(payload.get('transaction_id') or '')
+    if not transaction_id:
+        transaction_id = 'sha256:' + hashlib.sha256(raw_body).hexdigest()
+
+    PaymentEvent.objects.bulk_create([PaymentEvent(
+        provider=provider,
+        transaction_id=transaction_id[:200],
+        reference=str(payload.get('reference') or '')[:100],
+        status=str(payload.get('status') or '')[:50].lower(),
+        payload=payload,
+    )], ignore_conflicts=True)
+    process_pending_events.delay()
+
+
+# ==================== TRAITEMENT ====================
+
+def _apply(event):
+    """Applique un événement ; retourne (résultat, id de commande)"""
+    lookup = parse_order_reference(event.reference)
+    if lookup is None:
+        return 'reference_invalide', None
+    commande_id = Commande.objects.filter(**lookup).values_list('id', flat=True).first()
+    if commande_id is None:
+        return 'commande_inconnue', None
+
+    # Transitions conditionnelles : seule une commande encore en attente
+    # change d'état, les notifications tardives ou contradictoires sont sans effet
+    pending = Commande.objects.filter(pk=commande_id, payment_status='pending')
+    if event.status in SUCCESS_STATUSES:
+        updated = pending.update(
+            payment_status='paid',
+            date_paiement=timezone.now(),
+            payment_reference=event.transaction_id,
+        )
+        if updated:
+            # update() ne déclenche pas le signal post_save
+            refresh_order_rollups.delay(commande_id)
+        return ('paye' if updated else 'ignore'), commande_id
+
+    if event.status in FAILED_STATUSES:
+        updated = pending.update(payment_status='failed', payment_reference=event.transaction_id)
+        if updated:
+            # update() ne déclenche pas le signal post_save : remise en stock et agrégats explicites
+            release_stock(Commande.objects.only('id', 'items').get(pk=commande_id))
+            refresh_order_rollups.delay(commande_id)
+        return ('echoue' if updated else 'ignore'), commande_id
+
+    return 'statut_inconnu', commande_id
+
+
+def apply_event(event_id):
+    """
+    Traite un événement dans une transaction. L'événement est d'abord
+    réclamé par un UPDATE conditionnel : deux workers ne peuvent pas
+    l'appliquer tous les deux.
+    """
+    with transaction.atomic():
+        claimed = PaymentEvent.objects.filter(
+            pk=event_id, date_traitement__isnull=True,
+        ).update(date_traitement=timezone.now())
+        if not claimed:
+            return None
+        event = PaymentEvent.objects.get(pk=event_id)
+        resultat, commande_id = _apply(event)
+        PaymentEvent.objects.filter(pk=event_id).update(resultat=resultat, commande_id=commande_id)
+    return resultat
+
+
+@task(unique=True)
+def process_pending_events(batch_size=100):
+    """
+    Traite les événements en attente par ordre d'arrivée. Un événement en
+    erreur reste en attente pour le passage suivant.
+    """
+    processed, last_id = 0, 0
+    while True:
+        ids = list(
+            PaymentEvent.objects.filter(date_traitement__isnull=True, id__gt=last_id)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return processed
+        for event_id in ids:
+            try:
+                if apply_event(event_id) is not None:
+                    processed += 1
+            except Exception:
+                logger.exception("Échec du traitement de l'événement de paiement #%s", event_id)
+        last_id = ids[-1]
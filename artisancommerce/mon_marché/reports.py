@@ -0,0 +1,63 @@
+# reports.py - Rapports de ventes calculés en SQL sur les lignes de commande
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+from .models import OrderLine, Product
+
+
+def sold_lines(prefix=''):
+    """
+    Les commandes annulées ou en échec de paiement ne comptent pas comme
+    ventes. ``prefix`` : chemin vers les lignes depuis un autre modèle
+    (ex. 'order_lines__' depuis Product).
+    """
+    return ~Q(**{f'{prefix}order__order_status': 'cancelled'}) & ~Q(**{f'{prefix}order__payment_status': 'failed'})
+
+
+SOLD_LINES = sold_lines()
+
+
+def _lines(since=None, until=None, paid_only=False):
+    lines = OrderLine.objects.filter(SOLD_LINES)
+    if since:
+        lines = lines.filter(order__date_commande__gte=since)
+    if until:
+        lines = lines.filter(order__date_commande__lt=until)
+    if paid_only:
+        lines = lines.filter(order__payment_status='paid')
+    return lines
+
+
+def best_sellers(limit=10, since=None, until=None):
+    """Produits les plus vendus (unités), avec leur chiffre d'affaires"""
+    return list(
+        _lines(since, until)
+        .filter(product__isnull=False)
+        .values('product_id', 'product__title')
+        .annotate(units=Sum('quantity'), revenue=Sum('line_total'), orders=Count('order_id', distinct=True))
+        .order_by('-units')[:limit]
+    )
+
+
+def revenue_by_day(since=None, until=None, paid_only=True):
+    """Chiffre d'affaires et unités vendues par jour"""
+    return list(
+        _lines(since, until, paid_only)
+        .annotate(day=TruncDate('order__date_commande'))
+        .values('day')
+        .annotate(revenue=Sum('line_total'), units=Sum('quantity'))
+        .order_by('day')
+    )
+
+
+def stock_report(since=None, low_stock=5):
+    """Stock restant face aux ventes de la période, produits en rupture proche en tête"""
+    sold = Q(order_lines__order__date_commande__gte=since) if since else Q()
+    sold &= sold_lines('order_lines__')
+    return list(
+        Product.objects.filter(is_active=True)
+        .annotate(units_sold=Coalesce(Sum('order_lines__quantity', filter=sold), 0))
+        .filter(Q(stock__lte=low_stock) | Q(units_sold__gt=F('stock')))
+        .values('id', 'title', 'stock', 'units_sold')
+        .order_by('stock', '-units_sold')
+    )
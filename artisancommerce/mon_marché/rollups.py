@@ -0,0 +1,232 @@
+# rollups.py - Agrégats journaliers des ventes (SalesRollup)
+#
+# Chaque commande est comptée une fois par dimension, sous son état (statut
+# de paiement, ou "cancelled") : commandes, unités et chiffre d'affaires
+# (lignes pour produit et catégorie, total de la commande sinon).
+#
+# Mise à jour incrémentale : refresh_order compare l'état courant de la
+# commande à celui sous lequel elle est comptée (Commande.rollup_state),
+# retire l'ancienne contribution et ajoute la nouvelle. La tâche est
+# idempotente et mise en file à chaque enregistrement de commande (signal)
+# et après les transitions de paiement faites par update() (payments.py) ;
+# une commande supprimée est retirée par remove_order (signal pre_delete).
+# rebuild() recalcule une plage de jours en SQL, un jour à la fois.
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, CharField, Count, F, Sum, Value, When
+from django.db.models.functions import Concat
+from django.utils import timezone
+
+from .models import Categorie, Commande, OrderLine, Product, SalesRollup
+from .tasks import task
+
+ORDER_DIMENSIONS = {
+    'payment_method': 'payment_method',
+    'ville': 'ville',
+    'order_status': 'order_status',
+}
+LINE_DIMENSIONS = {
+    'product': 'product_id',
+    'category': 'product__Categorie_id',
+}
+
+
+def order_state(order):
+    return 'cancelled' if order.order_status == 'cancelled' else order.payment_status
+
+
+def rollup_state(order):
+    """Ce qui change la contribution d'une commande : état et statut de commande"""
+    return f'{order_state(order)}:{order.order_status}'
+
+
+def _state_expression(prefix=''):
+    return Case(
+        When(**{f'{prefix}order_status': 'cancelled'}, then=Value('cancelled')),
+        default=F(f'{prefix}payment_status'),
+        output_field=CharField(),
+    )
+
+
+# ==================== MISE À JOUR INCRÉMENTALE ====================
+
+def _contributions(order, state, order_status):
+    """{(jour, dimension, valeur, état): [commandes, unités, chiffre d'affaires]}"""
+    day = timezone.localdate(order.date_commande)
+    rows = defaultdict(lambda: [1, 0, Decimal(0)])
+    units = 0
+    lines = OrderLine.objects.filter(order=order).values_list('product_id', 'product__Categorie_id',
+                                                              'quantity', 'line_total')
+    for product_id, category_id, quantity, line_total in lines:
+        units += quantity
+        # Une commande compte une fois par valeur, même sur plusieurs lignes
+        for dimension, key in (('product', product_id), ('category', category_id)):
+            if key is not None:
+                row = rows[(day, dimension, str(key), state)]
+                row[1] += quantity
+                row[2] += line_total
+    keys = {'payment_method': order.payment_method, 'ville': order.ville, 'order_status': order_status}
+    for dimension, key in keys.items():
+        rows[(day, dimension, key, state)] = [1, units, order.total]
+    return rows
+
+
+def _add(day, dimension, key, state, orders, units, revenue):
+    rollups = SalesRollup.objects.filter(day=day, dimension=dimension, key=key, state=state)
+    changes = {'orders': F('orders') + orders, 'units': F('units') + units, 'revenue': F('revenue') + revenue}
+    if rollups.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            SalesRollup.objects.create(day=day, dimension=dimension, key=key, state=state,
+                                       orders=orders, units=units, revenue=revenue)
+    except IntegrityError:
+        # Créée entre-temps pour une autre commande du même jour
+        rollups.update(**changes)
+
+
+def _apply(order, counted_as, sign):
+    state, _, order_status = counted_as.partition(':')
+    for key, (orders, units, revenue) in _contributions(order, state, order_status).items():
+        _add(*key, sign * orders, sign * units, sign * revenue)
+
+
+@task(unique=True)
+def refresh_order(order_id):
+    """Aligne les agrégats sur l'état courant de la commande ; sans effet s'ils le sont déjà"""
+    with transaction.atomic():
+        order = Commande.objects.select_for_update().filter(pk=order_id).first()
+        if order is None:
+            return None
+        previous, current = order.rollup_state, rollup_state(order)
+        if previous == current:
+            return current
+        if previous:
+            _apply(order, previous, -1)
+        _apply(order, current, 1)
+        Commande.objects.filter(pk=order_id).update(rollup_state=current)
+    return current
+
+
+def remove_order(order):
+    """Retire une commande supprimée (avant la suppression de ses lignes)"""
+    if order.rollup_state:
+        _apply(order, order.rollup_state, -1)
+
+
+# ==================== RECALCUL ====================
+
+def _day_bounds(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def rebuild_day(day):
+    """
+    Recalcule les agrégats d'un jour (date locale) ; retourne le nombre de
+    lignes écrites. Un jour à la fois : pas de troncature de date en SQL.
+    """
+    orders = Commande.objects.filter(date_commande__gte=_day_bounds(day),
+                                     date_commande__lt=_day_bounds(day + timedelta(days=1)))
+    lines = OrderLine.objects.filter(order__in=orders)
+    # Toutes les dimensions : l'index unique (dimension, day, ...) sert la suppression
+    previous = SalesRollup.objects.filter(dimension__in=[*LINE_DIMENSIONS, *ORDER_DIMENSIONS], day=day)
+    if not orders.exists():
+        previous.delete()
+        return 0
+    with transaction.atomic():
+        # D'abord marquer (et verrouiller) les commandes : un refresh_order en
+        # cours attend la fin du recalcul, puis n'a plus rien à faire
+        orders.update(rollup_state=Concat(_state_expression(), Value(':'), F('order_status')))
+        previous.delete()
+
+        rows = []
+        for dimension, field in LINE_DIMENSIONS.items():
+            grouped = (
+                lines.exclude(**{f'{field}__isnull': True})
+                .values(key=F(field), state=_state_expression('order__'))
+                .annotate(orders=Count('order_id', distinct=True), units=Sum('quantity'), revenue=Sum('line_total'))
+                .order_by()
+            )
+            rows += [SalesRollup(day=day, dimension=dimension, **{**row, 'key': str(row['key'])}) for row in grouped]
+        for dimension, field in ORDER_DIMENSIONS.items():
+            units = {
+                (row['key'], row['state']): row['units']
+                for row in lines.values(key=F(f'order__{field}'), state=_state_expression('order__'))
+                .annotate(units=Sum('quantity')).order_by()
+            }
+            grouped = (
+                orders.values(key=F(field), state=_state_expression())
+                .annotate(orders=Count('id'), revenue=Sum('total')).order_by()
+            )
+            rows += [
+                SalesRollup(day=day, dimension=dimension, units=units.get((row['key'], row['state']), 0), **row)
+                for row in grouped
+            ]
+        SalesRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def rebuild(since=None, until=None, progress=None):
+    """
+    Recalcule les agrégats des jours [since, until] (dates locales, défaut :
+    de la première commande à aujourd'hui), un jour par transaction.
+    Retourne le nombre de lignes écrites.
+    """
+    if since is None:
+        first = Commande.objects.order_by('date_commande').values_list('date_commande', flat=True).first()
+        if first is None:
+            return 0
+        since = timezone.localdate(first)
+    until = until or timezone.localdate()
+    written, day = 0, since
+    while day <= until:
+        written += rebuild_day(day)
+        if progress:
+            progress(day, written)
+        day += timedelta(days=1)
+    return written
+
+
+# ==================== TABLEAU DE BORD ====================
+
+# Comme reports.SOLD_LINES : ni commandes annulées ni paiements échoués
+SOLD_STATES = ('pending', 'paid', 'refunded')
+TOTALS = {'orders': Sum('orders'), 'units': Sum('units'), 'revenue': Sum('revenue')}
+
+
+def dashboard(since, until, limit=10):
+    """Chiffres de la période [since, until], lus uniquement dans SalesRollup"""
+    period = SalesRollup.objects.filter(day__gte=since, day__lte=until)
+    # Chaque commande compte une fois par dimension : les moyens de paiement donnent les totaux
+    orders = period.filter(dimension='payment_method')
+    sold = period.filter(state__in=SOLD_STATES)
+
+    def top(dimension, rows=sold):
+        return list(
+            rows.filter(dimension=dimension).values('key').annotate(**TOTALS)
+            .exclude(orders=0).order_by('-revenue', 'key')[:limit]
+        )
+
+    def label(rows, names):
+        for row in rows:
+            row['label'] = names.get(row['key'], row['key']) or '—'
+        return rows
+
+    products, categories = top('product'), top('category')
+    product_names = dict(Product.objects.filter(id__in=[row['key'] for row in products]).values_list('id', 'title'))
+    category_names = dict(Categorie.objects.filter(id__in=[row['key'] for row in categories]).values_list('id', 'name'))
+    return {
+        'by_state': label([{**row, 'key': row['state']}
+                           for row in orders.values('state').annotate(**TOTALS).order_by('state')],
+                          dict(SalesRollup.STATES)),
+        'sold': orders.filter(state__in=SOLD_STATES).aggregate(**TOTALS),
+        'by_day': list(orders.filter(state__in=SOLD_STATES).values('day').annotate(**TOTALS).order_by('day')),
+        'products': label(products, {str(pk): title for pk, title in product_names.items()}),
+        'categories': label(categories, {str(pk): name for pk, name in category_names.items()}),
+        'payment_methods': label(top('payment_method'), dict(Commande.PAYMENT_METHODS)),
+        'villes': label(top('ville'), {}),
+        'order_statuses': label(top('order_status', period), dict(Commande.ORDER_STATUS)),
+    }
@@ -0,0 +1,98 @@
+# routers.py - Lectures du catalogue sur les répliques, écritures sur la base principale
+#
+# Les répliques (settings.DATABASE_REPLICAS) sont en retard sur la principale.
+# Une lecture reste sur la principale :
+#   - dans une transaction (réservation du stock, validation de commande...) ;
+#   - après une écriture du catalogue, dans la même requête et, grâce à un
+#     cookie, pendant REPLICA_STICKY_SECONDS pour le même client (voir
+#     ReplicaPinMiddleware) : il relit toujours ce qu'il vient d'écrire.
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_MODELS = frozenset(getattr(settings, 'REPLICA_MODELS', [
+    'mon_marché.Product', 'mon_marché.Categorie', 'mon_marché.ProductReview', 'mon_marché.ProductNeighbour',
+]))
+STICKY_SECONDS = getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+STICKY_COOKIE = 'primary_until'
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+class PinState:
+    """Requête en cours : lectures forcées sur la principale, écriture du catalogue faite"""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+# Objet mutable : les threads de sync_to_async partagent l'état de la requête
+_state = contextvars.ContextVar('replica_pin_state', default=None)
+
+
+def begin(pinned=False):
+    state = PinState(pinned)
+    return state, _state.set(state)
+
+
+def end(token):
+    _state.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Lectures sur la principale dans ce bloc (tâches, commandes relisant leurs écritures)"""
+    state, token = begin(pinned=True)
+    try:
+        yield state
+    finally:
+        end(token)
+
+
+def _pinned():
+    state = _state.get()
+    if state is not None and (state.pinned or state.wrote):
+        return True
+    return connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+def _label(model):
+    # Les pseudo-modèles (CacheEntry de DatabaseCache) n'ont pas de label
+    return getattr(model._meta, 'label', None)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = replica_aliases()
+        if not replicas:
+            return None
+        # Les autres modèles ne suivent pas l'instance d'origine (hints) : une
+        # relation d'un produit lu sur une réplique se lit sur la principale
+        if _label(model) not in REPLICA_MODELS or _pinned():
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if _label(model) in REPLICA_MODELS:
+            state = _state.get()
+            if state is not None:
+                state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Les répliques reçoivent le schéma avec les données (copie ou réplication)
+        if db in replica_aliases():
+            return False
+        return None
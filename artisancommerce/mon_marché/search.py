@@ -0,0 +1,190 @@
+# search.py - Recherche plein texte indexée sur les produits
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+# Table FTS5 (SQLite) qui double le titre et la description de chaque produit.
+# Le rowid de l'index est l'id du produit.
+FTS_TABLE = 'mon_marché_product_fts'
+
+# Configuration de recherche PostgreSQL (french + unaccent), créée par la migration
+PG_SEARCH_CONFIG = 'fr_unaccent'
+
+# Poids BM25 : le titre compte davantage que la description
+TITLE_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+_fts_available = None
+
+
+# ==================== NORMALISATION ====================
+
+def normalize_text(text):
+    """Minuscules et suppression des accents ("Poterie Céramique" -> "poterie ceramique")"""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+    """Découpe une requête en mots normalisés"""
+    return re.findall(r'\w+', normalize_text(text))
+
+
+def build_match_expression(query):
+    """
+    Construit l'expression MATCH FTS5 : chaque mot est recherché en préfixe
+    ("chaus" trouve "chaussure") et tous les mots doivent être présents.
+    """
+    return ' '.join(f'"{token}"*' for token in tokenize(query))
+
+
+# ==================== BACKENDS ====================
+
+def fts_available():
+    """Indique si la table FTS5 existe (SQLite compilé avec FTS5 et migration appliquée)"""
+    global _fts_available
+    if not _fts_available:
+        # Un résultat négatif n'est pas mémorisé : la table peut apparaître
+        # après coup (migrate lancé dans le même processus)
+        _fts_available = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available
+
+
+def _sqlite_search(queryset, query):
+    match = build_match_expression(query)
+    if not match:
+        # Aucun mot ("!!!") : rien ne correspond, mais le tri par pertinence
+        # doit rester possible
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())), Q(pk__in=[])
+
+    product_table = queryset.model._meta.db_table
+    matches = Q(id__in=RawSQL(
+        f'SELECT rowid FROM "{FTS_TABLE}" WHERE "{FTS_TABLE}" MATCH %s',
+        [match],
+    ))
+    # bm25() est négatif (plus petit = plus pertinent) : on l'inverse pour que
+    # search_rank soit décroissant sur tous les backends
+    rank = RawSQL(
+        f'SELECT -bm25("{FTS_TABLE}", %s, %s) FROM "{FTS_TABLE}" '
+        f'WHERE "{FTS_TABLE}" MATCH %s AND rowid = "{product_table}"."id"',
+        [TITLE_WEIGHT, DESCRIPTION_WEIGHT, match],
+        output_field=FloatField(),
+    )
+    return queryset.annotate(search_rank=rank), matches
+
+
+def _postgres_search(queryset, query):
+    from django.contrib.postgres.search import SearchQuery, SearchRank
+
+    search_query = SearchQuery(query, config=PG_SEARCH_CONFIG, search_type='websearch')
+    queryset = queryset.annotate(
+        search_vector=product_search_vector(),
+    ).annotate(
+        search_rank=SearchRank(F('search_vector'), search_query),
+    )
+    return queryset, Q(search_vector=search_query)
+
+
+def _fallback_search(queryset, query):
+    matches = Q(title__icontains=query) | Q(description__icontains=query)
+    return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())), matches
+
+
+def product_search_vector():
+    """
+    Vecteur de recherche PostgreSQL des produits. Doit rester identique à
+    l'expression de l'index GIN créé par la migration 0013.
+    """
+    from django.contrib.postgres.search import SearchVector
+
+    return (
+        SearchVector('title', weight='A', config=PG_SEARCH_CONFIG)
+        + SearchVector('description', weight='B', config=PG_SEARCH_CONFIG)
+    )
+
+
+# ==================== API ====================
+
+def matching_category_ids(query):
+    """
+    Catégories dont le nom contient tous les mots de la requête (sans accents).
+    Les catégories viennent du cache du catalogue : le filtrage se fait en Python.
+    """
+    from .catalog import get_categories
+
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    ids = []
+    for category in get_categories():
+        words = tokenize(category.name)
+        if all(any(word.startswith(token) for word in words) for token in tokens):
+            ids.append(category.id)
+    return ids
+
+
+def search_products(queryset, query, include_categories=False):
+    """
+    Filtre un queryset de produits par recherche plein texte et l'annote avec
+    ``search_rank`` (plus grand = plus pertinent).
+
+    SQLite utilise l'index FTS5, PostgreSQL l'index GIN tsvector ; les autres
+    backends retombent sur ``icontains``. Avec ``include_categories``, les
+    produits des catégories dont le nom correspond sont aussi retournés.
+    """
+    if fts_available():
+        queryset, matches = _sqlite_search(queryset, query)
+    elif connection.vendor == 'postgresql':
+        queryset, matches = _postgres_search(queryset, query)
+    else:
+        queryset, matches = _fallback_search(queryset, query)
+
+    if include_categories:
+        category_ids = matching_category_ids(query)
+        if category_ids:
+            matches |= Q(Categorie_id__in=category_ids)
+
+    return queryset.filter(matches)
+
+
+# ==================== MAINTENANCE DE L'INDEX ====================
+
+def index_product(product):
+    """Insère ou remplace un produit dans l'index FTS5"""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{FTS_TABLE}" WHERE rowid = %s', [product.pk])
+        cursor.execute(
+            f'INSERT INTO "{FTS_TABLE}" (rowid, title, description) VALUES (%s, %s, %s)',
+            [product.pk, product.title, product.description],
+        )
+
+
+def unindex_product(product_id):
+    """Retire un produit de l'index FTS5"""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{FTS_TABLE}" WHERE rowid = %s', [product_id])
+
+
+def rebuild_index():
+    """Reconstruit entièrement l'index FTS5 à partir de la table des produits"""
+    if not fts_available():
+        return
+    from .models import Product
+
+    product_table = Product._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{FTS_TABLE}"')
+        cursor.execute(
+            f'INSERT INTO "{FTS_TABLE}" (rowid, title, description) '
+            f'SELECT id, title, description FROM "{product_table}"'
+        )
@@ -0,0 +1,138 @@
+# signals.py - Maintenance des données dérivées des modèles
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from .models import Categorie, Commande, Favorite, Product, ProductReview, UserProfile
+from . import cart, catalog, database, favorites, images, inventory, rollups, search
+
+
+# ==================== INDEX DE RECHERCHE ====================
+
+@receiver(post_save, sender=Product)
+def index_product_on_save(sender, instance, **kwargs):
+    """Met à jour l'index plein texte quand un produit est créé ou modifié"""
+    search.index_product(instance)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product_on_delete(sender, instance, **kwargs):
+    """Retire le produit supprimé de l'index plein texte"""
+    search.unindex_product(instance.pk)
+
+
+# ==================== CACHE DU CATALOGUE ====================
+
+@receiver(post_save, sender=Categorie)
+@receiver(post_delete, sender=Categorie)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductReview)
+@receiver(post_delete, sender=ProductReview)
+def invalidate_catalog(sender, **kwargs):
+    """
+    Toute modification d'une catégorie, d'un produit ou d'un avis (notes
+    affichées sur les cartes) change le catalogue et les ETag des listes.
+    Nouvelle version après le commit : une requête concurrente ne peut pas
+    mettre en cache l'état d'avant la transaction sous la nouvelle version.
+    """
+    transaction.on_commit(catalog.bump_catalog_version)
+
+
+# ==================== DÉCLINAISONS DES IMAGES ====================
+
+IMAGE_FIELDS = {Product: 'image', Categorie: 'image', UserProfile: 'profile_pic'}
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Categorie)
+@receiver(post_save, sender=UserProfile)
+def generate_image_variants(sender, instance, raw=False, **kwargs):
+    """Planifie les miniatures et WebP quand l'image source est nouvelle"""
+    field_name = IMAGE_FIELDS[sender]
+    if not raw and images.needs_derivatives(instance, field_name):
+        images.schedule_derivatives(instance, field_name)
+
+
+# ==================== AGRÉGATS DES AVIS ====================
+
+@receiver(post_delete, sender=ProductReview)
+def remove_review_from_aggregates(sender, instance, **kwargs):
+    """Retire la note supprimée des agrégats du produit"""
+    field = Product.rating_field(instance.rating)
+    Product.objects.filter(pk=instance.product_id, review_count__gt=0).update(
+        review_count=F('review_count') - 1,
+        rating_sum=F('rating_sum') - instance.rating,
+        **{field: F(field) - 1},
+    )
+
+
+# ==================== PANIER ====================
+
+@receiver(user_logged_in)
+def merge_session_cart(sender, request, user, **kwargs):
+    """Fusionne le panier anonyme de la session dans celui de l'utilisateur connecté"""
+    if request is None or not hasattr(request, 'session'):
+        return
+    cart_id = request.session.pop(cart.SESSION_CART_KEY, None)
+    if cart_id is None:
+        return
+    session_cart = cart.Cart.objects.filter(id=cart_id, user__isnull=True).first()
+    if session_cart is None:
+        return
+    user_cart, _ = cart.Cart.objects.get_or_create(user=user)
+    cart.merge_carts(session_cart, user_cart)
+
+
+# ==================== FAVORIS ====================
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+def invalidate_favorites(sender, instance, **kwargs):
+    """
+    Vide le cache des favoris de l'utilisateur après le commit : une requête
+    concurrente ne peut pas y remettre l'état d'avant la transaction
+    """
+    user_id = instance.user_id
+    transaction.on_commit(lambda: favorites.invalidate(user_id))
+
+
+# ==================== STOCK ====================
+
+@receiver(post_save, sender=Commande)
+def release_stock_on_cancel(sender, instance, **kwargs):
+    """Remet en stock les articles d'une commande annulée ou dont le paiement a échoué"""
+    if instance.stock_reserved and (
+        instance.order_status == 'cancelled' or instance.payment_status == 'failed'
+    ):
+        inventory.release_stock(instance)
+
+
+# ==================== STATISTIQUES DE VENTES ====================
+
+@receiver(post_save, sender=Commande)
+def refresh_sales_rollups(sender, instance, raw=False, **kwargs):
+    """
+    Recompte la commande dans les agrégats (création, changement de statut).
+    La tâche part avec la transaction : les lignes de commande sont alors écrites.
+    """
+    if raw:
+        return
+    rollups.refresh_order.delay(instance.pk)
+
+
+@receiver(pre_delete, sender=Commande)
+def remove_from_sales_rollups(sender, instance, **kwargs):
+    """Retire la commande des agrégats tant que ses lignes existent encore"""
+    rollups.remove_order(instance)
+
+
+# ==================== CONNEXIONS ====================
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        database.configure_sqlite(connection)
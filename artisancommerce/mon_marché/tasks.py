@@ -0,0 +1,220 @@
+# tasks.py - File de tâches en base de données
+import logging
+import os
+import random
+import socket
+import traceback
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+# models importe images, qui déclare des tâches : Task est résolu à l'appel
+from . import models
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_DELAY = 10          # secondes, doublé à chaque échec
+MAX_RETRY_DELAY = 60 * 60
+DEFAULT_TIMEOUT = 5 * 60          # délai de visibilité d'une tâche réclamée
+
+_registry = {}
+
+
+# ==================== DÉCLARATION ====================
+
+class TaskFunction:
+    """
+    Fonction déclarée avec @task. L'appel direct l'exécute tout de suite ;
+    ``delay()`` l'enregistre dans la file pour un worker.
+    """
+
+    def __init__(self, func, max_attempts, retry_delay, timeout, unique):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self.unique = unique
+        self.__doc__ = func.__doc__
+        self.__name__ = func.__name__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """
+        Met la tâche en file. L'insertion fait partie de la transaction
+        courante : la tâche n'est visible des workers qu'après le commit, et
+        disparaît avec un rollback. Les arguments doivent être sérialisables en JSON.
+        """
+        if getattr(settings, 'TASKS_EAGER', False):
+            transaction.on_commit(lambda: self.func(*args, **kwargs))
+            return None
+
+        unique_key = None
+        if self.unique:
+            unique_key = f'{self.name}:{args!r}:{sorted(kwargs.items())!r}'[:200]
+        task = models.Task(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            unique_key=unique_key,
+            max_attempts=self.max_attempts,
+            timeout=self.timeout,
+        )
+        # Avec une clé unique, un doublon encore en attente est ignoré par la base
+        models.Task.objects.bulk_create([task], ignore_conflicts=self.unique)
+        return task
+
+
+def task(func=None, *, max_attempts=DEFAULT_MAX_ATTEMPTS, retry_delay=DEFAULT_RETRY_DELAY,
+         timeout=DEFAULT_TIMEOUT, unique=False):
+    """
+    Déclare une tâche d'arrière-plan::
+
+        @task(max_attempts=3)
+        def send_order_confirmation(order_id):
+            ...
+
+        send_order_confirmation.delay(commande.id)
+
+    ``unique`` : une seule tâche en attente par jeu d'arguments.
+    """
+    def decorator(func):
+        task_function = TaskFunction(func, max_attempts, retry_delay, timeout, unique)
+        _registry[task_function.name] = task_function
+        return task_function
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def get_task(name):
+    """Retrouve une tâche par son nom, en important son module si besoin"""
+    if name not in _registry:
+        module_name = name.rsplit('.', 1)[0]
+        import_module(module_name)
+    return _registry[name]
+
+
+# ==================== RÉCLAMATION ====================
+
+def _due_tasks(now):
+    # En attente et dues, ou réclamées par un worker qui n'a pas terminé à temps
+    return models.Task.objects.filter(
+        Q(status='pending', run_at__lte=now) | Q(status='running', locked_until__lt=now)
+    ).order_by('run_at', 'id')
+
+
+def _lock(queryset, worker_id, now, timeout):
+    return queryset.update(
+        status='running',
+        attempts=F('attempts') + 1,
+        locked_by=worker_id,
+        locked_until=now + timedelta(seconds=timeout),
+    )
+
+
+def claim_task(worker_id):
+    """
+    Réclame la prochaine tâche due, ou retourne None.
+
+    PostgreSQL : SELECT ... FOR UPDATE SKIP LOCKED, les workers concurrents
+    passent les lignes déjà verrouillées au lieu de s'attendre. SQLite (pas
+    de verrou de ligne, écritures sérialisées) : UPDATE conditionnel sur
+    l'état lu, le premier worker qui l'applique gagne la tâche.
+    """
+    now = timezone.now()
+    due = _due_tasks(now)
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            row = due.select_for_update(skip_locked=True).values_list('id', 'timeout').first()
+            if row is None:
+                return None
+            task_id, timeout = row
+            _lock(models.Task.objects.filter(pk=task_id), worker_id, now, timeout)
+        return models.Task.objects.get(pk=task_id)
+
+    for candidate in due.values('id', 'status', 'locked_until', 'timeout')[:10]:
+        claimed = _lock(models.Task.objects.filter(
+            pk=candidate['id'],
+            status=candidate['status'],
+            locked_until=candidate['locked_until'],
+        ), worker_id, now, candidate['timeout'])
+        if claimed:
+            return models.Task.objects.get(pk=candidate['id'])
+    return None
+
+
+# ==================== EXÉCUTION ====================
+
+def retry_delay(task_function, attempts):
+    """Attente exponentielle avant la tentative suivante, avec un peu d'aléa"""
+    delay = min(task_function.retry_delay * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+    return delay * random.uniform(1.0, 1.1)
+
+
+def run_task(task_row, worker_id):
+    """
+    Exécute une tâche réclamée et enregistre le résultat. Les écritures sont
+    conditionnées à locked_by : un worker dont la tâche a été reprise après
+    expiration du délai de visibilité n'écrase pas le nouvel état.
+    """
+    mine = models.Task.objects.filter(pk=task_row.pk, locked_by=worker_id, status='running')
+    now = timezone.now()
+    try:
+        task_function = get_task(task_row.name)
+    except (ImportError, KeyError):
+        mine.update(status='failed', last_error=f"Tâche inconnue : {task_row.name}", date_fin=now)
+        return False
+
+    if task_row.attempts > task_row.max_attempts:
+        # Tâche reprise après expiration : le worker précédent a planté ou bloqué
+        mine.update(status='failed', last_error=task_row.last_error or "Délai de visibilité dépassé", date_fin=now)
+        return False
+
+    try:
+        task_function.func(*task_row.args, **task_row.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Échec de la tâche %s #%s (tentative %s)", task_row.name, task_row.pk, task_row.attempts)
+        now = timezone.now()
+        if task_row.attempts >= task_row.max_attempts:
+            mine.update(status='failed', last_error=error, date_fin=now, locked_until=None)
+        else:
+            delay = retry_delay(task_function, task_row.attempts)
+            try:
+                with transaction.atomic():
+                    mine.update(
+                        status='pending',
+                        last_error=error,
+                        run_at=now + timedelta(seconds=delay),
+                        locked_by='',
+                        locked_until=None,
+                    )
+            except IntegrityError:
+                # Tâche unique : une tâche identique est déjà en attente et la remplace
+                mine.update(status='done', last_error=error, date_fin=now, locked_until=None)
+        return False
+
+    return bool(mine.update(status='done', date_fin=timezone.now(), locked_until=None))
+
+
+def run_next(worker_id):
+    """Réclame et exécute une tâche ; False si la file est vide"""
+    task_row = claim_task(worker_id)
+    if task_row is None:
+        return False
+    run_task(task_row, worker_id)
+    return True
+
+
+def worker_id(index=0):
+    return f'{socket.gethostname()}:{os.getpid()}:{index}'
@@ -0,0 +1,110 @@
+# product_cards.py - Cache de fragments pour les cartes produit des listes
+import hashlib
+import threading
+from collections import Counter
+
+from django import template
+from django.conf import settings
+from django.core.cache import caches
+
+register = template.Library()
+
+CARD_CACHE_TIMEOUT = getattr(settings, 'PRODUCT_CARD_CACHE_TIMEOUT', 60 * 60)
+CARD_CACHE_ALIAS = getattr(settings, 'PRODUCT_CARD_CACHE_ALIAS', 'default')
+
+# Compteurs du processus courant, lus par card_cache_stats()
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def card_cache_stats():
+    """Succès / échecs du cache des cartes depuis le démarrage du processus"""
+    with _stats_lock:
+        hits, misses = _stats['hits'], _stats['misses']
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 3) if total else 0.0,
+    }
+
+
+def reset_card_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def card_cache_key(product, variant, vary_on=()):
+    """
+    La clé contient date_modification : toute modification du produit via
+    save() produit une nouvelle clé, sans invalidation explicite. Les agrégats
+    d'avis, mis à jour par UPDATE sans toucher date_modification, y figurent
+    aussi, ainsi que le nom de la catégorie affiché sur la carte (renommer une
+    catégorie ne modifie pas ses produits ; les listes la chargent par
+    select_related).
+    """
+    modified = product.date_modification.timestamp() if product.date_modification else 0
+    category = product.Categorie.name if product.Categorie_id else ''
+    vary = ':'.join(str(value) for value in (category, *vary_on))
+    digest = hashlib.md5(vary.encode(), usedforsecurity=False).hexdigest()
+    return (
+        f'card:{variant}:{product.pk}:{modified}:'
+        f'{getattr(product, "review_count", 0)}:{getattr(product, "rating_sum", 0)}:{digest}'
+    )
+
+
+class ProductCardNode(template.Node):
+    def __init__(self, nodelist, product, variant, vary_on):
+        self.nodelist = nodelist
+        self.product = product
+        self.variant = variant
+        self.vary_on = vary_on
+
+    def render(self, context):
+        product = self.product.resolve(context)
+        variant = self.variant.resolve(context)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+
+        cache = caches[CARD_CACHE_ALIAS]
+        key = card_cache_key(product, variant, vary_on)
+        fragment = cache.get(key)
+        if fragment is None:
+            _record('misses')
+            fragment = self.nodelist.render(context)
+            cache.set(key, fragment, CARD_CACHE_TIMEOUT)
+        else:
+            _record('hits')
+        return fragment
+
+
+@register.tag('cache_product_card')
+def do_cache_product_card(parser, token):
+    """
+    Met en cache le rendu d'une carte produit::
+
+        {% cache_product_card product "products" user.is_authenticated product.is_favorite %}
+            ... balisage de la carte ...
+        {% endcache_product_card %}
+
+    Le deuxième argument distingue les gabarits de carte ; les suivants sont
+    les valeurs dont dépend le fragment (état de l'utilisateur, favori...).
+    Ne jamais y placer de {% csrf_token %}.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' attend au moins un produit et un nom de variante."
+        )
+    nodelist = parser.parse(('endcache_product_card',))
+    parser.delete_first_token()
+    return ProductCardNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        parser.compile_filter(bits[2]),
+        [parser.compile_filter(bit) for bit in bits[3:]],
+    )
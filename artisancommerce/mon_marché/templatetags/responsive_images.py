@@ -0,0 +1,33 @@
+# responsive_images.py - Balises pour les déclinaisons d'images (miniatures + WebP)
+from django import template
+from django.utils.html import format_html
+
+from mon_marché import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def image_url(obj, size=None):
+    """
+    URL de l'image d'un produit, d'une catégorie ou d'un profil dans la taille
+    demandée ; l'image d'origine tant que la déclinaison n'existe pas::
+
+        <img src="{% image_url product 'thumb' %}">
+    """
+    return obj.get_image_url(size=size) or ''
+
+
+@register.simple_tag
+def srcset(obj, sizes='100vw', kind='webp'):
+    """
+    Attributs ``srcset`` et ``sizes`` listant les déclinaisons WebP de l'image ;
+    le navigateur choisit la plus petite qui couvre l'affichage. Ne produit
+    rien si les déclinaisons ne sont pas encore générées::
+
+        <img src="{% image_url product 'thumb' %}" {% srcset product "(max-width: 600px) 50vw, 280px" %}>
+    """
+    candidates = images.srcset(getattr(obj, 'image_variants', None), kind=kind)
+    if not candidates:
+        return ''
+    return format_html('srcset="{}" sizes="{}"', candidates, sizes)
@@ -1,3 +1,743 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import os
+import re
+import shutil
+import smtplib
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import catalog, feed, metrics, reports
+from .cart import set_quantities
+from .feed import product_page
+from .inventory import InsufficientStock, release_stock, reserve_stock
+from .listings import index_listing, neighbour_products, products_listing, same_category_products, search_listing
+from .models import (
+    Cart, Categorie, Commande, Favorite, NewsletterCampaign, NewsletterDelivery, NewsletterSubscriber, OrderLine,
+    PaymentEvent, Product, ProductReview, SalesRollup, ShippingAddress, Task,
+)
+from .newsletter import send_campaign
+from .orders import HISTORY_ORDERING
+from .pagination import SORT_ORDERINGS, CursorPaginator, InvalidCursor, encode_cursor
+from .tasks import claim_task, retry_delay, run_next, run_task, task
+
+# "SCAN mon_marché_product" sans index (ancien format : "SCAN TABLE mon_marché_product")
+FULL_SCAN_RE = re.compile(r'^SCAN (?:TABLE )?"?(?P<table>[^\s"]+)"?(?: AS \S+)?$')
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN QUERY PLAN est propre à SQLite")
+class QueryPlanTests(TestCase):
+    """
+    Plans d'exécution des requêtes principales des vues : chaque requête doit
+    passer par un index, et les listes paginées ne doivent pas trier en
+    mémoire (voir les index de Product, Commande et ShippingAddress).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('client', 'client@example.com', 'secret')
+        cls.category = Categorie.objects.create(name='Poterie')
+        cls.product = Product.objects.create(
+            title='Vase en terre cuite', price=15000, description='Vase', Categorie=cls.category,
+        )
+
+    def plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertNoFullScan(self, queryset):
+        plan = self.plan(queryset)
+        scans = [detail for detail in plan if FULL_SCAN_RE.match(detail)]
+        self.assertFalse(scans, f"Lecture complète de table : {plan}")
+        return plan
+
+    def assertIndexedPage(self, queryset):
+        """Page par curseur : index, et ordre du tri fourni par l'index"""
+        plan = self.assertNoFullScan(queryset)
+        self.assertFalse([d for d in plan if 'TEMP B-TREE FOR ORDER BY' in d], f"Tri en mémoire : {plan}")
+
+    def page_query(self, paginator, cursor=None):
+        return paginator._page_query(cursor)[0]
+
+    # ==================== CATALOGUE ====================
+
+    def test_index(self):
+        paginator, _ = index_listing({})
+        self.assertIndexedPage(self.page_query(paginator))
+
+    def test_products_sorts(self):
+        for sort in ('newest', 'price-asc', 'price-desc', 'name'):
+            with self.subTest(sort=sort):
+                paginator, *_ = products_listing({'sort': sort})
+                self.assertIndexedPage(self.page_query(paginator))
+
+    def test_products_next_page(self):
+        paginator, *_ = products_listing({})
+        cursor = encode_cursor(paginator._key(self.product), 'next', paginator.ordering)
+        self.assertIndexedPage(self.page_query(paginator, cursor))
+
+    def test_products_category(self):
+        paginator, *_ = products_listing({'category': str(self.category.pk)})
+        self.assertIndexedPage(self.page_query(paginator))
+        for sort in ('price-asc', 'name'):
+            with self.subTest(sort=sort):
+                paginator, *_ = products_listing({'category': str(self.category.pk), 'sort': sort})
+                self.assertNoFullScan(self.page_query(paginator))
+
+    def test_products_search(self):
+        paginator, *_ = products_listing({'search': 'vase'})
+        self.assertNoFullScan(self.page_query(paginator))
+
+    def test_search(self):
+        for params in ({'q': 'vase'}, {}, {'categories': str(self.category.pk)}):
+            with self.subTest(params=params):
+                products, *_ = search_listing(params)
+                self.assertNoFullScan(products)
+
+    def test_api_products(self):
+        paginator, *_ = products_listing({})
+        paginator.queryset = paginator.queryset.values('id', 'title', 'price', 'date_ajout')
+        self.assertIndexedPage(self.page_query(paginator))
+        # La vue elle-même : une seule requête
+        with self.assertNumQueries(1):
+            product_page({}, ['id', 'title'])
+
+    # ==================== DÉTAIL PRODUIT ====================
+
+    def test_detail(self):
+        self.assertNoFullScan(Product.objects.filter(pk=self.product.pk))
+        self.assertNoFullScan(ProductReview.objects.filter(product=self.product).select_related('user'))
+        self.assertIndexedPage(neighbour_products(self.product.pk))
+        self.assertIndexedPage(same_category_products(self.product.pk, self.category.pk))
+        self.assertIndexedPage(same_category_products(self.product.pk, exclude=[self.product.pk + 1]))
+
+    # ==================== COMPTE ====================
+
+    def test_order_history(self):
+        paginator = CursorPaginator(Commande.objects.filter(user=self.user), 10, HISTORY_ORDERING)
+        self.assertIndexedPage(self.page_query(paginator))
+
+    def test_orders_by_payment_status(self):
+        self.assertIndexedPage(Commande.objects.filter(payment_status='pending').order_by('-date_commande'))
+
+    # ==================== STATISTIQUES DE VENTES ====================
+
+    def test_sales_rollup_rebuild_range(self):
+        orders = Commande.objects.filter(date_commande__gte='2025-01-01', date_commande__lt='2025-01-08')
+        self.assertNoFullScan(orders)
+        self.assertNoFullScan(OrderLine.objects.filter(order__in=orders))
+
+    def test_sales_rollup_delete_day(self):
+        dimensions = [value for value, _ in SalesRollup.DIMENSIONS]
+        self.assertNoFullScan(SalesRollup.objects.filter(dimension__in=dimensions, day='2025-01-01'))
+
+    def test_sales_dashboard(self):
+        self.assertNoFullScan(
+            SalesRollup.objects.filter(dimension='product', day__gte='2025-01-01', day__lte='2025-01-31')
+            .values('key').annotate(Sum('revenue'))
+        )
+
+    def test_addresses(self):
+        self.assertNoFullScan(ShippingAddress.objects.filter(user=self.user).order_by('-is_default', '-id'))
+        self.assertNoFullScan(ShippingAddress.objects.filter(user=self.user, is_default=True))
+
+    def test_favorites(self):
+        self.assertNoFullScan(
+            Favorite.objects.filter(user=self.user).select_related('product', 'product__Categorie')
+        )
+
+
+class SearchTests(TestCase):
+    """Recherche plein texte : requêtes sans mot, catégories et tri par pertinence"""
+
+    @classmethod
+    def setUpTestData(cls):
+        # Le catalogue en cache change de version au commit
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.category = Categorie.objects.create(name='Poterie')
+            cls.vase = Product.objects.create(
+                title='Vase en terre cuite', price=15000, description='Vase', Categorie=cls.category,
+            )
+
+    def test_query_without_words(self):
+        for url in ('/search/?q=!!!', '/?search=-', '/products/?search=-', '/api/products/?q=!!'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+        products, *_ = search_listing({'q': '!!!'})
+        self.assertEqual(list(products), [])
+
+    def test_matches_title_and_category(self):
+        for query in ('vase', 'poterie', 'Potèrie'):
+            with self.subTest(query=query):
+                products, *_ = search_listing({'q': query})
+                self.assertEqual(list(products), [self.vase])
+
+
+class CatalogCacheTests(TestCase):
+    """Cache des catégories : nouvelle version seulement après le commit"""
+
+    def test_category_change_reread_after_commit(self):
+        category = Categorie.objects.create(name='Poterie')
+        self.assertEqual([c.name for c in catalog.get_categories()], ['Poterie'])
+        version = catalog.get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                category.name = 'Céramique'
+                category.save()
+                # Un lecteur concurrent ne voit pas encore la modification :
+                # la version ne doit pas changer avant le commit
+                self.assertEqual(catalog.get_catalog_version(), version)
+        self.assertNotEqual(catalog.get_catalog_version(), version)
+        self.assertEqual([c.name for c in catalog.get_categories()], ['Céramique'])
+
+
+class ProductCardCacheTests(TestCase):
+    """Cartes produit en cache : le nom de la catégorie fait partie de la clé"""
+
+    def test_category_rename_refreshes_cards(self):
+        category = Categorie.objects.create(name='Poterie')
+        vase = Product.objects.create(title='Vase', price=1000, description='Vase', Categorie=category)
+        self.assertContains(self.client.get('/'), f'id="aa{vase.pk}">Poterie<')
+        category.name = 'Céramique'
+        category.save()
+        self.assertContains(self.client.get('/'), f'id="aa{vase.pk}">Céramique<')
+
+
+class ConditionalGetTests(TestCase):
+    """ETag des listes : un 304 seulement si le catalogue n'a pas changé"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Categorie.objects.create(name='Poterie')
+        cls.products = [
+            Product.objects.create(title=f'Vase {n}', price=1000 * n, description='Vase', Categorie=category)
+            for n in range(1, 4)
+        ]
+
+    def setUp(self):
+        # Le cookie CSRF fait partie de l'ETag : le recevoir d'abord
+        self.client.get('/products/')
+
+    def revalidate(self, url):
+        etag = self.client.get(url)['ETag']
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_unchanged_catalog(self):
+        self.assertEqual(self.revalidate('/products/'), 304)
+
+    def test_changes_made_by_update(self):
+        # Ni signal ni version du catalogue : l'ETag lit l'état des produits en base
+        url = '/products/'
+        etag = self.client.get(url)['ETag']
+        Product.objects.filter(pk=self.products[0].pk).update(is_active=False)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get(url)['ETag']
+        Product.objects.filter(pk=self.products[1].pk).update(date_modification=timezone.now())
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ProductFeedTests(TestCase):
+    """API JSON du catalogue (/api/products/)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Categorie.objects.create(name='Poterie')
+        cls.products = [
+            Product.objects.create(title=f'Vase {n}', price=1000 * n, description='Vase', Categorie=cls.category)
+            for n in range(1, 6)
+        ]
+
+    def get(self, **params):
+        return self.client.get('/api/products/', params)
+
+    def test_response_shape(self):
+        data = self.get(sort='price-asc').json()
+        self.assertEqual(set(data), {'results', 'next', 'previous'})
+        self.assertEqual(len(data['results']), 5)
+        self.assertEqual(set(data['results'][0]), set(feed.DEFAULT_PRODUCT_FIELDS))
+        self.assertIsNone(data['next'])
+
+        data = self.get(fields='id,title', category=self.category.pk).json()
+        self.assertEqual(data['results'][0], {'id': self.products[-1].pk, 'title': 'Vase 5'})
+
+    def test_cursor_round_trip(self):
+        pages, urls, url = [], [], '/api/products/?sort=price-asc&limit=2&fields=id'
+        while url:
+            data = self.client.get(url).json()
+            pages.append([row['id'] for row in data['results']])
+            urls.append(url)
+            url = data['next']
+        self.assertEqual(pages, [[p.pk for p in self.products[i:i + 2]] for i in (0, 2, 4)])
+
+        # Retour en arrière depuis la dernière page, jusqu'à la première
+        previous = self.client.get(urls[-1]).json()['previous']
+        for expected in reversed(pages[:-1]):
+            data = self.client.get(previous).json()
+            self.assertEqual([row['id'] for row in data['results']], expected)
+            previous = data['previous']
+        self.assertIsNone(previous)
+
+    def test_invalid_parameters(self):
+        price_cursor = encode_cursor(['abc', 1], 'next', SORT_ORDERINGS['price-asc'])
+        for params in ({'category': 'abc'}, {'limit': 'abc'}, {'limit': '0'}, {'sort': 'cheapest'},
+                       {'cursor': 'pas-un-curseur'}, {'cursor': price_cursor, 'sort': 'price-asc'},
+                       {'fields': 'id,secret'}):
+            with self.subTest(params=params):
+                response = self.get(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertFalse(response.json()['success'])
+
+        # Les pages HTML ignorent les mêmes paramètres
+        self.assertEqual(self.client.get('/products/', {'category': 'abc', 'cursor': price_cursor}).status_code, 200)
+        self.assertEqual(self.client.get('/search/', {'categories': 'abc,1'}).status_code, 200)
+
+
+class InventoryTests(TestCase):
+    """Réservation du stock par UPDATE conditionnel et libération idempotente"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Categorie.objects.create(name='Poterie')
+        cls.vase = Product.objects.create(title='Vase', price=15000, description='Vase', Categorie=category, stock=5)
+        cls.bol = Product.objects.create(title='Bol', price=5000, description='Bol', Categorie=category, stock=1)
+
+    def stock(self):
+        return dict(Product.objects.values_list('title', 'stock'))
+
+    def test_reserve_all_lines(self):
+        with transaction.atomic():
+            reserve_stock({self.vase.pk: 2, self.bol.pk: 1})
+        self.assertEqual(self.stock(), {'Vase': 3, 'Bol': 0})
+
+    def test_short_line_rolls_back_every_line(self):
+        with self.assertRaises(InsufficientStock) as raised, transaction.atomic():
+            reserve_stock({self.vase.pk: 2, self.bol.pk: 3})
+        self.assertEqual([product.pk for product in raised.exception.products], [self.bol.pk])
+        self.assertEqual(self.stock(), {'Vase': 5, 'Bol': 1})
+
+    def test_release_is_idempotent(self):
+        order = Commande.objects.create(
+            total=30000, nom='Client', email='client@example.com', phone='0700000000', address='Rue 1',
+            ville='Abidjan', payment_method='cash', items=[{'product_id': self.vase.pk, 'quantity': 2}],
+        )
+        with transaction.atomic():
+            reserve_stock({self.vase.pk: 2})
+        Commande.objects.filter(pk=order.pk).update(stock_reserved=True)
+        order.refresh_from_db()
+
+        # Annulation (signal), nouvel enregistrement, échec du paiement : une seule remise en stock
+        order.order_status = 'cancelled'
+        order.save()
+        order.save()
+        self.assertFalse(release_stock(Commande.objects.get(pk=order.pk)))
+        self.assertEqual(self.stock()['Vase'], 5)
+
+    def test_two_orders_for_the_last_unit(self):
+        responses = []
+        for name in ('premier', 'second'):
+            self.client.force_login(User.objects.create_user(name, f'{name}@example.com', 'secret'))
+            responses.append(self.client.post('/checkout/process/', {
+                'items': [{'product_id': self.bol.pk, 'quantity': 1}], 'payment_method': 'cash',
+            }, content_type='application/json'))
+        self.assertEqual([response.status_code for response in responses], [200, 409])
+        self.assertEqual(responses[1].json()['out_of_stock'], [self.bol.pk])
+        self.assertEqual(self.stock()['Bol'], 0)
+        self.assertEqual(Commande.objects.count(), 1)
+
+
+class PaymentWebhookTests(TestCase):
+    """Notifications Wave : enregistrées une fois, appliquées une fois par les workers"""
+
+    def setUp(self):
+        self.order = Commande.objects.create(
+            total=17000, nom='Client', email='client@example.com', phone='0700000000', address='Rue 1',
+            ville='Abidjan', payment_method='wave',
+        )
+
+    def notify(self, transaction_id, status, sign=True):
+        body = json.dumps({
+            'transaction_id': transaction_id, 'reference': self.order.order_number, 'status': status,
+        }).encode()
+        headers = {}
+        if sign:
+            timestamp = str(int(time.time()))
+            signature = hmac.new(settings.WAVE_SECRET_KEY.encode(), timestamp.encode() + body,
+                                 hashlib.sha256).hexdigest()
+            headers['Wave-Signature'] = f't={timestamp},v1={signature}'
+        return self.client.post('/payment/wave/callback/', body, content_type='application/json', headers=headers)
+
+    def run_workers(self):
+        while run_next('test'):
+            pass
+
+    def test_duplicate_event(self):
+        for _ in range(2):
+            self.assertEqual(self.notify('TX-1', 'success').json(), {'status': 'received'})
+        self.run_workers()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, 'paid')
+        paid_at = self.order.date_paiement
+
+        self.assertEqual(self.notify('TX-1', 'success').status_code, 200)
+        self.run_workers()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.date_paiement, paid_at)
+        self.assertEqual(list(PaymentEvent.objects.values_list('transaction_id', 'resultat')), [('TX-1', 'paye')])
+
+    def test_unsigned_or_forged_event(self):
+        self.assertEqual(self.notify('TX-1', 'success', sign=False).status_code, 401)
+        response = self.client.post('/payment/wave/callback/', b'{"transaction_id": "TX-1", "status": "success"}',
+                                    content_type='application/json',
+                                    headers={'Wave-Signature': f't={int(time.time())},v1={"0" * 64}'})
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_late_contradictory_event(self):
+        self.notify('TX-1', 'success')
+        self.notify('TX-2', 'failed')
+        self.run_workers()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.payment_status, 'paid')
+        self.assertEqual(PaymentEvent.objects.get(transaction_id='TX-2').resultat, 'ignore')
+
+
+# ==================== FILE DE TÂCHES ====================
+
+calls = []
+
+
+@task(max_attempts=2, retry_delay=10)
+def record_call(value):
+    calls.append(value)
+
+
+@task(max_attempts=2, retry_delay=10)
+def always_fails():
+    raise RuntimeError("panne")
+
+
+@task(unique=True)
+def refresh(value):
+    calls.append(value)
+
+
+class TaskQueueTests(TestCase):
+    """File de tâches en base : insertion transactionnelle, réclamation, reprises"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_delay_joins_the_transaction(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            record_call.delay(1)
+            raise RuntimeError
+        self.assertFalse(Task.objects.exists())
+
+        with transaction.atomic():
+            record_call.delay(2)
+        self.assertEqual(list(Task.objects.values_list('name', 'args', 'status')),
+                         [(record_call.name, [2], 'pending')])
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_runs_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record_call.delay(3)
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, [3])
+        self.assertFalse(Task.objects.exists())
+
+    def test_unique_pending_task(self):
+        refresh.delay(1)
+        refresh.delay(1)
+        refresh.delay(2)
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_claim(self):
+        first, second = record_call.delay(1), record_call.delay(2)
+        claimed = claim_task('a')
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts, claimed.locked_by),
+                         (first.pk, 'running', 1, 'a'))
+        self.assertEqual(claim_task('b').pk, second.pk)
+        self.assertIsNone(claim_task('c'))
+
+        # Délai de visibilité expiré : la tâche est reprise par un autre worker
+        Task.objects.filter(pk=first.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(claim_task('c').pk, first.pk)
+        self.assertFalse(run_task(claimed, 'a'))
+        self.assertEqual(Task.objects.get(pk=first.pk).locked_by, 'c')
+
+    def test_retry_with_backoff(self):
+        task_row = always_fails.delay()
+        before = timezone.now()
+        self.assertTrue(run_next('a'))
+        task_row.refresh_from_db()
+        self.assertEqual((task_row.status, task_row.attempts), ('pending', 1))
+        self.assertIn('RuntimeError: panne', task_row.last_error)
+        self.assertGreaterEqual(task_row.run_at, before + timedelta(seconds=10))
+        self.assertFalse(run_next('a'))
+
+        # Dernière tentative : la tâche échoue définitivement
+        Task.objects.filter(pk=task_row.pk).update(run_at=timezone.now())
+        self.assertTrue(run_next('a'))
+        task_row.refresh_from_db()
+        self.assertEqual((task_row.status, task_row.attempts), ('failed', 2))
+        self.assertEqual(retry_delay(always_fails, 3) // 10, 4)
+
+
+class StubSMTPBackend(locmem.EmailBackend):
+    """Serveur SMTP de test : refuse certaines adresses, ou coupe la connexion après n messages"""
+
+    def __init__(self, refused=(), disconnect_after=None, **kwargs):
+        super().__init__(**kwargs)
+        self.refused, self.disconnect_after = set(refused), disconnect_after
+        self.connections = self.accepted = 0
+
+    def open(self):
+        self.connections += 1
+
+    def send_messages(self, messages):
+        for message in messages:
+            if self.disconnect_after is not None and self.accepted >= self.disconnect_after:
+                raise smtplib.SMTPServerDisconnected("Connexion perdue")
+            if message.to[0] in self.refused:
+                raise smtplib.SMTPRecipientsRefused({message.to[0]: (550, b'Adresse inconnue')})
+            self.accepted += 1
+        return super().send_messages(messages)
+
+
+class NewsletterTests(TestCase):
+    """Envoi des campagnes par lots, résultat par destinataire et reprise"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.emails = [f'{name}@example.com' for name in ('ada', 'bea', 'cid', 'dan', 'eve')]
+        NewsletterSubscriber.objects.bulk_create([NewsletterSubscriber(email=email) for email in cls.emails])
+        cls.campaign = NewsletterCampaign.objects.create(sujet='Nouveautés', contenu_texte='Bonjour {{ email }}')
+
+    def deliveries(self):
+        return dict(NewsletterDelivery.objects.values_list('email', 'status'))
+
+    def test_batches_and_resume(self):
+        ada, bea, cid, dan, eve = self.emails
+        backend = StubSMTPBackend(refused=[cid], disconnect_after=3)
+        with self.assertRaises(smtplib.SMTPServerDisconnected):
+            send_campaign(self.campaign, batch_size=2, rate=0, connection=backend)
+        # Une connexion par lot de deux ; ce qui est parti avant la coupure est enregistré
+        self.assertEqual(backend.connections, 3)
+        self.assertEqual(self.deliveries(), {ada: 'sent', bea: 'sent', cid: 'failed', dan: 'sent'})
+        self.assertEqual(NewsletterCampaign.objects.get(pk=self.campaign.pk).status, 'sending')
+
+        # La reprise n'envoie qu'aux adresses pas encore traitées
+        stats = send_campaign(self.campaign, batch_size=2, rate=0, connection=StubSMTPBackend())
+        self.assertEqual(stats, {'sent': 1, 'failed': 0})
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), [ada, bea, dan, eve])
+        self.assertEqual(mail.outbox[-1].body, f'Bonjour {eve}')
+        self.assertEqual(self.deliveries()[eve], 'sent')
+        self.assertEqual(NewsletterCampaign.objects.get(pk=self.campaign.pk).status, 'sent')
+
+
+class CartTests(TestCase):
+    """Panier serveur : fusion des lignes et prix relus à chaque calcul"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Categorie.objects.create(name='Poterie')
+        cls.vase = Product.objects.create(title='Vase', price=1000, description='Vase', Categorie=category)
+        cls.bol = Product.objects.create(title='Bol', price=500, description='Bol', Categorie=category)
+        cls.user = User.objects.create_user('client', 'client@example.com', 'secret')
+
+    def quantities(self, cart):
+        return dict(cart.items.values_list('product_id', 'quantity'))
+
+    def add(self, product, quantity):
+        return self.client.post('/cart/api/add/', {'product_id': product.pk, 'quantity': quantity},
+                                content_type='application/json')
+
+    def test_duplicate_lines_are_merged(self):
+        response = self.client.post('/cart/api/merge/', {'items': [
+            {'product_id': self.vase.pk, 'quantity': 1}, {'product_id': self.vase.pk, 'quantity': 2},
+        ]}, content_type='application/json')
+        self.assertEqual([(item['product_id'], item['quantity']) for item in response.json()['cart']['items']],
+                         [(self.vase.pk, 3)])
+
+    def test_session_cart_merged_at_login(self):
+        user_cart = Cart.objects.create(user=self.user)
+        set_quantities(user_cart, {self.vase.pk: 1, self.bol.pk: 1})
+        self.add(self.vase, 2)
+        self.client.login(username='client', password='secret')
+        self.assertEqual(self.quantities(user_cart), {self.vase.pk: 3, self.bol.pk: 1})
+        self.assertEqual(Cart.objects.count(), 1)
+
+    def test_price_change_at_summary(self):
+        self.add(self.vase, 2)
+        self.vase.price = 1500
+        self.vase.save()
+        cart = self.client.get('/cart/api/').json()['cart']
+        self.assertEqual((cart['items'][0]['unit_price'], cart['subtotal'], cart['total']),
+                         ('1500.00', '3000.00', '5000.00'))
+
+    def test_every_cart_write_syncs_to_server(self):
+        # Affecter localStorage.setItem crée une clé "setItem" : chaque page
+        # doit appeler syncPanier() elle-même après avoir écrit le panier
+        write = re.compile(r"""localStorage\.(?:setItem|removeItem)\((['"])Panier\1[^\n]*\n\s*(.*)""")
+        for path in sorted((Path(__file__).parent / 'templates').glob('*.html')):
+            source = path.read_text()
+            with self.subTest(template=path.name):
+                self.assertIsNone(re.search(r'localStorage\.(?:setItem|removeItem)\s*=', source))
+                for match in write.finditer(source):
+                    self.assertEqual(match[2], 'syncPanier();')
+        response = self.client.get('/')
+        self.assertContains(response, 'var syncPanier')
+        self.assertContains(response, '/cart/api/merge/')
+
+
+class RatingAggregateTests(TestCase):
+    """Agrégats des avis sur Product : tenus à jour par création, modification et suppression"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Categorie.objects.create(name='Poterie')
+        cls.product = Product.objects.create(title='Vase', price=1000, description='Vase', Categorie=category)
+        cls.users = [User.objects.create_user(f'client{n}', f'client{n}@example.com', 'secret') for n in range(3)]
+
+    def review(self, user, rating):
+        return ProductReview.objects.create(product=self.product, user=user, rating=rating, comment='Avis')
+
+    def assertAggregates(self, ratings):
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertEqual((product.review_count, product.rating_sum), (len(ratings), sum(ratings)))
+        self.assertEqual(product.get_rating_histogram(), [(stars, ratings.count(stars)) for stars in range(5, 0, -1)])
+
+    def test_create_edit_delete(self):
+        first, second, third = (self.review(user, rating) for user, rating in zip(self.users, (5, 4, 3)))
+        self.assertAggregates([5, 4, 3])
+
+        # Modification d'une instance relue, puis deux enregistrements de la même instance
+        edited = ProductReview.objects.get(pk=second.pk)
+        edited.rating = 1
+        edited.save()
+        self.assertAggregates([5, 1, 3])
+        third.rating = 2
+        third.save()
+        third.save()
+        self.assertAggregates([5, 1, 2])
+
+        first.delete()
+        self.assertAggregates([1, 2])
+        self.assertEqual(Product.objects.get(pk=self.product.pk).get_average_rating(), 1.5)
+
+
+class CursorPaginationTests(TestCase):
+    """Pagination par curseur : ex aequo sur la clé de tri et curseurs invalides"""
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Categorie.objects.create(name='Poterie')
+        # Prix en double : l'id départage
+        cls.products = [
+            Product.objects.create(title=f'Vase {n}', price=price, description='Vase', Categorie=category)
+            for n, price in enumerate((1000, 2000, 2000, 2000, 2000, 3000))
+        ]
+
+    def paginator(self):
+        return CursorPaginator(Product.objects.all(), 2, SORT_ORDERINGS['price-asc'])
+
+    def ids(self, page):
+        return [product.pk for product in page]
+
+    def test_round_trip_with_ties(self):
+        paginator, pages, cursor = self.paginator(), [], None
+        while True:
+            page = paginator.get_page(cursor)
+            pages.append(page)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual([self.ids(page) for page in pages],
+                         [[p.pk for p in self.products[i:i + 2]] for i in (0, 2, 4)])
+        self.assertFalse(pages[0].has_previous())
+
+        page = pages[-1]
+        for expected in reversed(pages[:-1]):
+            page = paginator.get_page(page.previous_cursor)
+            self.assertEqual(self.ids(page), self.ids(expected))
+        self.assertEqual(self.ids(paginator.get_page(page.next_cursor)), self.ids(pages[1]))
+
+    def test_tampered_cursor(self):
+        paginator = self.paginator()
+        first_page = self.ids(paginator.get_page())
+        for cursor in ('pas-un-curseur', encode_cursor(['abc', 1], 'next', SORT_ORDERINGS['price-asc']),
+                       encode_cursor([1000, 1], 'next', SORT_ORDERINGS['newest'])):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.ids(paginator.get_page(cursor)), first_page)
+                with self.assertRaises(InvalidCursor):
+                    paginator.get_page(cursor, strict=True)
+        response = self.client.get('/products/', {'sort': 'price-asc', 'cursor': 'pas-un-curseur'})
+        self.assertEqual(response.status_code, 200)
+
+
+class SalesReportTests(TestCase):
+    """Rapports de ventes : mêmes lignes vendues partout (ni annulées ni paiement échoué)"""
+
+    def test_stock_report_counts_sold_lines(self):
+        category = Categorie.objects.create(name='Poterie')
+        vase = Product.objects.create(title='Vase', price=1000, description='Vase', Categorie=category, stock=3)
+        for quantity, payment_status, order_status in ((2, 'paid', 'pending'), (1, 'pending', 'pending'),
+                                                        (4, 'failed', 'pending'), (8, 'paid', 'cancelled')):
+            order = Commande.objects.create(
+                total=1000 * quantity, nom='Client', email='client@example.com', phone='0700000000',
+                address='Rue 1', ville='Abidjan', payment_method='cash',
+                payment_status=payment_status, order_status=order_status,
+            )
+            OrderLine.objects.create(order=order, product=vase, product_name='Vase', unit_price=1000,
+                                     quantity=quantity, line_total=1000 * quantity)
+        self.assertEqual(reports.stock_report(), [{'id': vase.pk, 'title': 'Vase', 'stock': 3, 'units_sold': 3}])
+        self.assertEqual(reports.best_sellers()[0]['units'], 3)
+
+
+class MetricsMultiprocessTests(TestCase):
+    """Fichiers partagés de /metrics : pid réutilisé et processus terminés"""
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.addCleanup(setattr, metrics, 'MULTIPROCESS_DIR', metrics.MULTIPROCESS_DIR)
+        metrics.MULTIPROCESS_DIR = str(self.directory)
+
+    def write(self, name, value):
+        (self.directory / name).write_text(json.dumps(
+            {'counters': [['orders_total', [['status', 'paid']], value]], 'histograms': []}
+        ))
+
+    def total(self):
+        counters, _ = metrics.collect()
+        return counters['orders_total', (('status', 'paid'),)]
+
+    def test_dead_and_replaced_processes_are_folded(self):
+        # pid inexistant, puis un ancien processus dont le pid a été repris par celui-ci
+        self.write('4194305-1.json', 3)
+        self.write(f'{os.getpid()}-1.json', 5)
+        self.assertEqual(self.total(), 8)
+        names = {path.name for path in self.directory.glob('*.json')}
+        self.assertEqual(names, {metrics.ARCHIVE, f'{metrics.registry.process_key()}.json'})
+
+        # Les totaux ne baissent pas et rien n'est compté deux fois
+        self.write('4194305-2.json', 2)
+        self.assertEqual(self.total(), 10)
+        self.assertEqual(self.total(), 10)
@@ -1,12 +1,16 @@
 # urls.py - Routes complètes pour l'application
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Sous ASGI, les pages catalogue sont servies par leurs variantes async
+catalog_views = async_views if settings.ASYNC_CATALOG_VIEWS else views
 
 urlpatterns = [
     # ==================== PAGES PUBLIQUES ====================
-    path('', views.index, name='home'),
-    path('products/', views.products, name='products'),
-    path('detail/<int:myid>/', views.detail, name='detail'),
+    path('', catalog_views.index, name='home'),
+    path('products/', catalog_views.products, name='products'),
+    path('detail/<int:myid>/', catalog_views.detail, name='detail'),
     
     # ==================== AUTHENTIFICATION ====================
     path('register/', views.register, name='register'),
@@ -28,6 +32,7 @@ urlpatterns = [
     path('favorites/', views.favorites, name='favorites'),
     path('favorites/add/<int:product_id>/', views.add_favorite, name='add_favorite'),
     path('favorites/remove/<int:product_id>/', views.remove_favorite, name='remove_favorite'),
+    path('favorites/toggle/<int:product_id>/', views.toggle_favorite, name='toggle_favorite'),
     
     # ==================== COMMANDES ====================
     path('orders/', views.order, name='order'),
@@ -39,6 +44,13 @@ urlpatterns = [
     path('checkout/process/', views.process_order, name='process_order'),
     path('order/success/<int:order_id>/', views.order_success, name='order_success'),
     
+    # ==================== PANIER (API JSON) ====================
+    path('cart/api/', views.cart_detail, name='cart_detail'),
+    path('cart/api/add/', views.cart_add, name='cart_add'),
+    path('cart/api/update/', views.cart_update, name='cart_update'),
+    path('cart/api/remove/', views.cart_remove, name='cart_remove'),
+    path('cart/api/merge/', views.cart_merge, name='cart_merge'),
+    
     # ==================== CALLBACKS PAIEMENT ====================
     path('payment/wave/callback/', views.wave_callback, name='wave_callback'),
     
@@ -47,5 +59,13 @@ urlpatterns = [
        # Pages statiques
     path('about/', views.about, name='about'),
     path('contact/', views.contact, name='contact'),
-    path('search/', views.search, name='search'),
+    path('search/', catalog_views.search, name='search'),
+    
+    # ==================== STATISTIQUES ====================
+    path('stats/cache/', views.cache_stats, name='cache_stats'),
+    path('metrics', views.metrics_view, name='metrics'),
+    
+    # ==================== API CATALOGUE ====================
+    path('api/products/', views.api_products, name='api_products'),
+    path('api/categories/', views.api_categories, name='api_categories'),
 ]
\ No newline at end of file
@@ -1,49 +1,35 @@
 # views.py - Version complète avec intégration Wave
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
 from django.conf import settings
-from .models import (Categorie, Product, Commande, UserProfile, 
-                    Favorite, ShippingAddress, ProductReview, ContactMessage)
-from django.core.paginator import Paginator
+from .models import (Product, Commande, UserProfile, 
+                    Favorite, ShippingAddress, ProductReview, ContactMessage, OrderLine)
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.models import User
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.gzip import gzip_page
 from .forms import RegisterForm, LoginForm
+from .listings import index_listing, products_listing, related_products, search_listing
+from .templatetags.product_cards import card_cache_stats
+from . import cart as cart_service
+from . import favorites as favorites_service
+from .inventory import InsufficientStock, reserve_stock
+from .orders import order_history_page, order_stats
+from .conditional import conditional_page, detail_etag, listing_etag
+from .payments import record_event as record_payment_event, verify_wave_signature
+from .emails import send_order_confirmation
+from . import feed, metrics, routers
 import json
-from decimal import Decimal
 from django.urls import reverse
-from django.utils import timezone
-from django.db.models import Q, Avg
-import hashlib
-import hmac
-from django.db import models
-from django.db.models import Sum
+from django.db import transaction
 
 
 # ==================== UTILITAIRES ====================
-@login_required
-def checkout(request):
-    if request.method == "POST":
-        data = json.loads(request.body)
-        panier = data.get("panier", {})
 
-        commande = Commande.objects.create(
-            user=request.user,
-            payment_status="pending"
-        )
-
-        total = 0
-        for product_id, item in panier.items():
-            product = Product.objects.get(id=product_id)
-            total += item["quantity"] * item["price"]
-
-        commande.total = total
-        commande.save()
-
-        return JsonResponse({"success": True})
-
-def generate_wave_payment_link(amount, phone_number, order_id):
+def generate_wave_payment_link(amount, phone_number, order_number):
     """
     Génère un lien de paiement Wave simplifié
     Note: Pour un vrai déploiement, utilisez l'API officielle Wave
@@ -57,7 +43,7 @@ def generate_wave_payment_link(amount, phone_number, order_id):
         'amount': int(amount),
         'currency': 'XOF',
         'phone': phone_number,
-        'reference': f'CMD-{order_id}',
+        'reference': order_number,  # Renvoyée par Wave dans le webhook
         'callback_url': f"{settings.SITE_URL}/payment/wave/callback/"
     }
     
@@ -68,122 +54,68 @@ def generate_wave_payment_link(amount, phone_number, order_id):
 
 # ==================== VUES PUBLIQUES ====================
 
+@conditional_page(listing_etag)
 def index(request):
     """Page d'accueil avec produits vedettes"""
-    # Récupérer les produits avec pagination
-    product_list = Product.objects.filter(is_active=True).select_related('Categorie')
-    
-    # Recherche par nom
-    search_query = request.GET.get('search', '')
-    if search_query:
-        product_list = product_list.filter(
-            Q(title__icontains=search_query) | 
-            Q(description__icontains=search_query)
-        )
-    
-    # Pagination
-    paginator = Paginator(product_list, 8)
-    page_number = request.GET.get('page')
-    product_object = paginator.get_page(page_number)
-    
-    # Récupérer toutes les catégories pour le menu
-    categories = Categorie.objects.all()
+    # Pagination par curseur, recherche par nom
+    paginator, search_query = index_listing(request.GET)
+    product_object = paginator.get_page(request.GET.get('cursor'))
+    favorites_service.mark(request, product_object)
     
+    # Les catégories du menu viennent du context processor (cache du catalogue)
     context = {
         'product_object': product_object,
-        'categories': categories,
         'search_query': search_query
     }
     
     return render(request, 'index.html', context)
 
+@conditional_page(detail_etag)
 def detail(request, myid):
     """Page détail d'un produit avec avis"""
     product = get_object_or_404(Product, id=myid)
     
-    # Vérifier si favori
-    is_favorite = False
-    if request.user.is_authenticated:
-        is_favorite = Favorite.objects.filter(
-            user=request.user, 
-            product=product
-        ).exists()
+    # Favori (ensemble en cache, déjà lu par l'ETag)
+    is_favorite = product.id in favorites_service.favorite_ids(request)
     
     # Calculer le pourcentage de réduction
     discount_percent = product.get_discount_percent()
     
-    # Récupérer les avis
+    # Récupérer les avis (la note moyenne est dénormalisée sur le produit)
     reviews = ProductReview.objects.filter(product=product).select_related('user')
-    avg_rating = reviews.aggregate(Avg('rating'))['rating__avg'] or 0
     
     # Produits similaires
-    related_products = Product.objects.filter(
-        Categorie=product.Categorie,
-        is_active=True
-    ).exclude(id=myid)[:4]
+    related = related_products(product.id, product.Categorie_id)
     
     context = {
         'product': product,
         'is_favorite': is_favorite,
         'discount_percent': discount_percent,
         'reviews': reviews,
-        'avg_rating': round(avg_rating, 1),
-        'related_products': related_products
+        'avg_rating': product.get_average_rating(),
+        'rating_histogram': product.get_rating_histogram(),
+        'related_products': related
     }
     
     return render(request, 'detail.html', context)
 
+@conditional_page(listing_etag)
 def products(request):
     """Page liste des produits avec filtres"""
-    # Base queryset
-    product_list = Product.objects.filter(is_active=True).select_related('Categorie')
-    
-    # Filtrage par catégorie
-    category_id = request.GET.get('category')
-    if category_id:
-        product_list = product_list.filter(Categorie_id=category_id)
-    
-    # Filtrage par recherche
-    search = request.GET.get('search', '')
-    if search:
-        product_list = product_list.filter(
-            Q(title__icontains=search) | 
-            Q(description__icontains=search)
-        )
-    
-    # Tri
-    sort_by = request.GET.get('sort', 'newest')
-    if sort_by == 'price-asc':
-        product_list = product_list.order_by('price')
-    elif sort_by == 'price-desc':
-        product_list = product_list.order_by('-price')
-    elif sort_by == 'name':
-        product_list = product_list.order_by('title')
-    else:  # newest
-        product_list = product_list.order_by('-date_ajout')
-    
-    # Pagination
-    paginator = Paginator(product_list, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Filtres (catégorie, recherche, tri) puis pagination par curseur :
+    # une seule requête, sans COUNT ni OFFSET
+    paginator, category_id, search, sort_by = products_listing(request.GET)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     # Marquer les favoris
-    if request.user.is_authenticated:
-        favorite_ids = Favorite.objects.filter(
-            user=request.user
-        ).values_list('product_id', flat=True)
-        
-        for product in page_obj:
-            product.is_favorite = product.id in favorite_ids
-    
-    # Catégories pour la sidebar
-    categories = Categorie.objects.all()
+    favorites_service.mark(request, page_obj)
     
+    # Les catégories de la sidebar viennent du context processor (cache du catalogue)
     context = {
         'page_obj': page_obj,
-        'categories': categories,
         'current_category': category_id,
-        'search_query': search
+        'search_query': search,
+        'sort_by': sort_by
     }
     
     return render(request, 'products.html', context)
@@ -251,17 +183,13 @@ def profile(request):
     """Page profil utilisateur"""
     profile, created = UserProfile.objects.get_or_create(user=request.user)
     
-    # Statistiques
-    total_orders = Commande.objects.filter(user=request.user).count()
-    total_spent = Commande.objects.filter(
-        user=request.user, 
-        payment_status='paid'
-    ).aggregate(total=models.Sum('total'))['total'] or 0
+    # Statistiques (une seule requête agrégée)
+    stats = order_stats(request.user)
     
     context = {
         'profile': profile,
-        'total_orders': total_orders,
-        'total_spent': total_spent
+        'total_orders': stats['total_orders'],
+        'total_spent': stats['total_spent']
     }
     
     return render(request, 'profile.html', context)
@@ -378,6 +306,19 @@ def add_favorite(request, product_id):
     messages.success(request, f"{product.title} ajouté aux favoris")
     return redirect(request.META.get('HTTP_REFERER', 'home'))
 
+def toggle_favorite(request, product_id):
+    """Ajouter ou retirer un favori sans recharger la page : {"is_favorite": true}"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Méthode non autorisée'}, status=405)
+    if not request.user.is_authenticated:
+        return JsonResponse({'success': False, 'message': 'Connexion requise'}, status=401)
+    deleted, _ = Favorite.objects.filter(user=request.user, product_id=product_id).delete()
+    if not deleted:
+        if not Product.objects.filter(id=product_id).exists():
+            return JsonResponse({'success': False, 'message': 'Produit introuvable'}, status=404)
+        Favorite.objects.get_or_create(user=request.user, product_id=product_id)
+    return JsonResponse({'success': True, 'product_id': product_id, 'is_favorite': not deleted})
+
 @login_required
 def remove_favorite(request, product_id):
     """Retirer des favoris"""
@@ -392,7 +333,8 @@ def remove_favorite(request, product_id):
 
 @login_required
 def order(request):
-    commandes = Commande.objects.filter(user=request.user).order_by('-date_commande')
+    """Historique des commandes, paginé par curseur"""
+    commandes = order_history_page(request.user, request.GET.get('cursor'))
     return render(request, 'order.html', {'commandes': commandes})
 
 @login_required
@@ -448,33 +390,50 @@ def process_order(request):
         if not data.get('payment_method'):
             return JsonResponse({'success': False, 'message': 'Méthode de paiement requise'}, status=400)
         
-        # Calculer le total
-        items = data.get('items', [])
-        subtotal = Decimal(0)
-        
-        for item in items:
-            subtotal += Decimal(str(item.get('total', 0)))
+        # Le client ne fournit que les produits et quantités : ils remplacent
+        # le contenu du panier serveur, et les prix viennent de la base
+        # principale (jamais d'une réplique en retard)
+        cart = cart_service.get_cart(request)
+        quantities = cart_service.parse_quantities(data['items'])
+        with routers.use_primary():
+            cart_service.set_quantities(cart, quantities, mode='replace')
+
+        # Prix relus, stock réservé et commande créée dans la même transaction
+        # (lectures sur la principale) : si une ligne manque de stock, rien
+        # n'est enregistré
+        with transaction.atomic():
+            summary = cart_service.summarize(cart)
+            if not summary.lines:
+                return JsonResponse({'success': False, 'message': 'Panier vide'}, status=400)
+
+            items = [line.as_order_item() for line in summary.lines]
+            subtotal = summary.subtotal
+            shipping_cost = summary.shipping_cost
+            total = summary.total
+
+            reserve_stock({line.product.id: line.quantity for line in summary.lines})
+            commande = Commande.objects.create(
+                user=request.user,
+                items=items,
+                subtotal=subtotal,
+                shipping_cost=shipping_cost,
+                total=total,
+                nom=data.get('name', f"{request.user.first_name} {request.user.last_name}"),
+                email=request.user.email,
+                phone=data.get('phone', ''),
+                address=data.get('address', ''),
+                ville=data.get('ville', ''),
+                pays=data.get('pays', "Côte d'Ivoire"),
+                zipcode=data.get('zipcode', ''),
+                payment_method=data.get('payment_method'),
+                payment_status='pending',
+                stock_reserved=True
+            )
+            OrderLine.objects.bulk_create([line.as_order_line(commande) for line in summary.lines])
+            # Envoyé par un worker : la réponse n'attend pas le serveur SMTP
+            send_order_confirmation.delay(commande.id)
         
-        shipping_cost = Decimal('2000')  # Frais de livraison fixes
-        total = subtotal + shipping_cost
-        
-        # Créer la commande
-        commande = Commande.objects.create(
-            user=request.user,
-            items=items,
-            subtotal=subtotal,
-            shipping_cost=shipping_cost,
-            total=total,
-            nom=data.get('name', f"{request.user.first_name} {request.user.last_name}"),
-            email=request.user.email,
-            phone=data.get('phone', ''),
-            address=data.get('address', ''),
-            ville=data.get('ville', ''),
-            pays=data.get('pays', "Côte d'Ivoire"),
-            zipcode=data.get('zipcode', ''),
-            payment_method=data.get('payment_method'),
-            payment_status='pending'
-        )
+        cart_service.clear(cart)
         
         # Générer lien de paiement selon la méthode
         payment_url = None
@@ -484,7 +443,7 @@ def process_order(request):
             payment_url = generate_wave_payment_link(
                 amount=float(total),
                 phone_number='22707687487',  # VOTRE NUMÉRO
-                order_id=commande.id
+                order_number=commande.order_number
             )
         
         elif data.get('payment_method') == 'orange':
@@ -507,6 +466,14 @@ def process_order(request):
         
     except json.JSONDecodeError:
         return JsonResponse({'success': False, 'message': 'Données invalides'}, status=400)
+    except cart_service.CartError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    except InsufficientStock as e:
+        return JsonResponse({
+            'success': False,
+            'message': str(e),
+            'out_of_stock': [product.id for product in e.products]
+        }, status=409)
     except Exception as e:
         return JsonResponse({'success': False, 'message': str(e)}, status=500)
 
@@ -525,38 +492,107 @@ def order_success(request, order_id):
     
     return render(request, 'order_success.html', context)
 
+# ==================== PANIER (API JSON) ====================
+
+def _cart_response(cart):
+    return JsonResponse({'success': True, 'cart': cart_service.summarize(cart).as_json()})
+
+def _cart_payload(request):
+    try:
+        return json.loads(request.body or b'{}')
+    except json.JSONDecodeError:
+        raise cart_service.CartError('Données invalides')
+
+def _cart_product_id(data):
+    try:
+        return int(data.get('product_id'))
+    except (TypeError, ValueError):
+        raise cart_service.CartError('Produit invalide')
+
+def cart_detail(request):
+    """Contenu du panier avec les prix du serveur"""
+    return _cart_response(cart_service.get_cart(request, create=False))
+
+def cart_add(request):
+    """Ajouter un produit : {"product_id": 3, "quantity": 1}"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Méthode non autorisée'}, status=405)
+    try:
+        data = _cart_payload(request)
+        product_id = _cart_product_id(data)
+        quantity = cart_service.parse_quantity(data.get('quantity', 1))
+        cart = cart_service.get_cart(request)
+        cart_service.set_quantities(cart, {product_id: quantity}, mode='add')
+    except cart_service.CartError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    return _cart_response(cart)
+
+def cart_update(request):
+    """Fixer la quantité d'un produit : {"product_id": 3, "quantity": 2} (0 = retirer)"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Méthode non autorisée'}, status=405)
+    try:
+        data = _cart_payload(request)
+        product_id = _cart_product_id(data)
+        quantity = cart_service.parse_quantity(data.get('quantity'))
+        cart = cart_service.get_cart(request)
+        cart_service.set_quantities(cart, {product_id: quantity}, mode='set')
+    except cart_service.CartError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    return _cart_response(cart)
+
+def cart_remove(request):
+    """Retirer un produit : {"product_id": 3}"""
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Méthode non autorisée'}, status=405)
+    try:
+        product_id = _cart_product_id(_cart_payload(request))
+        cart = cart_service.get_cart(request)
+        cart_service.remove_item(cart, product_id)
+    except cart_service.CartError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    return _cart_response(cart)
+
+def cart_merge(request):
+    """
+    Fusionner des articles du client : {"items": {...}, "replace": false}.
+    Sert à reprendre l'ancien panier localStorage ; avec "replace", le panier
+    serveur devient une copie exacte des quantités envoyées.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'message': 'Méthode non autorisée'}, status=405)
+    try:
+        data = _cart_payload(request)
+        quantities = cart_service.parse_quantities(data.get('items', {}))
+        cart = cart_service.get_cart(request)
+        mode = 'replace' if data.get('replace') else 'add'
+        cart_service.set_quantities(cart, quantities, mode=mode)
+    except cart_service.CartError as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    return _cart_response(cart)
+
 # ==================== CALLBACKS PAIEMENT ====================
 
+@csrf_exempt
 def wave_callback(request):
-    """Callback Wave pour confirmation de paiement"""
-    if request.method == 'POST':
-        try:
-            # Récupérer les données de Wave
-            data = json.loads(request.body)
-            
-            # Valider la signature (en production)
-            # validate_wave_signature(data)
-            
-            # Mettre à jour la commande
-            order_number = data.get('reference', '')
-            if order_number.startswith('CMD-'):
-                order_id = int(order_number.split('-')[1])
-                commande = Commande.objects.get(id=order_id)
-                
-                if data.get('status') == 'success':
-                    commande.payment_status = 'paid'
-                    commande.date_paiement = timezone.now()
-                    commande.payment_reference = data.get('transaction_id', '')
-                    commande.save()
-                    
-                    return JsonResponse({'status': 'success'})
-            
-            return JsonResponse({'status': 'error', 'message': 'Commande non trouvée'})
-            
-        except Exception as e:
-            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+    """
+    Webhook Wave : la notification signée est enregistrée (doublons ignorés)
+    et acquittée immédiatement ; la commande est mise à jour en arrière-plan
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error'}, status=405)
+    
+    if not verify_wave_signature(request.headers.get('Wave-Signature'), request.body):
+        return JsonResponse({'status': 'error', 'message': 'Signature invalide'}, status=401)
+    try:
+        data = json.loads(request.body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({'status': 'error', 'message': 'Données invalides'}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'status': 'error', 'message': 'Données invalides'}, status=400)
     
-    return JsonResponse({'status': 'error'}, status=405)
+    record_payment_event('wave', data, request.body)
+    return JsonResponse({'status': 'received'})
 
 # ==================== PARAMÈTRES ====================
 
@@ -591,7 +627,7 @@ def add_review(request, product_id):
             product=product
         ).first()
         
-        rating = int(request.POST.get('rating', 5))
+        rating = min(max(int(request.POST.get('rating', 5)), 1), 5)
         comment = request.POST.get('comment', '')
         
         if existing_review:
@@ -615,18 +651,10 @@ def add_review(request, product_id):
 
 def about(request):
     """Page À propos / Notre Histoire"""
-    categories = Categorie.objects.all()
-    
-    context = {
-        'categories': categories,
-    }
-    
-    return render(request, 'about.html', context)
+    return render(request, 'about.html')
 
 def contact(request):
     """Page de contact avec formulaire"""
-    categories = Categorie.objects.all()
-    
     if request.method == 'POST':
         try:
             # Créer le message de contact
@@ -643,54 +671,76 @@ def contact(request):
         except Exception as e:
             messages.error(request, f"Erreur lors de l'envoi du message : {str(e)}")
     
-    context = {
-        'categories': categories,
-    }
-    
-    return render(request, 'contact.html', context)
+    return render(request, 'contact.html')
 # Ajoutez cette vue dans votre fichier views.py
 
 def search(request):
     """Vue de recherche de produits"""
-    query = request.GET.get('q', '').strip()
-    categories = Categorie.objects.all()
-    
-    # Initialiser les résultats
-    products = Product.objects.filter(is_active=True).select_related('Categorie')
-    
-    # Filtrage par recherche
-    if query:
-        products = products.filter(
-            Q(title__icontains=query) | 
-            Q(description__icontains=query) |
-            Q(Categorie__name__icontains=query)
-        )
-    
-    # Filtrage par catégories
-    selected_categories = request.GET.get('categories', '').split(',')
-    selected_categories = [cat for cat in selected_categories if cat]
-    
-    if selected_categories:
-        products = products.filter(Categorie_id__in=selected_categories)
-    
-    # Tri
-    sort_by = request.GET.get('sort', 'newest')
-    if sort_by == 'price-asc':
-        products = products.order_by('price')
-    elif sort_by == 'price-desc':
-        products = products.order_by('-price')
-    elif sort_by == 'name':
-        products = products.order_by('title')
-    else:  # newest
-        products = products.order_by('-date_ajout')
+    # Recherche, filtrage par catégories et tri
+    products, query, selected_categories, sort_by = search_listing(request.GET)
+    results = favorites_service.mark(request, list(products))
     
     context = {
         'query': query,
-        'products': products,
-        'products_count': products.count(),
-        'categories': categories,
+        'products': results,
+        'products_count': len(results),
         'selected_categories': selected_categories,
         'sort_by': sort_by,
     }
     
-    return render(request, 'search_results.html', context)
\ No newline at end of file
+    return render(request, 'search_results.html', context)
+
+# ==================== API CATALOGUE (JSON) ====================
+
+def _feed_url(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return f"{request.path}?{params.urlencode()}"
+
+@gzip_page
+@conditional_page(listing_etag)
+def api_products(request):
+    """
+    Produits actifs en JSON : ?fields=id,title,price (champs au choix),
+    ?category=, ?search= (ou ?q=), ?sort=, ?limit= et pagination par ?cursor=
+    """
+    params = request.GET.copy()
+    if params.get('q') and not params.get('search'):
+        params['search'] = params['q']
+    try:
+        fields = feed.parse_fields(params.get('fields'), feed.PRODUCT_FIELDS, feed.DEFAULT_PRODUCT_FIELDS)
+        results, next_cursor, previous_cursor = feed.product_page(params, fields)
+    except feed.InvalidParameter as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    
+    return JsonResponse({
+        'results': results,
+        'next': _feed_url(request, next_cursor),
+        'previous': _feed_url(request, previous_cursor),
+    })
+
+@gzip_page
+@conditional_page(listing_etag)
+def api_categories(request):
+    """Catégories en JSON (cache du catalogue) : ?fields=id,name,product_count"""
+    try:
+        fields = feed.parse_fields(request.GET.get('fields'), feed.CATEGORY_FIELDS, feed.CATEGORY_FIELDS)
+    except feed.InvalidFields as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    return JsonResponse({'results': feed.category_rows(fields)})
+
+# ==================== STATISTIQUES ====================
+
+@staff_member_required
+def cache_stats(request):
+    """Compteurs du cache des cartes produit (processus courant)"""
+    return JsonResponse({'product_cards': card_cache_stats()})
+
+def metrics_view(request):
+    """Mesures par vue au format Prometheus (équipe ou adresses de METRICS_ALLOWED_IPS)"""
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if not request.user.is_staff and request.META.get('REMOTE_ADDR') not in allowed_ips:
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')